@@ -1,69 +1,100 @@
+import os
+import time
+from collections.abc import Mapping
+
 from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from flask_mail import Mail
 
-db = SQLAlchemy()
-jwt = JWTManager()
+from config import Config
+from app.services.replicas import RoutingSession
 
-# ✅ FIX: Configure CORS properly
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+jwt = JWTManager()
+migrate = Migrate()
+mail = Mail()
 cors = CORS()
 
-def create_app():
+def create_app(config=None):
+    """Build the app from config.Config plus ``config``.
+
+    ``config`` is a config object (a Config subclass or instance) or a
+    mapping of overrides such as an in-memory database for tests; either
+    is applied before the extensions bind. Building an app touches neither
+    the database nor stdout: tables come from `flask db upgrade` (or
+    `flask init-db` for a scratch database).
+    """
+    from app.services import database
+
     app = Flask(__name__)
-    
-    # Configuration
-    app.config['SECRET_KEY'] = 'dev-secret-key-change-in-production'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///service_to_surplus.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['JWT_SECRET_KEY'] = 'jwt-secret-key-change-in-production'
-    
-    # ✅ FIX: Configure CORS to allow frontend
-    app.config['CORS_HEADERS'] = 'Content-Type'
-    
-    # Initialize extensions
+    app.config.from_object(Config)
+    if isinstance(config, Mapping):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+    if app.config['SQLITE_PRAGMAS'] is None:
+        app.config['SQLITE_PRAGMAS'] = dict(database.DEFAULT_SQLITE_PRAGMAS)
+    if not app.config['UPLOAD_FOLDER']:
+        app.config['UPLOAD_FOLDER'] = os.path.join(app.instance_path, 'uploads')
+
+    # Initialize extensions; pool defaults have to be in place before the
+    # engine is built, the connect-time pragmas right after
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = database.engine_options(app.config)
     db.init_app(app)
+    database.init_app(app)
+    migrate.init_app(app, db)
     jwt.init_app(app)
-    
-    # ✅ FIX: Enable CORS for all routes with proper configuration
+    mail.init_app(app)
+
+    # Per-endpoint latency, SQL and response-size histograms for /metrics;
+    # registered first so its timing covers the other request hooks
+    from app.services import metrics
+    metrics.init_app(app)
+
+    # Cached current_user loader for JWT-protected routes
+    from app.services import identity
+    identity.init_app(app)
+
+    from app.services import replicas
+    replicas.init_app(app)
+
+    # In-process pub/sub behind the /api/stream live feed
+    from app.services import events
+    events.init_app(app)
+
+    from app.services import expiry
+    expiry.init_app(app)
+
+    from app.services import outbox
+    outbox.init_app(app)
+
     cors.init_app(app, resources={
         r"/api/*": {
             "origins": ["http://localhost:5173", "http://127.0.0.1:5173"],
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
+            "allow_headers": ["Content-Type", "Authorization", "If-None-Match"],
+            "expose_headers": ["ETag"]
         }
     })
 
-    # Create database tables
-    with app.app_context():
-        try:
-            from app.models import User, Donation, Request
-            db.create_all()
-            print("✅ Database tables created successfully")
-        except Exception as e:
-            print(f"❌ Database error: {e}")
-
-    # Register blueprints
-    try:
-        from app.routes.auth import bp as auth_bp
-        app.register_blueprint(auth_bp)
-        print("✅ Auth routes registered")
-    except Exception as e:
-        print(f"❌ Auth routes error: {e}")
-
-    try:
-        from app.routes.donations import bp as donations_bp
-        app.register_blueprint(donations_bp)
-        print("✅ Donation routes registered")
-    except Exception as e:
-        print(f"❌ Donation routes error: {e}")
-
-    try:
-        from app.routes.users import bp as users_bp
-        app.register_blueprint(users_bp)
-        print("✅ User routes registered")
-    except Exception as e:
-        print(f"❌ User routes error: {e}")
+    # A blueprint that fails to import fails app creation
+    from app.routes import admin, auth, donations, media, messages, requests, stream, users
+    for module in (auth, donations, users, admin, requests, messages, stream, media):
+        app.register_blueprint(module.bp)
+
+    # CLI commands
+    from app.services.rollups import rollup_cli
+    app.cli.add_command(rollup_cli)
+    app.cli.add_command(expiry.expiry_cli)
+    from app.services.archive import archive_cli
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(outbox.outbox_cli)
+    from app.services.geo import geo_cli
+    app.cli.add_command(geo_cli)
+    app.cli.add_command(database.init_db_command)
 
     # Routes
     @app.route('/')
@@ -77,12 +108,31 @@ def create_app():
 
     @app.route('/status')
     def status_check():
+        from sqlalchemy import text
+        database = {'pool': metrics.pool_stats(db.engine)}
+        try:
+            started = time.perf_counter()
+            db.session.execute(text('SELECT 1'))
+            database['status'] = 'connected'
+            database['ping_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        except Exception as e:
+            db.session.rollback()
+            database['status'] = 'unavailable'
+            database['error'] = str(e)
+
+        healthy = database['status'] == 'connected'
         return jsonify({
-            'status': 'healthy ✅',
+            'status': 'healthy ✅' if healthy else 'degraded ❌',
             'service': 'Service to Surplus API',
-            'database': 'connected',
+            'database': database,
             'cors': 'configured'
-        })
+        }), 200 if healthy else 503
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return app.response_class(
+            metrics.render(app, db.engine),
+            mimetype='text/plain; version=0.0.4'
+        )
 
-    print("✅ All routes registered successfully")
     return app
\ No newline at end of file
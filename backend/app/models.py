@@ -1,8 +1,14 @@
 from app import db
 from datetime import datetime
-import bcrypt
+from sqlalchemy import DDL, event
+from app.services import passwords
+from app.services.geo import grid_cell
 
 class User(db.Model):
+    __table_args__ = (
+        db.Index("ix_user_is_approved_role", "is_approved", "role"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -13,18 +19,47 @@ class User(db.Model):
     address = db.Column(db.Text)
     is_approved = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Feeds showing a user's name fold this into their ETags
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     donations = db.relationship("Donation", backref="donor", lazy=True)
     requests = db.relationship("Request", backref="ngo", lazy=True)
 
     def set_password(self, password):
-        self.password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password):
-        return bcrypt.checkpw(password.encode("utf-8"), self.password_hash.encode("utf-8"))
+        return passwords.check_password(password, self.password_hash)
+
+    def password_needs_rehash(self):
+        return passwords.needs_rehash(self.password_hash)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "username": self.username,
+            "email": self.email,
+            "role": self.role,
+            "organization_name": self.organization_name,
+            "contact_number": self.contact_number,
+            "address": self.address,
+            "is_approved": self.is_approved,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
 
 
 class Donation(db.Model):
+    __table_args__ = (
+        db.Index("ix_donation_status_created_at", "status", "created_at"),
+        db.Index("ix_donation_donor_id_created_at", "donor_id", "created_at"),
+        db.Index("ix_donation_created_at", "created_at"),
+        db.Index("ix_donation_status_updated_at", "status", "updated_at"),
+        db.Index("ix_donation_status_geo_cell", "status", "geo_cell"),
+        db.Index("ix_donation_status_expiry_time", "status", "expiry_time"),
+        # Never reuse ids once rows move to donation_archive
+        {"sqlite_autoincrement": True},
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
@@ -32,6 +67,9 @@ class Donation(db.Model):
     food_type = db.Column(db.String(50))
     expiry_time = db.Column(db.DateTime, nullable=False)
     location = db.Column(db.String(300), nullable=False)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geo_cell = db.Column(db.Integer)  # see app.services.geo.grid_cell
     image_url = db.Column(db.String(500))  # OPTIONAL
     status = db.Column(db.String(20), default="available")
     donor_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -40,8 +78,52 @@ class Donation(db.Model):
 
     requests = db.relationship("Request", backref="donation", lazy=True)
 
+    def set_coordinates(self, latitude, longitude):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.geo_cell = grid_cell(latitude, longitude) if latitude is not None and longitude is not None else None
+
+
+# External-content FTS5 index over donation text, kept in step by triggers.
+# Migration c1f9a7e3b260 creates the same objects on existing databases.
+DONATION_FTS_INSERT_TRIGGER = """CREATE TRIGGER donation_fts_ai AFTER INSERT ON donation BEGIN
+        INSERT INTO donation_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END"""
+DONATION_FTS_DDL = (
+    """CREATE VIRTUAL TABLE donation_fts USING fts5(
+        title, description, location,
+        content='donation', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    DONATION_FTS_INSERT_TRIGGER,
+    """CREATE TRIGGER donation_fts_ad AFTER DELETE ON donation BEGIN
+        INSERT INTO donation_fts(donation_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END""",
+    """CREATE TRIGGER donation_fts_au AFTER UPDATE OF title, description, location ON donation BEGIN
+        INSERT INTO donation_fts(donation_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO donation_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END""",
+)
+
+for _statement in DONATION_FTS_DDL:
+    event.listen(Donation.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    Donation.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS donation_fts").execute_if(dialect="sqlite")
+)
+
 
 class Request(db.Model):
+    __table_args__ = (
+        db.Index("ix_request_ngo_id_created_at", "ngo_id", "created_at"),
+        db.Index("ix_request_donation_id_status", "donation_id", "status"),
+        {"sqlite_autoincrement": True},
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     donation_id = db.Column(db.Integer, db.ForeignKey("donation.id"), nullable=False)
     ngo_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -49,3 +131,109 @@ class Request(db.Model):
     status = db.Column(db.String(20), default="pending")
     collection_time = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "donation_id": self.donation_id,
+            "ngo_id": self.ngo_id,
+            "message": self.message,
+            "status": self.status,
+            "collection_time": self.collection_time.isoformat() if self.collection_time else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class Message(db.Model):
+    __table_args__ = (
+        db.Index("ix_message_request_id_id", "request_id", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    request_id = db.Column(db.Integer, db.ForeignKey("request.id"), nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    read_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "request_id": self.request_id,
+            "sender_id": self.sender_id,
+            "body": self.body,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "read_at": self.read_at.isoformat() if self.read_at else None
+        }
+
+
+def _archive_table(source, *indexes):
+    # Same columns as the hot table, minus foreign keys: archived rows
+    # outlive the rows they referenced
+    columns = [
+        db.Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+        for c in source.columns
+    ]
+    return db.Table(
+        f"{source.name}_archive",
+        *columns,
+        db.Column("archived_at", db.DateTime, nullable=False),
+        *indexes
+    )
+
+
+# Terminal rows past the retention window move here (see app.services.archive)
+donation_archive = _archive_table(
+    Donation.__table__,
+    db.Index("ix_donation_archive_donor_id", "donor_id"),
+)
+request_archive = _archive_table(
+    Request.__table__,
+    db.Index("ix_request_archive_ngo_id", "ngo_id"),
+    db.Index("ix_request_archive_donation_id", "donation_id"),
+)
+message_archive = _archive_table(
+    Message.__table__,
+    db.Index("ix_message_archive_request_id_id", "request_id", "id"),
+)
+# Rows moved into each archive table so far, so lifetime totals needn't count them
+archive_total = db.Table(
+    "archive_total",
+    db.Column("name", db.String(20), primary_key=True),
+    db.Column("archived", db.BigInteger, nullable=False, default=0),
+)
+
+
+class DonationDailyRollup(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    food_type = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class OutboxEmail(db.Model):
+    """An email written in the same transaction as the change it reports.
+
+    ``flask outbox worker`` delivers pending rows (see app.services.outbox);
+    ``dedupe_key`` makes enqueueing the same notification twice a no-op.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        db.Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    dedupe_key = db.Column(db.String(200), unique=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    template = db.Column(db.String(100), nullable=False)
+    context = db.Column(db.Text, nullable=False, default="{}")
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
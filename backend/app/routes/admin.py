@@ -1,21 +1,23 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required
 from app import db
-from app.models import User, Donation, Request
-from datetime import datetime, timedelta
+from app.models import User, Donation, DonationDailyRollup, Request
+from app.services import archive, bulk, identity, replicas
+from app.utils.helpers import count_if
+from app.services.rollups import MAX_REPORT_DAYS, donation_report
+from datetime import date, datetime, timedelta
 
 # Create the blueprint - THIS WAS MISSING
 bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
-def is_admin(user_id):
-    user = User.query.get(user_id)
-    return user and user.role == 'admin'
+def is_admin():
+    return identity.current_role() == 'admin'
 
 @bp.route('/users/pending', methods=['GET'])
 @jwt_required()
 def get_pending_users():
     try:
-        if not is_admin(get_jwt_identity()):
+        if not is_admin():
             return jsonify({'message': 'Admin access required', 'success': False}), 403
         
         pending_users = User.query.filter_by(is_approved=False).all()
@@ -28,7 +30,7 @@ def get_pending_users():
 @jwt_required()
 def approve_user(user_id):
     try:
-        if not is_admin(get_jwt_identity()):
+        if not is_admin():
             return jsonify({'message': 'Admin access required', 'success': False}), 403
         
         user = User.query.get(user_id)
@@ -38,6 +40,11 @@ def approve_user(user_id):
         user.is_approved = True
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        identity.invalidate(user.id)
+        if user.role == 'ngo':
+            # Off the request path; recommendations score the NGO alone until it lands
+            from app.services import matching
+            matching.refresh()
         
         return jsonify({'message': 'User approved successfully', 'success': True}), 200
         
@@ -46,21 +53,46 @@ def approve_user(user_id):
         return jsonify({'message': f'Failed to approve user: {str(e)}', 'success': False}), 500
 
 @bp.route('/stats', methods=['GET'])
+@replicas.reads_from_replica
 @jwt_required()
 def get_admin_stats():
     try:
-        if not is_admin(get_jwt_identity()):
+        if not is_admin():
             return jsonify({'message': 'Admin access required', 'success': False}), 403
         
+        # One aggregate per table, cross-joined so the whole payload is a single round-trip
+        user_counts = db.session.query(
+            db.func.count(User.id).label('total_users'),
+            count_if(db.and_(User.role == 'donor', User.is_approved == True)).label('total_donors'),
+            count_if(db.and_(User.role == 'ngo', User.is_approved == True)).label('total_ngos'),
+            count_if(User.is_approved == False).label('pending_approvals')
+        ).subquery()
+        # Lifetime totals come from the rollup and the archive's counters,
+        # so neither grows with closed history; live counts read the hot tables
+        R = DonationDailyRollup
+        donation_counts = db.session.query(
+            db.func.coalesce(db.func.sum(R.count), 0).label('total_donations'),
+            db.func.coalesce(db.func.sum(db.case((R.status == 'collected', R.count), else_=0)), 0)
+            .label('completed_donations'),
+            db.select(db.func.count(Donation.id)).where(Donation.status == 'available')
+            .scalar_subquery().label('active_donations')
+        ).subquery()
+        request_counts = db.session.query(
+            (db.func.count(Request.id) + archive.archived_total('request')).label('total_requests')
+        ).subquery()
+
+        row = db.session.query(user_counts, donation_counts, request_counts).select_from(
+            user_counts
+        ).join(donation_counts, db.true()).join(request_counts, db.true()).one()
         stats = {
-            'total_users': User.query.count(),
-            'total_donors': User.query.filter_by(role='donor', is_approved=True).count(),
-            'total_ngos': User.query.filter_by(role='ngo', is_approved=True).count(),
-            'pending_approvals': User.query.filter_by(is_approved=False).count(),
-            'total_donations': Donation.query.count(),
-            'active_donations': Donation.query.filter_by(status='available').count(),
-            'total_requests': Request.query.count(),
-            'completed_donations': Donation.query.filter_by(status='collected').count()
+            'total_users': row.total_users,
+            'total_donors': row.total_donors,
+            'total_ngos': row.total_ngos,
+            'pending_approvals': row.pending_approvals,
+            'total_donations': row.total_donations,
+            'active_donations': row.active_donations,
+            'total_requests': row.total_requests,
+            'completed_donations': row.completed_donations
         }
         
         return jsonify({'stats': stats, 'success': True}), 200
@@ -69,33 +101,59 @@ def get_admin_stats():
         return jsonify({'message': f'Failed to fetch admin stats: {str(e)}', 'success': False}), 500
 
 @bp.route('/reports/donations', methods=['GET'])
+@replicas.reads_from_replica
 @jwt_required()
 def get_donation_reports():
     try:
-        if not is_admin(get_jwt_identity()):
+        if not is_admin():
             return jsonify({'message': 'Admin access required', 'success': False}), 403
         
-        # Get donations from last 30 days
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        recent_donations = Donation.query.filter(
-            Donation.created_at >= thirty_days_ago
-        ).all()
-        
+        today = datetime.utcnow().date()
+        try:
+            end = date.fromisoformat(request.args['end']) if request.args.get('end') else today
+            start = date.fromisoformat(request.args['start']) if request.args.get('start') else end - timedelta(days=29)
+        except ValueError:
+            return jsonify({'message': 'start and end must be YYYY-MM-DD dates', 'success': False}), 400
+        if start > end:
+            return jsonify({'message': 'start must not be after end', 'success': False}), 400
+        if (end - start).days >= MAX_REPORT_DAYS:
+            return jsonify({'message': f'A report covers at most {MAX_REPORT_DAYS} days', 'success': False}), 400
+
+        custom = 'start' in request.args or 'end' in request.args
         report = {
-            'period': 'last_30_days',
-            'total_donations': len(recent_donations),
-            'by_status': {},
-            'by_food_type': {},
-            'timeline': []
+            'period': 'custom' if custom else 'last_30_days',
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            **donation_report(start, end)
         }
         
-        for donation in recent_donations:
-            # Count by status
-            report['by_status'][donation.status] = report['by_status'].get(donation.status, 0) + 1
-            # Count by food type
-            report['by_food_type'][donation.food_type] = report['by_food_type'].get(donation.food_type, 0) + 1
-        
         return jsonify({'report': report, 'success': True}), 200
         
     except Exception as e:
-        return jsonify({'message': f'Failed to generate report: {str(e)}', 'success': False}), 500
\ No newline at end of file
+        return jsonify({'message': f'Failed to generate report: {str(e)}', 'success': False}), 500
+
+EXPORT_MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+@bp.route('/export', methods=['GET'])
+@replicas.reads_from_replica
+@jwt_required()
+def export_data():
+    try:
+        if not is_admin():
+            return jsonify({'message': 'Admin access required', 'success': False}), 403
+
+        kind = request.args.get('type', 'donations')
+        fmt = request.args.get('format', 'ndjson')
+        if kind not in bulk.EXPORT_TABLES or fmt not in EXPORT_MIMETYPES:
+            return jsonify({'message': 'Invalid export parameters', 'success': False}), 400
+        include_archived = request.args.get('include_archived') in ('1', 'true')
+
+        # Streamed: the body is generated while the client downloads it
+        return Response(
+            stream_with_context(bulk.export_chunks(kind, fmt, include_archived)),
+            mimetype=EXPORT_MIMETYPES[fmt],
+            headers={'Content-Disposition': f'attachment; filename={kind}.{fmt}'}
+        )
+
+    except Exception as e:
+        return jsonify({'message': f'Failed to export: {str(e)}', 'success': False}), 500
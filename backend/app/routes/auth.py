@@ -1,8 +1,9 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, current_user
 from app import db
 from app.models import User
-import bcrypt
+from app.services import outbox
+from app.services.identity import identity_claims
 
 # THIS LINE MUST BE PRESENT IN EVERY ROUTE FILE
 bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -31,6 +32,13 @@ def register():
     user.is_approved = data['role'] == 'donor'
     
     db.session.add(user)
+    db.session.flush()
+    outbox.enqueue(user.email, 'Welcome to Service to Surplus', 'welcome.html', {
+        'username': user.username,
+        'role': user.role,
+        'organization_name': user.organization_name,
+        'needs_approval': not user.is_approved,
+    }, dedupe_key=f'welcome:{user.id}')
     db.session.commit()
     
     return jsonify({'message': 'User registered successfully'}), 201
@@ -41,12 +49,17 @@ def login():
     user = User.query.filter_by(email=data['email']).first()
     
     if user and user.check_password(data['password']):
+        # Upgrade hashes made under an older work factor while we have the plaintext
+        if user.password_needs_rehash():
+            user.set_password(data['password'])
+            db.session.commit()
+
         # if not user.is_approved:
         #     return jsonify({'message': 'Account pending approval'}), 403
             
         access_token = create_access_token(
              identity=str(user.id),          
-             additional_claims={"sub": str(user.id)}  
+             additional_claims={"sub": str(user.id), **identity_claims(user)}
         )
         return jsonify({
             'access_token': access_token,
@@ -64,8 +77,7 @@ def login():
 @bp.route('/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = current_user
     
     return jsonify({
         'id': user.id,
@@ -1,17 +1,48 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import current_user, jwt_required, get_jwt_identity
 from app import db
 from app.models import Donation, Request, User
+from app.services import bulk, events, geo, replicas, rollups, search
+from app.services.identity import current_role
+from app.services.media import InvalidImage, image_exists, image_urls
+from app.utils.file_upload import handle_image_upload
+from app.utils.helpers import list_etag, not_modified, with_etag
+from app.utils.pagination import parse_limit, encode_cursor, decode_cursor
+from app.utils.validation import validate_donation
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import joinedload
+from werkzeug.wsgi import get_input_stream
 from datetime import datetime
 
 bp = Blueprint('donations', __name__, url_prefix='/api/donations')
 
 
+# ---------------- UPLOAD IMAGE ----------------
+@bp.route('/images', methods=['POST'])
+@jwt_required()
+def upload_image():
+    image = request.files.get("image")
+    if not image:
+        return jsonify({"error": "No image file provided"}), 400
+
+    try:
+        key = handle_image_upload(image)
+    except InvalidImage as e:
+        return jsonify({"error": str(e)}), 422
+
+    image_url, thumbnail_url = image_urls(key)
+    return jsonify({
+        "image_id": key,
+        "image_url": image_url,
+        "thumbnail_url": thumbnail_url
+    }), 201
+
+
 # ---------------- CREATE DONATION ----------------
 @bp.route('', methods=['POST'])
 @jwt_required()
 def create_donation():
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
 
     # Support JSON + Multipart (image optional)
     if request.content_type.startswith("multipart/form-data"):
@@ -20,87 +51,333 @@ def create_donation():
         image_url = None
 
         if image:
-            image_path = f"uploads/{image.filename}"
-            image.save(image_path)
-            image_url = image_path
+            try:
+                image_url = handle_image_upload(image)
+            except InvalidImage as e:
+                return jsonify({"error": str(e)}), 422
 
     else:
         data = request.get_json()
-        image_url = data.get("image_url")
+        # Images are uploaded first via /images and referenced by id
+        image_url = data.get("image_id") or None
+        if image_url and not image_exists(image_url):
+            return jsonify({"error": "Unknown image_id"}), 422
+        if not image_url and data.get("image_url"):
+            image_url = data["image_url"]
+            if image_url.startswith("data:") or len(image_url) > 500:
+                return jsonify({"error": "Upload images via /api/donations/images"}), 422
 
-    # SAFE expiry_time handling
-    expiry_raw = data.get("expiry_time")
-    try:
-        expiry_time = datetime.fromisoformat(expiry_raw.replace("Z", ""))
-    except:
-        return jsonify({"error": "Invalid expiry_time format"}), 422
+    fields, error = validate_donation(data)
+    if error:
+        return jsonify({"error": error}), 422
 
+    # Explicit coordinates win; otherwise geocode the address offline
+    point = fields.pop("point") or geo.geocode(fields["location"])
     donation = Donation(
-        title=data.get("title"),
-        description=data.get("description", ""),
-        quantity=str(data.get("quantity")),            # FIXED (ensure string)
-        food_type=data.get("food_type", "vegetarian"),
-        expiry_time=expiry_time,
-        location=data.get("location"),
+        **fields,
         image_url=image_url,                           # OPTIONAL
         donor_id=user_id
     )
+    if point:
+        donation.set_coordinates(*point)
 
     db.session.add(donation)
     db.session.commit()
 
+    events.publish("donation.created", {
+        "id": donation.id,
+        "title": donation.title,
+        "food_type": donation.food_type,
+        "expiry_time": donation.expiry_time.isoformat(),
+        "location": donation.location
+    }, user_ids=(donation.donor_id,), roles=("ngo", "admin"))
+    # Imported here so app start-up doesn't pay for numpy
+    from app.services import matching
+    matching.notify_matches(donation)
+
     return jsonify({
         "message": "Donation created successfully",
         "id": donation.id
     }), 201
 
 
+# ---------------- BULK IMPORT ----------------
+BULK_READERS = {
+    "text/csv": bulk.read_csv,
+    "application/x-ndjson": bulk.read_ndjson,
+    "application/ndjson": bulk.read_ndjson,
+}
+
+
+@bp.route("/bulk", methods=["POST"])
+@jwt_required()
+def bulk_create_donations():
+    user_id = int(get_jwt_identity())
+    if current_role() != "donor":
+        return jsonify({"error": "Only donors can import donations"}), 403
+
+    reader = BULK_READERS.get(request.mimetype)
+    if reader is None:
+        return jsonify({"error": "Send text/csv or application/x-ndjson"}), 415
+
+    # Parsed straight off the request stream; rows are never all in memory.
+    # Imports may be larger than MAX_CONTENT_LENGTH, up to BULK_IMPORT_MAX_BYTES.
+    stream = get_input_stream(request.environ,
+                              max_content_length=current_app.config["BULK_IMPORT_MAX_BYTES"])
+    result = bulk.import_donations(user_id, reader(stream))
+    status = 201 if result["imported"] else 422
+    return jsonify(result), status
+
+
 # ---------------- GET DONATIONS ----------------
+MAX_RADIUS_KM = 100
+
+
+def _parse_iso(raw):
+    return datetime.fromisoformat(raw.replace("Z", ""))
+
+
+def _donation_to_dict(d):
+    image_url, thumbnail_url = image_urls(d.image_url)
+    return {
+        "id": d.id,
+        "title": d.title,
+        "description": d.description,
+        "quantity": d.quantity,
+        "food_type": d.food_type,
+        "expiry_time": d.expiry_time.isoformat(),
+        "location": d.location,
+        "status": d.status,
+        "image_url": image_url,
+        "thumbnail_url": thumbnail_url,
+        "donor_name": d.donor.organization_name or d.donor.username,
+        "created_at": d.created_at.isoformat()
+    }
+
+
 @bp.route('', methods=['GET'])
+@replicas.reads_from_replica
 @jwt_required()
 def get_donations():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user_id = int(get_jwt_identity())
+    role = current_role()
+
+    args = request.args
+    try:
+        limit = parse_limit(args.get("limit"))
+        cursor = decode_cursor(args["cursor"]) if args.get("cursor") else None
+        expires_after = _parse_iso(args["expires_after"]) if args.get("expires_after") else None
+        expires_before = _parse_iso(args["expires_before"]) if args.get("expires_before") else None
+        near = geo.parse_point(args["near"]) if args.get("near") else None
+        radius_km = float(args.get("radius_km", 10))
+        if not 0 < radius_km <= MAX_RADIUS_KM:
+            raise ValueError("radius_km out of range")
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid pagination or filter parameters"}), 422
 
-    if user.role == 'donor':
-        donations = Donation.query.filter_by(donor_id=user_id).all()
+    query = _scoped_query(user_id, role, args, expires_after, expires_before)
+
+    if near:
+        # Index-backed prefilter: one geo_cell range per grid row of the bounding box
+        min_lat, max_lat, min_lng, max_lng = geo.bounding_box(*near, radius_km)
+        query = query.filter(
+            or_(*[Donation.geo_cell.between(lo, hi)
+                  for lo, hi in geo.cell_ranges(min_lat, max_lat, min_lng, max_lng)]),
+            Donation.latitude.between(min_lat, max_lat),
+            Donation.longitude.between(min_lng, max_lng)
+        )
+
+    # Unchanged scope: answer 304 before loading or serializing any rows
+    # donor_name comes from the joined user
+    etag = list_etag(query.join(Donation.donor), (Donation.updated_at, User.updated_at), user_id, role)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    # Donor is loaded in the same statement so the page costs one query, not 1 + N
+    query = query.options(joinedload(Donation.donor))
+
+    if near:
+        donations = _nearby_page(query, cursor, limit, near, radius_km)
     else:
-        donations = Donation.query.filter(Donation.status == 'available').all()
+        donations = _page_after(query, cursor).limit(limit + 1).all()
 
-    donation_list = []
+    has_more = len(donations) > limit
+    donations = donations[:limit]
+    next_cursor = None
+    if has_more:
+        last = donations[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    out = []
     for d in donations:
-        donation_list.append({
-            "id": d.id,
-            "title": d.title,
-            "description": d.description,
-            "quantity": d.quantity,
-            "food_type": d.food_type,
-            "expiry_time": d.expiry_time.isoformat(),
-            "location": d.location,
-            "status": d.status,
-            "image_url": d.image_url,
-            "donor_name": d.donor.organization_name or d.donor.username,
-            "created_at": d.created_at.isoformat()
-        })
+        item = _donation_to_dict(d)
+        if near:
+            item["distance_km"] = round(geo.haversine_km(near[0], near[1], d.latitude, d.longitude), 2)
+        out.append(item)
+
+    return with_etag(jsonify({
+        "donations": out,
+        "next_cursor": next_cursor
+    }), etag)
 
-    return jsonify(donation_list)
+
+def _scoped_query(user_id, role, args, expires_after, expires_before):
+    # Donors see their own donations (optionally by status), NGOs what is open
+    query = Donation.query
+
+    if role == 'donor':
+        query = query.filter(Donation.donor_id == user_id)
+        if args.get("status"):
+            query = query.filter(Donation.status == args["status"])
+    else:
+        query = query.filter(Donation.status == 'available')
+
+    if args.get("food_type"):
+        query = query.filter(Donation.food_type == args["food_type"])
+    if expires_after:
+        query = query.filter(Donation.expiry_time >= expires_after)
+    if expires_before:
+        query = query.filter(Donation.expiry_time <= expires_before)
+    return query
+
+
+def _page_after(query, cursor):
+    # Keyset pagination on (created_at, id), newest first
+    if cursor:
+        created_at, last_id = cursor
+        query = query.filter(or_(
+            Donation.created_at < created_at,
+            and_(Donation.created_at == created_at, Donation.id < last_id)
+        ))
+    return query.order_by(Donation.created_at.desc(), Donation.id.desc())
+
+
+def _nearby_page(query, cursor, limit, near, radius_km):
+    # The box overshoots the circle (~21% of its area), so keep pulling
+    # bounding-box batches until limit + 1 rows pass the exact distance check
+    batch_size = 2 * (limit + 1)
+    matches = []
+    while len(matches) <= limit:
+        batch = _page_after(query, cursor).limit(batch_size).all()
+        matches.extend(
+            d for d in batch
+            if geo.haversine_km(near[0], near[1], d.latitude, d.longitude) <= radius_km
+        )
+        if len(batch) < batch_size:
+            break
+        cursor = (batch[-1].created_at, batch[-1].id)
+    return matches
+
+
+# ---------------- SEARCH DONATIONS ----------------
+@bp.route('/search', methods=['GET'])
+@replicas.reads_from_replica
+@jwt_required()
+def search_donations():
+    user_id = int(get_jwt_identity())
+    role = current_role()
+
+    args = request.args
+    words = search.terms(args.get("q"))
+    if not words:
+        return jsonify({"error": "q is required"}), 422
+
+    try:
+        limit = parse_limit(args.get("limit"))
+        expires_after = _parse_iso(args["expires_after"]) if args.get("expires_after") else None
+        expires_before = _parse_iso(args["expires_before"]) if args.get("expires_before") else None
+        query = _scoped_query(user_id, role, args, expires_after, expires_before)
+        hits, next_cursor = search.search(
+            query.options(joinedload(Donation.donor)), words, limit, args.get("cursor")
+        )
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid pagination or filter parameters"}), 422
+
+    results = []
+    for donation, rank, snippet in hits:
+        item = _donation_to_dict(donation)
+        item["rank"] = rank
+        item["snippet"] = snippet
+        results.append(item)
+
+    return jsonify({
+        "donations": results,
+        "next_cursor": next_cursor
+    })
+
+
+# ---------------- RECOMMENDED DONATIONS ----------------
+@bp.route('/recommended', methods=['GET'])
+@jwt_required()
+def recommended_donations():
+    user_id = int(get_jwt_identity())
+    role = current_role()
+
+    if role != "ngo":
+        return jsonify({"message": "Only NGOs can get recommendations"}), 403
+    if not current_user.is_approved:
+        # Never in the features, so don't rebuild them looking
+        return jsonify({"message": "NGO is not approved yet"}), 403
+    from app.services import matching
+
+    args = request.args
+    try:
+        limit = parse_limit(args.get("limit"))
+        expires_after = _parse_iso(args["expires_after"]) if args.get("expires_after") else None
+        expires_before = _parse_iso(args["expires_before"]) if args.get("expires_before") else None
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid pagination or filter parameters"}), 422
+
+    # Score every open donation for this NGO in one vectorized pass
+    rows = _scoped_query(user_id, role, args, expires_after, expires_before).with_entities(
+        Donation.id, Donation.latitude, Donation.longitude, Donation.food_type, Donation.expiry_time
+    ).all()
+    ngos = matching.ngo_features()
+    if user_id not in ngos.rows:
+        # Approved since the features were built; approval already started
+        # a rebuild, so score just this NGO meanwhile
+        ngos = matching.build_ngo_features([user_id])
+    ranked = matching.recommend(user_id, matching.donation_features(rows, ngos), ngos, limit)
+
+    by_id = {
+        d.id: d for d in Donation.query.options(joinedload(Donation.donor))
+        .filter(Donation.id.in_([donation_id for donation_id, _ in ranked]))
+    }
+    results = []
+    for donation_id, match_score in ranked:
+        item = _donation_to_dict(by_id[donation_id])
+        item["match_score"] = round(match_score, 4)
+        results.append(item)
+
+    return jsonify({"donations": results})
 
 
 # ---------------- NGO REQUEST DONATION ----------------
 @bp.route('/<int:donation_id>/request', methods=['POST'])
 @jwt_required()
 def create_request(donation_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user_id = int(get_jwt_identity())
 
-    if user.role != "ngo":
+    if current_role() != "ngo":
         return jsonify({"message": "Only NGOs can request donations"}), 403
 
-    donation = Donation.query.get(donation_id)
-    if not donation or donation.status != "available":
+    data = request.get_json() or {}
+
+    # Claim with one conditional UPDATE so concurrent NGOs cannot both pass the
+    # availability check; the Request insert commits in the same transaction
+    claimed = db.session.execute(
+        update(Donation)
+        .where(Donation.id == donation_id, Donation.status == "available")
+        .values(status="claimed", updated_at=datetime.utcnow())
+        .returning(Donation.created_at, Donation.food_type, Donation.donor_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if claimed is None:
+        db.session.rollback()
         return jsonify({"message": "Donation not available"}), 404
 
-    data = request.get_json()
+    rollups.move(db.session.connection(), claimed.created_at, claimed.food_type, "available", "claimed")
 
     req = Request(
         donation_id=donation_id,
@@ -108,11 +385,16 @@ def create_request(donation_id):
         message=data.get("message", "")
     )
 
-    donation.status = "claimed"
-
     db.session.add(req)
     db.session.commit()
 
+    # NGOs drop it from their feeds; the donor sees who claimed it
+    events.publish("donation.claimed", {
+        "id": donation_id,
+        "request_id": req.id,
+        "ngo_id": user_id
+    }, user_ids=(claimed.donor_id,), roles=("ngo", "admin"))
+
     return jsonify({"message": "Request submitted successfully"}), 201
 
 
@@ -120,13 +402,26 @@ def create_request(donation_id):
 @bp.route('/requests', methods=['GET'])
 @jwt_required()
 def get_requests():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user_id = int(get_jwt_identity())
 
-    if user.role == "donor":
-        requests = Request.query.join(Donation).filter(Donation.donor_id == user_id).all()
+    role = current_role()
+    query = Request.query.join(Request.donation)
+    if role == "donor":
+        query = query.filter(Donation.donor_id == user_id)
     else:
-        requests = Request.query.filter_by(ngo_id=user_id).all()
+        query = query.filter(Request.ngo_id == user_id)
+
+    # The payload also shows the donation's title and quantity and the NGO's name
+    etag = list_etag(
+        query.join(Request.ngo), (Request.updated_at, Donation.updated_at, User.updated_at), user_id, role
+    )
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    requests = query.options(
+        joinedload(Request.donation), joinedload(Request.ngo)
+    ).all()
 
     out = []
     for r in requests:
@@ -140,4 +435,4 @@ def get_requests():
             "created_at": r.created_at.isoformat()
         })
 
-    return jsonify(out)
+    return with_etag(jsonify(out), etag)
@@ -0,0 +1,37 @@
+import os
+
+from flask import Blueprint, abort, send_from_directory
+from werkzeug.security import safe_join
+
+from app.services.media import is_media_path, media_root
+
+bp = Blueprint('media', __name__, url_prefix='/media')
+
+ONE_YEAR = 365 * 24 * 60 * 60
+
+
+@bp.route('/<path:filename>', methods=['GET'])
+def serve_media(filename):
+    # Only stored images and their thumbnails; upload spool files and
+    # anything else under the folder stay private
+    if not is_media_path(filename):
+        abort(404)
+    root = media_root()
+    path = safe_join(root, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    # Stored files are never rewritten in place, so clients may cache them forever.
+    # send_file answers If-None-Match with 304 and Range with 206, and hands the
+    # open file to wsgi.file_wrapper (sendfile under gunicorn) or X-Sendfile.
+    response = send_from_directory(
+        root,
+        filename,
+        # Content-addressed: the name already is the hash (plus variant suffix)
+        etag=os.path.basename(filename),
+        conditional=True,
+        max_age=ONE_YEAR,
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,147 @@
+import json
+import time
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app import db
+from app.models import Message, Request, Donation
+from app.services import events
+from app.services.identity import current_role
+from app.utils.pagination import parse_limit
+from datetime import datetime
+
+bp = Blueprint('messages', __name__, url_prefix='/api/requests')
+
+MAX_MESSAGE_LENGTH = 2000
+
+
+def _participants(request_id):
+    # (ngo_id, donor_id) for the request's thread, or None if it does not exist
+    return db.session.query(Request.ngo_id, Donation.donor_id).join(
+        Donation, Donation.id == Request.donation_id
+    ).filter(Request.id == request_id).first()
+
+
+def _page(request_id, before, after, limit):
+    # Returns (messages oldest-first, whether more exist in that direction)
+    query = Message.query.filter(Message.request_id == request_id)
+    if after is not None:
+        # Catching up: forward from the caller's last seen id
+        rows = query.filter(Message.id > after).order_by(Message.id.asc()).limit(limit + 1).all()
+        return rows[:limit], len(rows) > limit
+    if before is not None:
+        query = query.filter(Message.id < before)
+    # History: newest page first, so a long thread only ever reads its tail
+    rows = query.order_by(Message.id.desc()).limit(limit + 1).all()
+    return rows[:limit][::-1], len(rows) > limit
+
+
+def _wait_for_messages(request_id, user_id, fetch, timeout):
+    broker = events.broker()
+    sub = broker.subscribe(user_id, current_role())
+    try:
+        messages = fetch()
+        deadline = time.monotonic() + timeout
+        while not messages[0]:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Hand the connection back to the pool while we sleep
+            db.session.close()
+            for _, event_type, payload in broker.listen(sub, remaining):
+                if event_type == 'message.created' and json.loads(payload)['request_id'] == request_id:
+                    messages = fetch()
+                    break
+        return messages
+    finally:
+        broker.unsubscribe(sub)
+
+
+@bp.route('/<int:request_id>/messages', methods=['GET'])
+@jwt_required()
+def list_messages(request_id):
+    user_id = int(get_jwt_identity())
+    participants = _participants(request_id)
+    if not participants:
+        return jsonify({'message': 'Request not found', 'success': False}), 404
+    if user_id not in participants:
+        return jsonify({'message': 'Unauthorized', 'success': False}), 403
+
+    try:
+        limit = parse_limit(request.args.get('limit'), default=50)
+        before = request.args.get('before', type=int)
+        after = request.args.get('after', type=int)
+        wait = min(request.args.get('wait', 0, type=float), current_app.config.get('CHAT_LONG_POLL_SECONDS', 25))
+    except ValueError:
+        return jsonify({'message': 'Invalid pagination parameters', 'success': False}), 422
+
+    def fetch():
+        return _page(request_id, before, after, limit)
+
+    # Long-poll fallback for clients without the SSE stream
+    if after is not None and wait > 0:
+        rows, has_more = _wait_for_messages(request_id, user_id, fetch, wait)
+    else:
+        rows, has_more = fetch()
+
+    return jsonify({
+        'messages': [m.to_dict() for m in rows],
+        'has_more': has_more,
+        'success': True
+    }), 200
+
+
+@bp.route('/<int:request_id>/messages', methods=['POST'])
+@jwt_required()
+def send_message(request_id):
+    user_id = int(get_jwt_identity())
+    participants = _participants(request_id)
+    if not participants:
+        return jsonify({'message': 'Request not found', 'success': False}), 404
+    if user_id not in participants:
+        return jsonify({'message': 'Unauthorized', 'success': False}), 403
+
+    data = request.get_json() or {}
+    body = (data.get('body') or '').strip()
+    if not body or len(body) > MAX_MESSAGE_LENGTH:
+        return jsonify({'message': f'Message must be 1-{MAX_MESSAGE_LENGTH} characters', 'success': False}), 400
+
+    message = Message(request_id=request_id, sender_id=user_id, body=body)
+    db.session.add(message)
+    db.session.commit()
+
+    payload = message.to_dict()
+    events.publish('message.created', payload, user_ids=tuple(participants))
+    return jsonify({'message': payload, 'success': True}), 201
+
+
+@bp.route('/<int:request_id>/messages/read', methods=['POST'])
+@jwt_required()
+def mark_read(request_id):
+    user_id = int(get_jwt_identity())
+    participants = _participants(request_id)
+    if not participants:
+        return jsonify({'message': 'Request not found', 'success': False}), 404
+    if user_id not in participants:
+        return jsonify({'message': 'Unauthorized', 'success': False}), 403
+
+    data = request.get_json() or {}
+    up_to = data.get('up_to')
+    if not isinstance(up_to, int):
+        return jsonify({'message': 'up_to must be a message id', 'success': False}), 400
+
+    # One UPDATE acknowledges everything the reader has seen so far
+    updated = Message.query.filter(
+        Message.request_id == request_id,
+        Message.id <= up_to,
+        Message.sender_id != user_id,
+        Message.read_at.is_(None)
+    ).update({'read_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+
+    if updated:
+        events.publish('message.read', {
+            'request_id': request_id,
+            'reader_id': user_id,
+            'up_to': up_to
+        }, user_ids=tuple(participants))
+    return jsonify({'updated': updated, 'success': True}), 200
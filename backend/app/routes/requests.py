@@ -1,9 +1,17 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import Request, Donation, User
+from app.services import events, geo, outbox
+from app.services.identity import current_role
 from datetime import datetime
 
+REQUEST_STATUS_EMAILS = {
+    'approved': 'Your request for "{title}" was approved. Please collect it before it expires.',
+    'rejected': 'Your request for "{title}" was not approved this time.',
+    'collected': 'Thank you for collecting "{title}".',
+}
+
 # Create the blueprint - THIS WAS MISSING
 bp = Blueprint('requests', __name__, url_prefix='/api/requests')
 
@@ -11,10 +19,9 @@ bp = Blueprint('requests', __name__, url_prefix='/api/requests')
 @jwt_required()
 def get_requests():
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user_id = int(get_jwt_identity())
         
-        if user.role == 'donor':
+        if current_role() == 'donor':
             # Donors see requests for their donations
             requests = Request.query.join(Donation).filter(
                 Donation.donor_id == user_id
@@ -42,7 +49,7 @@ def get_request(request_id):
 @jwt_required()
 def update_request_status(request_id):
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         request_obj = Request.query.get_or_404(request_id)
         donation = Donation.query.get(request_obj.donation_id)
         
@@ -72,8 +79,26 @@ def update_request_status(request_id):
                 donation_id=request_obj.donation_id, 
                 status='pending'
             ).update({'status': 'rejected'})
+
+        # Written in this transaction; `flask outbox worker` sends it
+        ngo = User.query.get(request_obj.ngo_id)
+        outbox.enqueue(ngo.email, f'Request {new_status}: {donation.title}', 'notification.html', {
+            'username': ngo.username,
+            'message': REQUEST_STATUS_EMAILS[new_status].format(title=donation.title),
+            'details': {
+                'Pickup location': donation.location,
+                'Expires': donation.expiry_time.strftime('%d %b %Y %H:%M'),
+            },
+        }, dedupe_key=f'request:{request_obj.id}:{new_status}')
         
         db.session.commit()
+
+        events.publish('request.status_changed', {
+            'request_id': request_obj.id,
+            'donation_id': donation.id,
+            'status': new_status,
+            'donation_status': donation.status
+        }, user_ids=(request_obj.ngo_id, donation.donor_id))
         
         return jsonify({'message': f'Request {new_status} successfully', 'success': True}), 200
         
@@ -85,7 +110,7 @@ def update_request_status(request_id):
 @jwt_required()
 def delete_request(request_id):
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         request_obj = Request.query.get_or_404(request_id)
         
         # Check if user is the NGO that made the request
@@ -113,4 +138,85 @@ def delete_request(request_id):
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'message': f'Failed to delete request: {str(e)}', 'success': False}), 500
\ No newline at end of file
+        return jsonify({'message': f'Failed to delete request: {str(e)}', 'success': False}), 500
+
+@bp.route('/route', methods=['POST'])
+@jwt_required()
+def plan_route():
+    """Order the NGO's approved pickups to cut travel while beating expiry times."""
+    try:
+        user_id = int(get_jwt_identity())
+        if current_role() != 'ngo':
+            return jsonify({'message': 'Only NGOs can plan pickup routes', 'success': False}), 403
+
+        data = request.get_json(silent=True) or {}
+        try:
+            if data.get('latitude') is not None and data.get('longitude') is not None:
+                start = geo.parse_point(f"{data['latitude']},{data['longitude']}")
+            else:
+                start = geo.geocode(User.query.get(user_id).address)
+            depart_at = (
+                datetime.fromisoformat(data['depart_at'].replace('Z', ''))
+                if data.get('depart_at') else datetime.utcnow()
+            )
+            speed_kmh = float(data.get('speed_kmh', current_app.config['ROUTE_SPEED_KMH']))
+            service_minutes = float(data.get('service_minutes', current_app.config['ROUTE_SERVICE_MINUTES']))
+            request_ids = [int(request_id) for request_id in data.get('request_ids') or []]
+            if speed_kmh <= 0 or service_minutes < 0:
+                raise ValueError('speed and service time must be positive')
+        except (ValueError, TypeError, AttributeError):
+            return jsonify({'message': 'Invalid route parameters', 'success': False}), 400
+
+        query = db.session.query(Request, Donation).join(
+            Donation, Donation.id == Request.donation_id
+        ).filter(Request.ngo_id == user_id, Request.status == 'approved')
+        if request_ids:
+            query = query.filter(Request.id.in_(request_ids))
+
+        pickups = {}
+        stops = []
+        unrouted = []
+        for request_obj, donation in query.order_by(Request.id).all():
+            if donation.latitude is not None and donation.longitude is not None:
+                point = (donation.latitude, donation.longitude)
+            else:
+                point = geo.geocode(donation.location)
+            if point is None:
+                unrouted.append(request_obj.id)
+                continue
+            pickups[request_obj.id] = (donation, point)
+            stops.append((request_obj.id, point[0], point[1], donation.expiry_time))
+
+        from app.services import routing  # numpy; deferred past start-up
+        visits, total_km = routing.plan_route(
+            start, stops, depart_at, speed_kmh, service_minutes,
+            time_budget=current_app.config['ROUTE_TIME_BUDGET']
+        )
+
+        route = []
+        for visit in visits:
+            donation, (latitude, longitude) = pickups[visit['key']]
+            route.append({
+                'request_id': visit['key'],
+                'donation_id': donation.id,
+                'title': donation.title,
+                'location': donation.location,
+                'latitude': latitude,
+                'longitude': longitude,
+                'expiry_time': donation.expiry_time.isoformat(),
+                'arrival_time': visit['arrival_time'].isoformat(),
+                'leg_km': round(visit['leg_km'], 3),
+                'late': visit['late'],
+            })
+
+        return jsonify({
+            'stops': route,
+            'total_km': round(total_km, 3),
+            'late_stops': sum(1 for stop in route if stop['late']),
+            'unrouted': unrouted,
+            'depart_at': depart_at.isoformat(),
+            'success': True
+        }), 200
+
+    except Exception as e:
+        return jsonify({'message': f'Failed to plan route: {str(e)}', 'success': False}), 500
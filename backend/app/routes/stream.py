@@ -0,0 +1,37 @@
+from flask import Blueprint, Response, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services import events
+from app.services.identity import current_role
+
+bp = Blueprint('stream', __name__, url_prefix='/api/stream')
+
+
+def _format(event_id, event_type, payload):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+
+# EventSource cannot send headers, so the token may also come as ?jwt=
+@bp.route('', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream():
+    broker = events.broker()
+    heartbeat = current_app.config.get('SSE_HEARTBEAT_SECONDS', 15)
+    # Subscribe now so nothing published between here and the first read is lost
+    sub = broker.subscribe(int(get_jwt_identity()), current_role())
+
+    def generate():
+        try:
+            yield f"retry: {heartbeat * 1000}\n\n"
+            while True:
+                pending = broker.listen(sub, heartbeat)
+                if not pending:
+                    yield ": keep-alive\n\n"
+                for event in pending:
+                    yield _format(*event)
+        finally:
+            broker.unsubscribe(sub)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import User
+from app.services import archive, identity, replicas
+from app.utils.helpers import count_if
 
 # Create the blueprint - THIS WAS MISSING
 bp = Blueprint('users', __name__, url_prefix='/api/users')
@@ -25,8 +27,8 @@ def update_profile():
         if 'address' in data:
             user.address = data['address']
         
-        user.updated_at = db.func.now()
         db.session.commit()
+        identity.invalidate(user.id)
         
         return jsonify({
             'message': 'Profile updated successfully',
@@ -48,27 +50,40 @@ def update_profile():
         return jsonify({'message': f'Failed to update profile: {str(e)}', 'success': False}), 500
 
 @bp.route('/stats', methods=['GET'])
+@replicas.reads_from_replica
 @jwt_required()
 def get_user_stats():
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user_id = int(get_jwt_identity())
         
-        if user.role == 'donor':
-            from app.models import Donation
+        # Totals include archived history; both branches use the owner index
+        if identity.current_role() == 'donor':
+            donations = archive.history('donation', ['id', 'status'], lambda c: c.donor_id == user_id)
+            row = db.session.query(
+                db.func.count(donations.c.id),
+                count_if(donations.c.status == 'available'),
+                count_if(donations.c.status == 'claimed'),
+                count_if(donations.c.status == 'collected')
+            ).one()
             stats = {
-                'total_donations': Donation.query.filter_by(donor_id=user_id).count(),
-                'active_donations': Donation.query.filter_by(donor_id=user_id, status='available').count(),
-                'claimed_donations': Donation.query.filter_by(donor_id=user_id, status='claimed').count(),
-                'completed_donations': Donation.query.filter_by(donor_id=user_id, status='collected').count()
+                'total_donations': row[0],
+                'active_donations': row[1],
+                'claimed_donations': row[2],
+                'completed_donations': row[3]
             }
         else:
-            from app.models import Request
+            requests = archive.history('request', ['id', 'status'], lambda c: c.ngo_id == user_id)
+            row = db.session.query(
+                db.func.count(requests.c.id),
+                count_if(requests.c.status == 'pending'),
+                count_if(requests.c.status == 'approved'),
+                count_if(requests.c.status == 'collected')
+            ).one()
             stats = {
-                'total_requests': Request.query.filter_by(ngo_id=user_id).count(),
-                'pending_requests': Request.query.filter_by(ngo_id=user_id, status='pending').count(),
-                'approved_requests': Request.query.filter_by(ngo_id=user_id, status='approved').count(),
-                'completed_requests': Request.query.filter_by(ngo_id=user_id, status='collected').count()
+                'total_requests': row[0],
+                'pending_requests': row[1],
+                'approved_requests': row[2],
+                'completed_requests': row[3]
             }
         
         return jsonify({'stats': stats, 'success': True}), 200
@@ -0,0 +1,162 @@
+import json
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, exists, insert, literal, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models import (
+    Donation, Request, Message, archive_total, donation_archive, request_archive, message_archive
+)
+
+# A donation is archived together with its requests and their chat, and only
+# once none of them can change again
+TERMINAL_DONATION_STATUSES = ('collected', 'expired')
+OPEN_REQUEST_STATUSES = ('pending', 'approved')
+# Ids per DELETE, under SQLite's bound-parameter limit
+DELETE_CHUNK_ROWS = 1000
+
+archive_cli = AppGroup('archive', help='Move closed donations out of the hot tables.')
+
+_HOT = {
+    'donation': Donation.__table__,
+    'request': Request.__table__,
+    'message': Message.__table__,
+}
+_ARCHIVE = {
+    'donation': donation_archive,
+    'request': request_archive,
+    'message': message_archive,
+}
+
+
+def history(name, columns, where=None):
+    """UNION ALL of a hot table and its archive, as a subquery.
+
+    ``where`` receives each table's column collection so the filter lands
+    inside both branches and can use their indexes.
+    """
+    selects = []
+    for table in (_HOT[name], _ARCHIVE[name]):
+        stmt = select(*(table.c[column] for column in columns))
+        if where is not None:
+            stmt = stmt.where(where(table.c))
+        selects.append(stmt)
+    return union_all(*selects).subquery(f'{name}_history')
+
+
+def archived_total(name):
+    """How many rows have ever moved into ``name``'s archive, as a scalar subquery."""
+    return db.func.coalesce(
+        select(archive_total.c.archived).where(archive_total.c.name == name).scalar_subquery(), 0
+    )
+
+
+def _add_to_total(name, count):
+    if not count:
+        return
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = dialect_insert(archive_total).values(name=name, archived=count)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['name'],
+            set_={'archived': archive_total.c.archived + statement.excluded.archived}
+        ))
+        return
+    result = db.session.execute(
+        archive_total.update().where(archive_total.c.name == name)
+        .values(archived=archive_total.c.archived + count)
+    )
+    if result.rowcount == 0:
+        db.session.execute(archive_total.insert().values(name=name, archived=count))
+
+
+def _archivable_ids(cutoff, batch_size):
+    still_open = exists().where(
+        Request.donation_id == Donation.id,
+        Request.status.in_(OPEN_REQUEST_STATUSES)
+    )
+    rows = db.session.query(Donation.id).filter(
+        Donation.status.in_(TERMINAL_DONATION_STATUSES),
+        Donation.updated_at < cutoff,
+        ~still_open
+    ).order_by(Donation.updated_at).limit(batch_size)
+    return [row.id for row in rows]
+
+
+def _move(name, where, now):
+    hot, cold = _HOT[name], _ARCHIVE[name]
+    columns = [c.name for c in hot.columns]
+    copied = db.session.execute(insert(cold).from_select(
+        columns + ['archived_at'],
+        select(*hot.c, literal(now, db.DateTime)).where(where(hot.c))
+    ).returning(cold.c.id)).scalars().all()
+    # Delete exactly what was copied: a row committed between the two
+    # statements stays in the hot table for the next run. Core DELETE, so
+    # the rollup keeps counting archived donations.
+    for start in range(0, len(copied), DELETE_CHUNK_ROWS):
+        db.session.execute(delete(hot).where(hot.c.id.in_(copied[start:start + DELETE_CHUNK_ROWS])))
+    return len(copied)
+
+
+def _archive_batch(ids, now):
+    # Locking the requests holds back new chat on them (its foreign key
+    # check) until this batch commits
+    request_ids = db.session.execute(
+        select(Request.id).where(Request.donation_id.in_(ids)).with_for_update()
+    ).scalars().all()
+    messages = _move('message', lambda c: c.request_id.in_(request_ids), now)
+    requests = _move('request', lambda c: c.donation_id.in_(ids), now)
+    donations = _move('donation', lambda c: c.id.in_(ids), now)
+    for name, count in (('donation', donations), ('request', requests), ('message', messages)):
+        _add_to_total(name, count)
+    db.session.commit()
+    return donations, requests, messages
+
+
+def run(retention_days=None, batch_size=None, now=None):
+    """Archive terminal donations untouched for ``retention_days``, one
+    LIMIT-sized transaction at a time, and return the run's metrics."""
+    config = current_app.config
+    retention_days = config.get('ARCHIVE_RETENTION_DAYS', 90) if retention_days is None else retention_days
+    batch_size = batch_size or config.get('ARCHIVE_BATCH_SIZE', 1000)
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=retention_days)
+
+    started = time.perf_counter()
+    batches = donations = requests = messages = 0
+    while True:
+        ids = _archivable_ids(cutoff, batch_size)
+        if not ids:
+            break
+        moved = _archive_batch(ids, now)
+        batches += 1
+        donations += moved[0]
+        requests += moved[1]
+        messages += moved[2]
+        if len(ids) < batch_size:
+            break
+
+    metrics = {
+        'cutoff': cutoff.isoformat(),
+        'batches': batches,
+        'donations_archived': donations,
+        'requests_archived': requests,
+        'messages_archived': messages,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    current_app.logger.info('archive run: %s', json.dumps(metrics))
+    return metrics
+
+
+@archive_cli.command('run')
+@click.option('--retention-days', type=int, default=None, help='Keep closed rows this long.')
+@click.option('--batch-size', type=int, default=None, help='Donations per transaction.')
+def run_command(retention_days, batch_size):
+    """Archive closed donations once and print the run's metrics."""
+    click.echo(json.dumps(run(retention_days, batch_size)))
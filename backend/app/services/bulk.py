@@ -0,0 +1,187 @@
+import csv
+import io
+import json
+from collections import Counter
+from datetime import date, datetime
+
+from sqlalchemy import insert, select, text
+
+from app import db
+from app.models import DONATION_FTS_INSERT_TRIGGER, Donation, Request
+from app.services import archive, events, geo, rollups, search
+from app.utils.validation import validate_donation
+
+IMPORT_BATCH_SIZE = 2000
+# Per-row errors echoed back; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+EXPORT_TABLES = {'donations': Donation.__table__, 'requests': Request.__table__}
+# Rows per chunk written to the response and fetched from the cursor
+EXPORT_CHUNK_ROWS = 1000
+
+
+def read_csv(stream):
+    """(row number, dict, error) for each data row of a CSV byte stream."""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    try:
+        for data in reader:
+            yield reader.line_num, data, None
+    except (csv.Error, UnicodeDecodeError) as exc:
+        yield reader.line_num, None, f'Unreadable CSV: {exc}'
+
+
+def _lines(stream, chunk_size=64 * 1024):
+    # Werkzeug's request stream is unbuffered; iterating it line by line
+    # costs a read call per few bytes
+    pending = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def read_ndjson(stream):
+    """(line number, dict, error) for each non-blank line of an NDJSON byte stream."""
+    for line_num, line in enumerate(_lines(stream), 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield line_num, None, 'Invalid JSON'
+            continue
+        if not isinstance(data, dict):
+            yield line_num, None, 'Expected a JSON object'
+            continue
+        yield line_num, data, None
+
+
+def _insert_batch(rows, now):
+    # The executemany skips the ORM hooks that keep the rollups current.
+    # Bumping them first also opens the transaction the rest runs in.
+    connection = db.session.connection()
+    for food_type, count in Counter(row['food_type'] for row in rows).items():
+        rollups.add(connection, now, food_type, 'available', count)
+
+    if not search.uses_fts():
+        db.session.execute(insert(Donation.__table__), rows)
+        db.session.commit()
+        return
+
+    # The per-row FTS trigger is ~10x slower than indexing the batch in one
+    # statement. SQLite DDL is transactional and this transaction holds the
+    # write lock, so no other insert can slip past the index meanwhile.
+    last_id = db.session.query(db.func.max(Donation.id)).scalar() or 0
+    db.session.execute(text('DROP TRIGGER donation_fts_ai'))
+    db.session.execute(insert(Donation.__table__), rows)
+    db.session.execute(text(
+        'INSERT INTO donation_fts(rowid, title, description, location) '
+        'SELECT id, title, description, location FROM donation WHERE id > :last_id'
+    ), {'last_id': last_id})
+    db.session.execute(text(DONATION_FTS_INSERT_TRIGGER))
+    db.session.commit()
+
+
+def import_donations(donor_id, rows, batch_size=IMPORT_BATCH_SIZE, now=None):
+    """Validate and insert parsed rows for one donor, one transaction per batch.
+
+    Invalid rows are skipped and reported; valid ones are inserted even when
+    others fail.
+    """
+    now = now or datetime.utcnow()
+    # Importers repeat a handful of addresses; geocode each once
+    geocoded = {}
+    batch = []
+    imported = failed = 0
+    errors = []
+    for row_num, data, error in rows:
+        fields = None
+        if error is None:
+            fields, error = validate_donation(data)
+        if error:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'row': row_num, 'error': error})
+            continue
+
+        point = fields.pop('point')
+        if point is None:
+            location = fields['location']
+            if location not in geocoded:
+                geocoded[location] = geo.geocode(location)
+            point = geocoded[location]
+        latitude, longitude = point or (None, None)
+        batch.append({
+            **fields,
+            'latitude': latitude,
+            'longitude': longitude,
+            'geo_cell': geo.grid_cell(latitude, longitude) if point else None,
+            'image_url': None,
+            'status': 'available',
+            'donor_id': donor_id,
+            'created_at': now,
+            'updated_at': now,
+        })
+        if len(batch) >= batch_size:
+            _insert_batch(batch, now)
+            imported += len(batch)
+            batch = []
+
+    if batch:
+        _insert_batch(batch, now)
+        imported += len(batch)
+
+    if imported:
+        events.publish('donation.imported', {'count': imported},
+                       user_ids=(donor_id,), roles=('ngo', 'admin'))
+    return {'imported': imported, 'failed': failed, 'errors': errors}
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _export_query(kind, include_archived):
+    table = EXPORT_TABLES[kind]
+    columns = [column.name for column in table.columns]
+    if include_archived:
+        source = archive.history(table.name, columns)
+        return columns, select(*(source.c[column] for column in columns))
+    return columns, select(table).order_by(table.c.id)
+
+
+def export_chunks(kind, fmt, include_archived=False):
+    """Yield ``kind`` rows as NDJSON or CSV text, a chunk at a time.
+
+    Rows come off a streaming cursor, so memory stays flat however large
+    the table is. On Postgres that is a named server-side cursor; without
+    one psycopg2 buffers the whole result client-side before the first row.
+    """
+    columns, query = _export_query(kind, include_archived)
+    result = db.session.execute(query.execution_options(
+        stream_results=True, yield_per=EXPORT_CHUNK_ROWS
+    ))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(columns)
+    for partition in result.partitions():
+        for row in partition:
+            if fmt == 'csv':
+                writer.writerow(
+                    value.isoformat() if isinstance(value, datetime) else value for value in row
+                )
+            else:
+                buffer.write(json.dumps(dict(zip(columns, row)), default=_json_default))
+                buffer.write('\n')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
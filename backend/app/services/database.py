@@ -0,0 +1,84 @@
+from functools import partial
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from app import db
+
+# Run on every new connection to a SQLite file. WAL lets readers carry on
+# while a writer commits; under WAL, synchronous=NORMAL only syncs at
+# checkpoints, so a power cut can drop the last commits but never corrupts
+# the file. busy_timeout is how long a writer queues for the lock before
+# "database is locked"; negative cache_size is in KiB, per connection.
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 10_000,
+    'cache_size': -64_000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+# Sized for the threaded dev server and a few workers; SQLite still admits
+# one writer at a time, so more connections only help readers
+SQLITE_POOL = {'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 30}
+# Server databases drop idle connections; check before use and recycle
+# well inside typical server-side idle timeouts
+SERVER_POOL = {'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 30,
+               'pool_pre_ping': True, 'pool_recycle': 1800}
+
+
+def _sqlite_file(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS with pool defaults filled in for the URI.
+
+    Options set explicitly in the config win. In-memory SQLite is left to
+    Flask-SQLAlchemy, which pins it to a single shared connection.
+    """
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if make_url(uri).get_backend_name() == 'sqlite':
+        defaults = SQLITE_POOL if _sqlite_file(uri) else {}
+    else:
+        defaults = SERVER_POOL
+    for key, value in defaults.items():
+        options.setdefault(key, value)
+    return options
+
+
+def _apply_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def listen_for_pragmas(engine, pragmas):
+    """Apply ``pragmas`` to each connection ``engine`` opens, if it is a SQLite file."""
+    if pragmas and _sqlite_file(engine.url):
+        event.listen(engine, 'connect', partial(_apply_pragmas, dict(pragmas)))
+
+
+def init_app(app):
+    """Apply SQLITE_PRAGMAS to each connection the app's engine opens."""
+    with app.app_context():
+        listen_for_pragmas(db.engine, app.config.get('SQLITE_PRAGMAS'))
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create any missing tables straight from the models.
+
+    For scratch and development databases; deployed ones are built and
+    upgraded with `flask db upgrade`.
+    """
+    db.create_all()
+    click.echo('Created missing tables')
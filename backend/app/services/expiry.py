@@ -0,0 +1,170 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import exists, update
+
+from app import db
+from app.models import Donation, Request
+from app.services import events, rollups
+
+# Donations still waiting on someone; once an NGO's pickup is approved the
+# donation is left for the donor to close out
+SWEEPABLE_STATUSES = ('available', 'claimed')
+
+expiry_cli = AppGroup('expiry', help='Retire donations past their expiry_time.')
+
+_sweep_lock = threading.Lock()
+
+
+def init_app(app):
+    app.extensions['expiry_sweeper'] = {
+        'runs': 0,
+        'donations_expired_total': 0,
+        'requests_cancelled_total': 0,
+        'last_run': None,
+    }
+
+
+def _has_approved_request():
+    return exists().where(
+        Request.donation_id == Donation.id,
+        Request.status == 'approved'
+    )
+
+
+def _expired_ids(now, batch_size):
+    rows = db.session.query(Donation.id).filter(
+        Donation.status.in_(SWEEPABLE_STATUSES),
+        Donation.expiry_time <= now,
+        ~_has_approved_request()
+    ).order_by(Donation.expiry_time).limit(batch_size)
+    return [row.id for row in rows]
+
+
+def _expire_batch(ids, now):
+    connection = db.session.connection()
+    buckets = {}
+    donor_ids = set()
+    expired_ids = []
+    for old_status in SWEEPABLE_STATUSES:
+        # Conditional on status and on no approved pickup, so a claim or an
+        # approval racing the sweep simply wins or loses
+        rows = db.session.execute(
+            update(Donation)
+            .where(Donation.id.in_(ids), Donation.status == old_status, ~_has_approved_request())
+            .values(status='expired', updated_at=now)
+            .returning(Donation.id, Donation.created_at, Donation.food_type, Donation.donor_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        for row in rows:
+            expired_ids.append(row.id)
+            donor_ids.add(row.donor_id)
+            key = (old_status, row.created_at.date(), row.food_type)
+            created_at, count = buckets.get(key, (row.created_at, 0))
+            buckets[key] = (created_at, count + 1)
+
+    for (old_status, _, food_type), (created_at, count) in buckets.items():
+        rollups.move(connection, created_at, food_type, old_status, 'expired', count)
+
+    cancelled = db.session.execute(
+        update(Request)
+        .where(Request.donation_id.in_(expired_ids), Request.status == 'pending')
+        .values(status='cancelled', updated_at=now)
+        .returning(Request.ngo_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.session.commit()
+
+    if expired_ids:
+        events.publish('donation.expired', {'ids': expired_ids},
+                       user_ids=donor_ids | {row.ngo_id for row in cancelled},
+                       roles=('ngo', 'admin'))
+    return len(expired_ids), len(cancelled)
+
+
+def sweep(batch_size=None, now=None):
+    """Expire overdue donations in short LIMIT-sized transactions.
+
+    Returns this run's metrics, or None if another sweep in this process
+    holds the lock. Sweeps in other processes are harmless: every UPDATE is
+    conditional on the row still being sweepable.
+    """
+    if not _sweep_lock.acquire(blocking=False):
+        return None
+    try:
+        batch_size = batch_size or current_app.config.get('EXPIRY_SWEEP_BATCH_SIZE', 500)
+        now = now or datetime.utcnow()
+        started = time.perf_counter()
+        batches = expired = cancelled = 0
+        while True:
+            ids = _expired_ids(now, batch_size)
+            if not ids:
+                break
+            batch_expired, batch_cancelled = _expire_batch(ids, now)
+            batches += 1
+            expired += batch_expired
+            cancelled += batch_cancelled
+            if len(ids) < batch_size:
+                break
+
+        metrics = {
+            'started_at': now.isoformat(),
+            'batches': batches,
+            'donations_expired': expired,
+            'requests_cancelled': cancelled,
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+        stats = current_app.extensions['expiry_sweeper']
+        stats['runs'] += 1
+        stats['donations_expired_total'] += expired
+        stats['requests_cancelled_total'] += cancelled
+        stats['last_run'] = metrics
+        current_app.logger.info('expiry sweep: %s', json.dumps(metrics))
+        return metrics
+    finally:
+        _sweep_lock.release()
+
+
+def _run_forever(app, interval, stop):
+    while not stop.is_set():
+        with app.app_context():
+            try:
+                sweep()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('expiry sweep failed')
+            finally:
+                db.session.remove()
+        stop.wait(interval)
+
+
+def start_scheduler(app):
+    """Sweep every EXPIRY_SWEEP_INTERVAL seconds on a daemon thread."""
+    interval = app.config.get('EXPIRY_SWEEP_INTERVAL', 0)
+    if not interval:
+        return None
+    stop = threading.Event()
+    thread = threading.Thread(target=_run_forever, args=(app, interval, stop),
+                              name='expiry-sweeper', daemon=True)
+    thread.start()
+    return stop
+
+
+@expiry_cli.command('sweep')
+@click.option('--batch-size', type=int, default=None, help='Rows per transaction.')
+def sweep_command(batch_size):
+    """Expire overdue donations once and print the run's metrics."""
+    click.echo(json.dumps(sweep(batch_size)))
+
+
+@expiry_cli.command('worker')
+@click.option('--interval', type=float, default=None, help='Seconds between sweeps.')
+def worker_command(interval):
+    """Sweep on a fixed interval until interrupted."""
+    interval = interval or current_app.config.get('EXPIRY_SWEEP_INTERVAL') or 60
+    _run_forever(current_app._get_current_object(), interval, threading.Event())
@@ -0,0 +1,168 @@
+import csv
+import json
+import math
+import os
+import re
+import threading
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, select, update
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Grid cells are GRID_DEGREES on a side (~5.5 km of latitude). A cell id
+# numbers cells row by row, so one latitude row of a bounding box is a single
+# contiguous id range and the (status, geo_cell) index answers it directly.
+GRID_DEGREES = 0.05
+GRID_COLUMNS = int(round(360 / GRID_DEGREES))
+
+DEFAULT_GAZETTEER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'gazetteer.csv')
+
+BACKFILL_BATCH_SIZE = 1000
+
+geo_cli = AppGroup('geo', help='Maintain donation coordinates.')
+
+_gazetteers = {}
+_gazetteer_lock = threading.Lock()
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _row(lat):
+    return int(math.floor((lat + 90) / GRID_DEGREES))
+
+
+def _column(lng):
+    return min(GRID_COLUMNS - 1, int(math.floor((lng + 180) / GRID_DEGREES)))
+
+
+def grid_cell(lat, lng):
+    return _row(lat) * GRID_COLUMNS + _column(lng)
+
+
+def bounding_box(lat, lng, radius_km):
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    # Widen by the cosine of the latitude nearest the pole for longitude spans
+    edge_lat = min(89.9, abs(lat) + dlat)
+    dlng = radius_km / (KM_PER_DEGREE_LAT * math.cos(math.radians(edge_lat)))
+    return (
+        max(-90.0, lat - dlat), min(90.0, lat + dlat),
+        max(-180.0, lng - dlng), min(180.0, lng + dlng),
+    )
+
+
+def cell_ranges(min_lat, max_lat, min_lng, max_lng):
+    first, last = _column(min_lng), _column(max_lng)
+    return [
+        (row * GRID_COLUMNS + first, row * GRID_COLUMNS + last)
+        for row in range(_row(min_lat), _row(max_lat) + 1)
+    ]
+
+
+def parse_point(raw):
+    lat, lng = (float(part) for part in raw.split(','))
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError('Coordinates out of range')
+    return lat, lng
+
+
+def _normalize(text):
+    return re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()
+
+
+def _load_gazetteer(path):
+    places = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            places[_normalize(row['name'])] = (float(row['latitude']), float(row['longitude']))
+    return places
+
+
+def gazetteer():
+    path = current_app.config.get('GAZETTEER_PATH') or DEFAULT_GAZETTEER
+    places = _gazetteers.get(path)
+    if places is None:
+        with _gazetteer_lock:
+            places = _gazetteers.get(path)
+            if places is None:
+                places = _gazetteers[path] = _load_gazetteer(path)
+    return places
+
+
+def geocode(location):
+    """Best-effort offline lookup of a free-text address against the gazetteer.
+
+    Addresses run from specific to general ("Bandra, Mumbai"), so the place
+    mentioned first wins; a longer name wins at the same position.
+    """
+    if not location:
+        return None
+    padded = f' {_normalize(location)} '
+    best = None
+    for name, point in gazetteer().items():
+        at = padded.find(f' {name} ')
+        if at >= 0:
+            rank = (at, -len(name))
+            if best is None or rank < best[0]:
+                best = (rank, point)
+    return best[1] if best else None
+
+
+def backfill(batch_size=None):
+    """Geocode donations saved without coordinates, one batch per transaction.
+
+    Rows whose location the gazetteer doesn't know keep NULL coordinates.
+    updated_at is left alone: it drives list ETags and the archive cutoff.
+    """
+    # app.models imports this module for grid_cell
+    from app import db
+    from app.models import Donation
+
+    batch_size = batch_size or BACKFILL_BATCH_SIZE
+    table = Donation.__table__
+    scanned = geocoded = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, table.c.location)
+            .where(table.c.latitude.is_(None), table.c.id > last_id)
+            .order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        scanned += len(rows)
+        found = []
+        for row in rows:
+            point = geocode(row.location)
+            if point is not None:
+                found.append({'_id': row.id, 'latitude': point[0], 'longitude': point[1],
+                              'geo_cell': grid_cell(*point)})
+        if found:
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('_id'))
+                .values(latitude=bindparam('latitude'), longitude=bindparam('longitude'),
+                        geo_cell=bindparam('geo_cell')),
+                found,
+            )
+            geocoded += len(found)
+        db.session.commit()
+        if len(rows) < batch_size:
+            break
+    return {'scanned': scanned, 'geocoded': geocoded}
+
+
+@geo_cli.command('backfill')
+@click.option('--batch-size', type=int, default=None, help='Donations per transaction.')
+def backfill_command(batch_size):
+    """Geocode donations that have no coordinates yet and print the counts."""
+    click.echo(json.dumps(backfill(batch_size)))
@@ -0,0 +1,65 @@
+from collections import namedtuple
+
+from flask import current_app
+from flask_jwt_extended import current_user, get_jwt
+
+from app import db, jwt
+from app.models import User
+from app.utils.cache import TTLCache
+
+# Detached, read-only view of the token's user; safe to share across requests
+CurrentUser = namedtuple('CurrentUser', [
+    'id', 'username', 'email', 'role', 'organization_name',
+    'contact_number', 'address', 'is_approved',
+])
+
+
+def init_app(app):
+    app.extensions['current_user_cache'] = TTLCache(
+        maxsize=app.config.get('CURRENT_USER_CACHE_SIZE', 1024),
+        ttl=app.config.get('CURRENT_USER_CACHE_TTL', 60),
+    )
+
+
+def _cache():
+    return current_app.extensions['current_user_cache']
+
+
+def identity_claims(user):
+    return {
+        'role': user.role,
+        'is_approved': bool(user.is_approved),
+    }
+
+
+@jwt.user_lookup_loader
+def load_current_user(_jwt_header, jwt_data):
+    user_id = int(jwt_data['sub'])
+    cached = _cache().get(user_id)
+    if cached is not None:
+        return cached
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    snapshot = CurrentUser(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        role=user.role,
+        organization_name=user.organization_name,
+        contact_number=user.contact_number,
+        address=user.address,
+        is_approved=bool(user.is_approved),
+    )
+    _cache().set(user_id, snapshot)
+    return snapshot
+
+
+def invalidate(user_id):
+    _cache().pop(int(user_id))
+
+
+def current_role():
+    # Tokens issued at login carry the role; older ones fall back to the cache
+    return get_jwt().get('role') or current_user.role
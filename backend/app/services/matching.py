@@ -0,0 +1,383 @@
+import math
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+
+from app import db
+from app.models import User
+from app.services import archive, events, geo
+from app.services.geo import EARTH_RADIUS_KM
+from app.utils.helpers import count_if
+
+# Each input is scaled to [0, 1] before weighting, so a score is in [0, 1]
+WEIGHTS = {
+    'distance': 0.4,
+    'food_type': 0.25,
+    'collection_rate': 0.2,
+    'urgency': 0.15,
+}
+DISTANCE_SCALE_KM = 10.0
+# Closeness bottoms out at exp(-30): anything smaller would only produce
+# subnormal floats, which are an order of magnitude slower to compute with
+_MAX_CHORD_SQUARED = (30 * DISTANCE_SCALE_KM / EARTH_RADIUS_KM) ** 2
+URGENCY_SCALE_HOURS = 12.0
+# Stand-in when an input is unknown, e.g. an NGO address the gazetteer lacks
+NEUTRAL = 0.5
+CLOSED_REQUEST_STATUSES = ('collected', 'rejected', 'cancelled')
+KNOWN_FOOD_TYPES = ('vegetarian', 'non-vegetarian', 'vegan')
+# Donation rows scored per step; keeps the donations x NGOs block in cache
+CHUNK_ROWS = 256
+
+
+def _radians(degrees):
+    return np.radians(np.asarray(degrees, dtype=np.float64)).astype(np.float32)
+
+
+def _unit_vectors(lat, lng):
+    # Points on the unit sphere: a dot product gives the angle between them,
+    # so all pairwise distances come out of one matrix multiply. Unknown
+    # points become zero vectors, whose closeness underflows to 0; score()
+    # adds the neutral value back through the linear terms.
+    lat = np.asarray(lat, dtype=np.float32)
+    lng = np.asarray(lng, dtype=np.float32)
+    xyz = np.stack([np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)], axis=1)
+    return np.nan_to_num(xyz, nan=0.0)
+
+
+def _unplaced(xyz):
+    return (~xyz.any(axis=1)).astype(np.float32)
+
+
+class NgoFeatures:
+    """Per-NGO feature vectors, one row per approved NGO.
+
+    Coordinates are in radians (NaN when unknown). ``prefs`` has a column
+    per food type in ``food_types`` plus a final neutral column that
+    donations of any other food type map to.
+    """
+
+    def __init__(self, ids, lat, lng, food_types, prefs, collection_rates):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.xyz = _unit_vectors(lat, lng)
+        self.food_types = {food_type: column for column, food_type in enumerate(food_types)}
+        self.prefs = np.asarray(prefs, dtype=np.float32)
+        self.collection_rates = np.asarray(collection_rates, dtype=np.float32)
+        self.rows = {ngo_id: row for row, ngo_id in enumerate(self.ids.tolist())}
+        # Right-hand side of the linear terms, see score()
+        unplaced = _unplaced(self.xyz)[:, None]
+        self.linear = np.hstack([
+            self.prefs,
+            np.ones((len(self.ids), 1), dtype=np.float32),
+            WEIGHTS['collection_rate'] * self.collection_rates[:, None]
+            + WEIGHTS['distance'] * NEUTRAL * unplaced,
+            1 - unplaced,
+        ]).astype(np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class DonationFeatures:
+    def __init__(self, ids, lat, lng, food_columns, hours_left, xyz=None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.xyz = _unit_vectors(lat, lng) if xyz is None else xyz
+        self.food_columns = np.asarray(food_columns, dtype=np.int64)
+        self.hours_left = np.asarray(hours_left, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, rows):
+        return DonationFeatures(
+            self.ids[rows], None, None,
+            self.food_columns[rows], self.hours_left[rows], xyz=self.xyz[rows]
+        )
+
+    def linear(self, pref_columns):
+        # Times NgoFeatures.linear transposed this gives every term of score()
+        # except closeness between two known points:
+        #   w_f * pref[food type] + w_u * urgency + w_c * collection rate
+        #   + w_d * NEUTRAL where either side has no location
+        rows = np.zeros((len(self.ids), pref_columns + 3), dtype=np.float32)
+        rows[np.arange(len(self.ids)), self.food_columns] = WEIGHTS['food_type']
+        rows[:, -3] = WEIGHTS['urgency'] * np.exp(
+            -np.clip(self.hours_left, 0, None) / URGENCY_SCALE_HOURS
+        )
+        rows[:, -2] = 1.0
+        rows[:, -1] = WEIGHTS['distance'] * NEUTRAL * _unplaced(self.xyz)
+        return rows
+
+
+class _FeatureCache:
+    """The last NGO features built, and the one thread rebuilding them."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.features = None
+        self.built_at = 0.0
+        self.build_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.worker = None
+        self.waiting = []
+
+    def stale(self):
+        return time.monotonic() - self.built_at >= self.ttl
+
+
+def _cache():
+    # Made on first use: nothing imports this module (or numpy) until a
+    # request needs a match
+    cache = current_app.extensions.get('matching_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('matching_cache', _FeatureCache(
+            current_app.config.get('MATCHING_FEATURE_TTL', 300)
+        ))
+    return cache
+
+
+def _build(cache):
+    requested = time.monotonic()
+    with cache.build_lock:
+        # Whoever held the lock may have just built them
+        if cache.built_at > requested:
+            return cache.features
+        features = build_ngo_features()
+        cache.features, cache.built_at = features, time.monotonic()
+        return features
+
+
+def _rebuild(app, cache):
+    features = None
+    with app.app_context():
+        try:
+            features = _build(cache)
+        except Exception:
+            app.logger.exception('matching feature rebuild failed')
+        finally:
+            with cache.lock:
+                callbacks, cache.waiting, cache.worker = cache.waiting, [], None
+        if features is not None:
+            for callback in callbacks:
+                callback(features)
+
+
+def _rebuild_in_background(cache, then=None):
+    """Rebuild on one daemon thread, then call ``then(features)`` there.
+
+    With MATCHING_BACKGROUND_REBUILD off, this all happens in line.
+    """
+    app = current_app._get_current_object()
+    if not app.config.get('MATCHING_BACKGROUND_REBUILD', True):
+        features = _build(cache)
+        if then is not None:
+            then(features)
+        return
+    with cache.lock:
+        if then is not None:
+            cache.waiting.append(then)
+        if cache.worker is None:
+            cache.worker = threading.Thread(target=_rebuild, args=(app, cache),
+                                            name='matching-rebuild', daemon=True)
+            cache.worker.start()
+
+
+def _nan_if_none(value):
+    return math.nan if value is None else value
+
+
+def build_ngo_features(ngo_ids=None):
+    """Features for every approved NGO, or just those in ``ngo_ids``."""
+    query = User.query.filter(User.role == 'ngo', User.is_approved == True)
+    only = None
+    if ngo_ids is not None:
+        query = query.filter(User.id.in_(ngo_ids))
+        only = lambda c: c.ngo_id.in_(ngo_ids)
+    ngos = query.order_by(User.id).all()
+
+    # History across hot and archived rows: requests per (NGO, food type)
+    requests = archive.history('request', ['ngo_id', 'donation_id', 'status'], only)
+    donations = archive.history('donation', ['id', 'food_type'])
+    history = db.session.query(
+        requests.c.ngo_id,
+        donations.c.food_type,
+        db.func.count(),
+        count_if(requests.c.status == 'collected'),
+        count_if(requests.c.status.in_(CLOSED_REQUEST_STATUSES))
+    ).join(donations, donations.c.id == requests.c.donation_id).group_by(
+        requests.c.ngo_id, donations.c.food_type
+    ).all()
+
+    food_types = list(KNOWN_FOOD_TYPES)
+    for _, food_type, *_ in history:
+        if food_type and food_type not in food_types:
+            food_types.append(food_type)
+    columns = {food_type: column for column, food_type in enumerate(food_types)}
+    rows = {ngo.id: row for row, ngo in enumerate(ngos)}
+
+    counts = np.zeros((len(ngos), len(food_types)), dtype=np.float32)
+    collected = np.zeros(len(ngos), dtype=np.float32)
+    closed = np.zeros(len(ngos), dtype=np.float32)
+    for ngo_id, food_type, total, ngo_collected, ngo_closed in history:
+        row = rows.get(ngo_id)
+        if row is None:
+            continue
+        if food_type in columns:
+            counts[row, columns[food_type]] += total
+        collected[row] += ngo_collected
+        closed[row] += ngo_closed
+
+    # Smoothed shares relative to the NGO's favourite: no history means every
+    # food type scores 1, a strong habit pulls the others towards 0
+    shares = counts + 1.0
+    prefs = np.hstack([
+        shares / shares.max(axis=1, keepdims=True),
+        np.full((len(ngos), 1), NEUTRAL, dtype=np.float32),
+    ])
+    # Laplace-smoothed: a new NGO starts at 0.5
+    collection_rates = (collected + 1.0) / (closed + 2.0)
+
+    points = [geo.geocode(ngo.address) or (None, None) for ngo in ngos]
+    return NgoFeatures(
+        [ngo.id for ngo in ngos],
+        _radians([_nan_if_none(lat) for lat, _ in points]),
+        _radians([_nan_if_none(lng) for _, lng in points]),
+        food_types,
+        prefs,
+        collection_rates,
+    )
+
+
+def ngo_features():
+    """NGO features, rebuilt at most once per MATCHING_FEATURE_TTL.
+
+    Only the first call waits for a build; once they are older than the
+    TTL the old features are served while a background thread rebuilds.
+    """
+    cache = _cache()
+    if cache.features is None:
+        return _build(cache)
+    if cache.stale():
+        _rebuild_in_background(cache)
+    return cache.features
+
+
+def donation_features(rows, ngos, now=None):
+    """Vectorize (id, latitude, longitude, food_type, expiry_time) rows."""
+    now = now or datetime.utcnow()
+    unknown = len(ngos.food_types)
+    return DonationFeatures(
+        [row[0] for row in rows],
+        _radians([_nan_if_none(row[1]) for row in rows]),
+        _radians([_nan_if_none(row[2]) for row in rows]),
+        [ngos.food_types.get(row[3], unknown) for row in rows],
+        [(row[4] - now).total_seconds() / 3600 for row in rows],
+    )
+
+
+def score(donations, ngos, ngo_rows=None):
+    """Scores as a (donations x NGOs) float32 matrix.
+
+    ``ngo_rows`` restricts the NGO columns, e.g. to the one NGO asking for
+    recommendations.
+    """
+    if ngo_rows is None:
+        ngo_rows = slice(None)
+
+    # Chord length between unit vectors, sqrt(2 - 2 cos); within 0.03% of
+    # the great-circle distance up to 500 km, far past where closeness decays
+    closeness = donations.xyz @ ngos.xyz[ngo_rows].T
+    closeness *= -2
+    closeness += 2
+    np.clip(closeness, 0, _MAX_CHORD_SQUARED, out=closeness)
+    np.sqrt(closeness, out=closeness)
+    closeness *= -EARTH_RADIUS_KM / DISTANCE_SCALE_KM
+    np.exp(closeness, out=closeness)
+    closeness *= WEIGHTS['distance']
+
+    closeness += donations.linear(ngos.prefs.shape[1]) @ ngos.linear[ngo_rows].T
+    return closeness
+
+
+def _top_k(scores, k):
+    """Each row's ``k`` best (columns, scores), best first.
+
+    For small ``k``, repeated argmax beats argpartition by a wide margin.
+    Winners are overwritten with -inf, so ``scores`` must be scratch space.
+    """
+    rows = np.arange(scores.shape[0])
+    columns = np.empty((scores.shape[0], k), dtype=np.int64)
+    values = np.empty((scores.shape[0], k), dtype=scores.dtype)
+    for rank in range(k):
+        best = scores.argmax(axis=1)
+        columns[:, rank] = best
+        values[:, rank] = scores[rows, best]
+        scores[rows, best] = -np.inf
+    return columns, values
+
+
+def top_ngos(donations, ngos, k=5):
+    """Best ``k`` NGOs for each donation: (ngo ids, scores), both (D x k)."""
+    k = min(k, len(ngos))
+    best_ids = np.empty((len(donations), k), dtype=np.int64)
+    best_scores = np.empty((len(donations), k), dtype=np.float32)
+    for start in range(0, len(donations), CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, len(donations))
+        columns, values = _top_k(score(donations[start:stop], ngos), k)
+        best_ids[start:stop] = ngos.ids[columns]
+        best_scores[start:stop] = values
+    return best_ids, best_scores
+
+
+def recommend(ngo_id, donations, ngos, limit):
+    """Top ``limit`` (donation id, score) pairs for one NGO, best first."""
+    row = ngos.rows.get(ngo_id)
+    if row is None or not len(donations):
+        return []
+    scores = score(donations, ngos, [row])[:, 0]
+    limit = min(limit, len(scores))
+    top = np.argpartition(scores, -limit)[-limit:]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return [(int(donations.ids[i]), float(scores[i])) for i in top]
+
+
+def refresh():
+    """Rebuild the shared features in the background, e.g. once an NGO is approved.
+
+    Nothing to do if they have never been built: the first caller builds them.
+    """
+    cache = _cache()
+    if cache.features is not None:
+        _rebuild_in_background(cache)
+
+
+def _publish_matches(donation, ngos):
+    if not len(ngos):
+        return
+    donation_id, title, *row = donation
+    features = donation_features([(donation_id, *row)], ngos)
+    ngo_ids, scores = top_ngos(features, ngos, current_app.config.get('MATCHING_NOTIFY_TOP', 5))
+    for ngo_id, match_score in zip(ngo_ids[0].tolist(), scores[0].tolist()):
+        events.publish('donation.matched', {
+            'id': donation_id,
+            'title': title,
+            'score': round(match_score, 4),
+        }, user_ids=(ngo_id,))
+
+
+def notify_matches(donation):
+    """Tell the best-matched NGOs about a new donation over the event stream.
+
+    The donor's request never waits for a feature build: with none built
+    yet, the matches go out from the rebuild thread once it has finished.
+    """
+    # Plain values: the ORM instance belongs to this request's session
+    donation = (donation.id, donation.title, donation.latitude, donation.longitude,
+                donation.food_type, donation.expiry_time)
+    cache = _cache()
+    if cache.features is None:
+        _rebuild_in_background(cache, then=lambda ngos: _publish_matches(donation, ngos))
+        return
+    _publish_matches(donation, ngo_features())
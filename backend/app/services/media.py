@@ -0,0 +1,192 @@
+import hashlib
+import os
+import re
+import tempfile
+import warnings
+
+from flask import current_app, url_for
+
+CHUNK_SIZE = 64 * 1024
+THUMBNAIL_WIDTH = 320
+# Largest image decoded for thumbnails (width * height); MAX_IMAGE_PIXELS
+# overrides it. A small file can claim enormous dimensions.
+MAX_IMAGE_PIXELS = 50_000_000
+
+# Pillow format -> stored extension
+IMAGE_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+
+IMAGE_KEY = re.compile(r'^[0-9a-f]{64}\.(jpg|png|gif|webp)$')
+THUMBNAIL_NAME = re.compile(rf'^[0-9a-f]{{64}}_{THUMBNAIL_WIDTH}\.(webp|jpg)$')
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def media_root():
+    return current_app.config['UPLOAD_FOLDER']
+
+
+def original_path(key):
+    # Fan out on the first two hex digits so no directory grows unbounded
+    return os.path.join('images', key[:2], key)
+
+
+def thumbnail_path(key, fmt):
+    digest = key.split('.', 1)[0]
+    return os.path.join('thumbs', digest[:2], f'{digest}_{THUMBNAIL_WIDTH}.{fmt}')
+
+
+def is_image_key(value):
+    return bool(value) and IMAGE_KEY.match(value) is not None
+
+
+def is_media_path(relative_path):
+    """Whether a /media path names an original or thumbnail that store_image writes."""
+    parts = relative_path.split('/')
+    if len(parts) != 3:
+        return False
+    folder, fan_out, name = parts
+    if folder == 'images':
+        valid = is_image_key(name)
+    elif folder == 'thumbs':
+        valid = THUMBNAIL_NAME.match(name) is not None
+    else:
+        valid = False
+    return valid and fan_out == name[:2]
+
+
+def image_exists(key):
+    return is_image_key(key) and os.path.exists(os.path.join(media_root(), original_path(key)))
+
+
+def media_url(relative_path):
+    return url_for('media.serve_media', filename=relative_path.replace(os.sep, '/'), _external=True)
+
+
+def image_urls(key):
+    if not key:
+        return None, None
+    if not is_image_key(key):
+        # Legacy rows: keep external links, drop inline data URLs
+        return (None, None) if key.startswith('data:') else (key, key)
+    return media_url(original_path(key)), media_url(thumbnail_path(key, 'webp'))
+
+
+def _spool(stream):
+    """Copy an upload to a temp file under the media root, hashing as it streams."""
+    root = media_root()
+    os.makedirs(root, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=root, prefix='.upload-')
+    with os.fdopen(fd, 'wb') as out:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return tmp_path, digest.hexdigest()
+
+
+def _open_image(path):
+    # Pillow only warns between its limit and twice that; refuse those too,
+    # and anything over our own cap, before a single pixel is decoded
+    from PIL import Image
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', Image.DecompressionBombWarning)
+        img = Image.open(path)
+    limit = current_app.config.get('MAX_IMAGE_PIXELS', MAX_IMAGE_PIXELS)
+    if img.width * img.height > limit:
+        img.close()
+        raise InvalidImage(f'Image is larger than {limit} pixels')
+    return img
+
+
+def _detect_format(path):
+    # Pillow is imported on first upload rather than at app start-up
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with _open_image(path) as img:
+            fmt = img.format
+            img.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, Image.DecompressionBombWarning,
+            OSError, SyntaxError) as e:
+        raise InvalidImage('File is not a valid image') from e
+    if fmt not in IMAGE_FORMATS:
+        raise InvalidImage(f'Unsupported image format: {fmt}')
+    return IMAGE_FORMATS[fmt]
+
+
+def _save_atomically(img, target, fmt, options):
+    # Served as immutable, so a reader must never see a half-written file:
+    # write beside the target and rename over it
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.thumb-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            img.save(out, fmt, **options)
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _write_thumbnails(source, key):
+    from PIL import Image, ImageOps
+
+    root = media_root()
+    try:
+        with _open_image(source) as img:
+            img = ImageOps.exif_transpose(img)
+            if img.width > THUMBNAIL_WIDTH:
+                height = max(1, round(img.height * THUMBNAIL_WIDTH / img.width))
+                img = img.resize((THUMBNAIL_WIDTH, height), Image.LANCZOS)
+            img = img.convert('RGB')
+            for fmt, options in (('webp', {'quality': 80, 'method': 4}),
+                                 ('jpg', {'quality': 82, 'optimize': True, 'progressive': True})):
+                target = os.path.join(root, thumbnail_path(key, fmt))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                _save_atomically(img, target, 'WEBP' if fmt == 'webp' else 'JPEG', options)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning, OSError, SyntaxError) as e:
+        # verify() checks structure, not the pixel data; a bad stream fails here
+        raise InvalidImage('File is not a valid image') from e
+
+
+def _remove_quietly(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def store_image(file):
+    """Store an uploaded image once per distinct content and return its key."""
+    tmp_path, digest = _spool(file.stream)
+    try:
+        key = f'{digest}.{_detect_format(tmp_path)}'
+        target = os.path.join(media_root(), original_path(key))
+        stored = not os.path.exists(target)
+        if stored:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp_path, target)
+        if not os.path.exists(os.path.join(media_root(), thumbnail_path(key, 'jpg'))):
+            try:
+                _write_thumbnails(target, key)
+            except Exception:
+                # Don't leave an original behind that has no thumbnails
+                if stored:
+                    _remove_quietly(target, *(os.path.join(media_root(), thumbnail_path(key, fmt))
+                                              for fmt in ('webp', 'jpg')))
+                raise
+        return key
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
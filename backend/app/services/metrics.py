@@ -0,0 +1,245 @@
+import bisect
+import json
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+# Statements kept per slow request, slowest first
+SLOW_LOG_STATEMENTS = 20
+SLOW_LOG_STATEMENT_CHARS = 500
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value) if value != int(value) or abs(value) >= 1e15 else str(int(value))
+    return str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = defaultdict(float)
+
+    def inc(self, label_values=(), amount=1):
+        self._values[label_values] += amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        for label_values, value in sorted(self._values.items()):
+            yield f'{self.name}{_labels(self.labels, label_values)} {_number(value)}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    def __init__(self, name, documentation, buckets, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        # Per label set: [count per bucket (+Inf last), sum, count]
+        self._series = {}
+
+    def observe(self, label_values, value):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def totals(self):
+        """(sum, count) over every label set."""
+        return (sum(series[1] for series in self._series.values()),
+                sum(series[2] for series in self._series.values()))
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        for label_values, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                le = bound if bound == '+Inf' else _number(float(bound))
+                labels = _labels(self.labels, label_values, [('le', le)])
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _labels(self.labels, label_values)
+            yield f'{self.name}_sum{labels} {_number(total)}'
+            yield f'{self.name}_count{labels} {count}'
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        endpoint = ('endpoint', 'method')
+        self.requests = Counter(
+            'http_requests_total', 'Requests handled, by endpoint and status.',
+            ('endpoint', 'method', 'status'))
+        self.latency = Histogram(
+            'http_request_duration_seconds', 'Time to produce the response.',
+            LATENCY_BUCKETS, endpoint)
+        self.sql_statements = Histogram(
+            'http_request_sql_statements', 'SQL statements executed per request.',
+            QUERY_COUNT_BUCKETS, endpoint)
+        self.sql_seconds = Histogram(
+            'http_request_sql_duration_seconds', 'Time spent in SQL per request.',
+            LATENCY_BUCKETS, endpoint)
+        self.response_size = Histogram(
+            'http_response_size_bytes', 'Response body size; streamed bodies are not counted.',
+            SIZE_BUCKETS, endpoint)
+
+    def record(self, endpoint, method, status, seconds, statements, sql_seconds, size):
+        key = (endpoint, method)
+        with self.lock:
+            self.requests.inc((endpoint, method, str(status)))
+            self.latency.observe(key, seconds)
+            self.sql_statements.observe(key, statements)
+            self.sql_seconds.observe(key, sql_seconds)
+            if size is not None:
+                self.response_size.observe(key, size)
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for metric in (self.requests, self.latency, self.sql_statements,
+                           self.sql_seconds, self.response_size):
+                lines.extend(metric.render())
+        return lines
+
+
+class _RequestTally:
+    __slots__ = ('started', 'statements', 'sql_seconds', 'captured')
+
+    def __init__(self, capture):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.captured = [] if capture else None
+
+
+def _tally():
+    if not has_app_context():
+        return None
+    return g.get('_metrics_tally')
+
+
+# Class-level, so every engine (and any future bind) is covered; statements
+# outside an instrumented request cost one context lookup
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _tally() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    tally = _tally()
+    if started is None or tally is None:
+        return
+    elapsed = time.perf_counter() - started
+    tally.statements += 1
+    tally.sql_seconds += elapsed
+    if tally.captured is not None:
+        tally.captured.append((elapsed, statement))
+
+
+def _before_request():
+    g._metrics_tally = _RequestTally(current_app.config.get('SLOW_REQUEST_SECONDS') is not None)
+
+
+def _after_request(response):
+    tally = g.pop('_metrics_tally', None)
+    if tally is None:
+        return response
+    seconds = time.perf_counter() - tally.started
+    endpoint = request.endpoint or 'unmatched'
+    size = None if response.is_streamed else response.calculate_content_length()
+    current_app.extensions['metrics'].record(
+        endpoint, request.method, response.status_code,
+        seconds, tally.statements, tally.sql_seconds, size)
+
+    threshold = current_app.config.get('SLOW_REQUEST_SECONDS')
+    if threshold is not None and seconds >= threshold:
+        slowest = sorted(tally.captured, key=lambda item: item[0], reverse=True)
+        current_app.logger.warning('slow request: %s', json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'seconds': round(seconds, 4),
+            'sql_statements': tally.statements,
+            'sql_seconds': round(tally.sql_seconds, 4),
+            'slowest_statements': [
+                {'seconds': round(elapsed, 4), 'sql': statement[:SLOW_LOG_STATEMENT_CHARS]}
+                for elapsed, statement in slowest[:SLOW_LOG_STATEMENTS]
+            ],
+        }))
+    return response
+
+
+def init_app(app):
+    app.extensions['metrics'] = Registry()
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+def _sample(name, documentation, value, kind='gauge'):
+    return [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}', f'{name} {_number(value)}']
+
+
+def pool_stats(engine):
+    """Checked-in/out connection counts; pools without a fixed size report None."""
+    pool = engine.pool
+    stats = {'class': type(pool).__name__}
+    for key, method in (('size', 'size'), ('checked_in', 'checkedin'),
+                        ('checked_out', 'checkedout'), ('overflow', 'overflow')):
+        try:
+            stats[key] = getattr(pool, method)()
+        except (AttributeError, NotImplementedError):
+            stats[key] = None
+    return stats
+
+
+def render(app, engine):
+    """Every metric as Prometheus text: request histograms, pool and worker stats."""
+    lines = app.extensions['metrics'].render()
+    pool = pool_stats(engine)
+    for key in ('size', 'checked_in', 'checked_out', 'overflow'):
+        if pool[key] is not None:
+            lines += _sample(f'db_pool_{key}', f'Connection pool {key.replace("_", " ")}.', pool[key])
+
+    sweeper = app.extensions.get('expiry_sweeper')
+    if sweeper:
+        lines += _sample('expiry_sweeper_runs_total', 'Expiry sweeps completed.',
+                        sweeper['runs'], 'counter')
+        lines += _sample('expiry_donations_expired_total', 'Donations expired by the sweeper.',
+                        sweeper['donations_expired_total'], 'counter')
+    outbox = app.extensions.get('outbox')
+    if outbox:
+        lines += _sample('outbox_sent_total', 'Emails delivered from the outbox.',
+                        outbox['sent_total'], 'counter')
+        lines += _sample('outbox_failed_total', 'Outbox delivery attempts that failed.',
+                        outbox['failed_total'], 'counter')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,251 @@
+import json
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from email.charset import QP, Charset
+from email.header import Header
+from email.mime.text import MIMEText
+from email.utils import formatdate
+
+import click
+from flask import current_app, render_template
+from flask.cli import AppGroup
+from flask_mail import Message
+from sqlalchemy import insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db, mail
+from app.models import OutboxEmail
+
+outbox_cli = AppGroup('outbox', help='Deliver queued email notifications.')
+
+_drain_lock = threading.Lock()
+
+_UTF8 = Charset('utf-8')
+_UTF8.body_encoding = QP
+
+
+def init_app(app):
+    if app.config.get('MAIL_USERNAME') and not (app.config.get('MAIL_USE_TLS')
+                                                or app.config.get('MAIL_USE_SSL')):
+        # Flask-Mail would log in over plaintext
+        raise ValueError('MAIL_USERNAME is set: turn on MAIL_USE_TLS or MAIL_USE_SSL')
+    app.extensions['outbox'] = {
+        'runs': 0,
+        'sent_total': 0,
+        'failed_total': 0,
+        'last_run': None,
+    }
+
+
+def enqueue(recipient, subject, template, context=None, dedupe_key=None):
+    """Queue an email in the caller's transaction; nothing is sent until it commits.
+
+    A second enqueue with the same ``dedupe_key`` is silently dropped, even
+    from a concurrent transaction.
+    """
+    values = {
+        'recipient': recipient,
+        'subject': subject,
+        'template': template,
+        'context': json.dumps(context or {}, default=str),
+        'dedupe_key': dedupe_key,
+    }
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        db.session.execute(
+            dialect_insert(OutboxEmail).values(**values)
+            .on_conflict_do_nothing(index_elements=['dedupe_key'])
+        )
+        return
+    if dedupe_key is None or not OutboxEmail.query.filter_by(dedupe_key=dedupe_key).first():
+        db.session.execute(insert(OutboxEmail).values(**values))
+
+
+def _claim(now, batch_size, lease):
+    # Pushing next_attempt_at past the lease hides the rows from other
+    # workers; if this one dies mid-batch they come due again afterwards
+    due = [row.id for row in db.session.query(OutboxEmail.id).filter(
+        OutboxEmail.status == 'pending',
+        OutboxEmail.next_attempt_at <= now
+    ).order_by(OutboxEmail.next_attempt_at, OutboxEmail.id).limit(batch_size)]
+    if not due:
+        return []
+    claimed = db.session.execute(
+        update(OutboxEmail)
+        .where(OutboxEmail.id.in_(due), OutboxEmail.status == 'pending',
+               OutboxEmail.next_attempt_at <= now)
+        .values(next_attempt_at=now + lease)
+        .returning(OutboxEmail.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.session.commit()
+    return sorted(row.id for row in claimed)
+
+
+class _HtmlMessage(Message):
+    """Serialized as one text/html part instead of Flask-Mail's multipart tree.
+
+    Notifications have no attachments or text alternative, and building the
+    full tree through the SMTP email policy costs several times more than
+    the send itself.
+    """
+
+    def as_bytes(self):
+        part = MIMEText(self.html, 'html', _UTF8)
+        part['Subject'] = Header(self.subject, 'utf-8')
+        part['From'] = self.sender
+        part['To'] = ', '.join(self.recipients)
+        part['Date'] = formatdate(self.date, localtime=True)
+        part['Message-ID'] = self.msgId
+        return part.as_bytes()
+
+
+def _message(row):
+    return _HtmlMessage(
+        subject=row.subject,
+        recipients=[row.recipient],
+        html=render_template(f'email/{row.template}', **json.loads(row.context)),
+        sender=current_app.config['MAIL_DEFAULT_SENDER'],
+    )
+
+
+def _retry_delay(attempts):
+    config = current_app.config
+    return timedelta(seconds=min(
+        config['OUTBOX_RETRY_BASE_SECONDS'] * 2 ** (attempts - 1),
+        config['OUTBOX_RETRY_MAX_SECONDS'],
+    ))
+
+
+def _record(sent_ids, failures):
+    """Mark delivered rows sent and reschedule or give up on failed ones."""
+    now = datetime.utcnow()
+    if sent_ids:
+        db.session.execute(
+            update(OutboxEmail)
+            .where(OutboxEmail.id.in_(sent_ids))
+            .values(status='sent', sent_at=now, attempts=OutboxEmail.attempts + 1,
+                    last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+    given_up = 0
+    max_attempts = current_app.config['OUTBOX_MAX_ATTEMPTS']
+    for row in OutboxEmail.query.filter(OutboxEmail.id.in_(list(failures))):
+        row.attempts += 1
+        row.last_error = failures[row.id][:1000]
+        if row.attempts >= max_attempts:
+            row.status = 'failed'
+            given_up += 1
+        else:
+            row.next_attempt_at = now + _retry_delay(row.attempts)
+    db.session.commit()
+    return given_up
+
+
+def _deliver(connection, ids, progress):
+    for row in OutboxEmail.query.filter(OutboxEmail.id.in_(ids)).order_by(OutboxEmail.id):
+        try:
+            connection.send(_message(row))
+        except smtplib.SMTPServerDisconnected:
+            raise
+        except (smtplib.SMTPException, ValueError, LookupError) as exc:
+            # This message alone was refused or could not be built
+            progress['failures'][row.id] = f'{type(exc).__name__}: {exc}'
+        else:
+            progress['sent'].append(row.id)
+
+
+def drain(batch_size=None, now=None):
+    """Send every due email, ``batch_size`` rows per transaction, over one SMTP connection.
+
+    Returns this run's metrics, or None if another drain in this process
+    holds the lock.
+    """
+    if not _drain_lock.acquire(blocking=False):
+        return None
+    try:
+        config = current_app.config
+        batch_size = batch_size or config['OUTBOX_BATCH_SIZE']
+        now = now or datetime.utcnow()
+        lease = timedelta(seconds=config['OUTBOX_LEASE_SECONDS'])
+        started = time.perf_counter()
+        batches = sent = failed = given_up = 0
+        error = None
+
+        # Claimed rows whose outcome is not recorded yet
+        outstanding = _claim(now, batch_size, lease)
+        progress = {'sent': [], 'failures': {}}
+        try:
+            if outstanding:
+                with mail.connect() as connection:
+                    while outstanding:
+                        _deliver(connection, outstanding, progress)
+                        given_up += _record(progress['sent'], progress['failures'])
+                        batches += 1
+                        sent += len(progress['sent'])
+                        failed += len(progress['failures'])
+                        claimed, outstanding = len(outstanding), []
+                        progress = {'sent': [], 'failures': {}}
+                        if claimed == batch_size:
+                            outstanding = _claim(now, batch_size, lease)
+        except (smtplib.SMTPException, OSError) as exc:
+            # The connection itself failed: whatever was claimed but not
+            # delivered goes back on the retry schedule
+            error = f'{type(exc).__name__}: {exc}'
+            delivered = set(progress['sent'])
+            for row_id in outstanding:
+                if row_id not in delivered:
+                    progress['failures'].setdefault(row_id, error)
+            given_up += _record(progress['sent'], progress['failures'])
+            sent += len(progress['sent'])
+            failed += len(progress['failures'])
+
+        metrics = {
+            'started_at': now.isoformat(),
+            'batches': batches,
+            'sent': sent,
+            'failed': failed,
+            'given_up': given_up,
+            'error': error,
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+        stats = current_app.extensions['outbox']
+        stats['runs'] += 1
+        stats['sent_total'] += sent
+        stats['failed_total'] += failed
+        stats['last_run'] = metrics
+        current_app.logger.info('outbox drain: %s', json.dumps(metrics))
+        return metrics
+    finally:
+        _drain_lock.release()
+
+
+def _run_forever(app, interval, stop):
+    while not stop.is_set():
+        with app.app_context():
+            try:
+                drain()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('outbox drain failed')
+            finally:
+                db.session.remove()
+        stop.wait(interval)
+
+
+@outbox_cli.command('drain')
+@click.option('--batch-size', type=int, default=None, help='Rows per transaction.')
+def drain_command(batch_size):
+    """Send due emails once and print the run's metrics."""
+    click.echo(json.dumps(drain(batch_size)))
+
+
+@outbox_cli.command('worker')
+@click.option('--interval', type=float, default=None, help='Seconds between polls.')
+def worker_command(interval):
+    """Poll the outbox until interrupted."""
+    interval = interval or current_app.config['OUTBOX_POLL_INTERVAL']
+    _run_forever(current_app._get_current_object(), interval, threading.Event())
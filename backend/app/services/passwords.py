@@ -0,0 +1,70 @@
+from concurrent.futures import ProcessPoolExecutor
+import threading
+
+from flask import current_app
+
+DEFAULT_LOG_ROUNDS = 12
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _hash(password, rounds):
+    # Imported on first use; workers that never hash shouldn't load it
+    import bcrypt
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check(password, password_hash):
+    import bcrypt
+    return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+
+
+def _executor():
+    global _pool
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS', 2)
+    if not workers:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=workers)
+    return _pool
+
+
+def _run(fn, *args):
+    # bcrypt is deliberately CPU-heavy; a small process pool caps how many
+    # cores a login burst can take from the I/O-bound request threads
+    pool = _executor()
+    if pool is None:
+        return fn(*args)
+    return pool.submit(fn, *args).result()
+
+
+def log_rounds():
+    return current_app.config.get('BCRYPT_LOG_ROUNDS', DEFAULT_LOG_ROUNDS)
+
+
+def hash_password(password):
+    return _run(_hash, password, log_rounds())
+
+
+def check_password(password, password_hash):
+    return _run(_check, password, password_hash)
+
+
+def needs_rehash(password_hash):
+    # bcrypt hashes look like $2b$<cost>$<salt+digest>
+    try:
+        cost = int(password_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return cost != log_rounds()
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
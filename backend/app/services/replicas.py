@@ -0,0 +1,94 @@
+"""Send read-only endpoints to a replica database, everything else to the primary.
+
+Set REPLICA_DATABASE_URL and GET views marked with
+:func:`reads_from_replica` run their SELECTs against it; writes,
+flushes and every other endpoint stay on the primary. A user whose own
+request wrote to the primary reads from the primary for the next
+REPLICA_STICKY_SECONDS, so they see their change however far the replica
+lags. That memory is per process: behind several workers, set the window
+to cover the replica's usual lag and expect a request that lands on
+another worker to read from the replica.
+
+The replica engine lives in ``app.extensions`` rather than
+SQLALCHEMY_BINDS: binds partition models between databases, and this is
+the same tables twice. This module is imported before ``app.db`` exists.
+"""
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from flask_sqlalchemy.session import Session
+from jwt.exceptions import PyJWTError
+from sqlalchemy import create_engine
+
+from app.utils.cache import TTLCache
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+def reads_from_replica(view):
+    """Mark a view whose GETs may be served from the replica."""
+    view.reads_from_replica = True
+    return view
+
+
+class RoutingSession(Session):
+    """Session that reads from the replica during marked requests."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or getattr(clause, 'is_dml', False):
+                g._wrote_primary = True
+            elif g.get('_read_replica'):
+                return current_app.extensions['replica_engine']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _sticky():
+    return current_app.extensions['replica_sticky']
+
+
+def _requester():
+    # The view's own @jwt_required() runs later and turns bad tokens away;
+    # here an unreadable token just means nobody to keep on the primary
+    try:
+        verify_jwt_in_request(optional=True)
+    except (JWTExtendedException, PyJWTError):
+        return None
+    return get_jwt_identity()
+
+
+def _before_request():
+    view = current_app.view_functions.get(request.endpoint)
+    if request.method not in READ_METHODS or not getattr(view, 'reads_from_replica', False):
+        return
+    user_id = _requester()
+    g._read_replica = user_id is None or _sticky().get(user_id) is None
+
+
+def _after_request(response):
+    if g.pop('_wrote_primary', False) and response.status_code < 400:
+        try:
+            user_id = get_jwt_identity()
+        except RuntimeError:
+            # No token checked on this route (e.g. login)
+            user_id = None
+        if user_id is not None:
+            _sticky().set(user_id, True)
+    return response
+
+
+def init_app(app):
+    from app.services import database
+
+    url = app.config.get('REPLICA_DATABASE_URL')
+    if not url:
+        return
+    engine = create_engine(url, **database.engine_options({'SQLALCHEMY_DATABASE_URI': url}))
+    database.listen_for_pragmas(engine, app.config.get('SQLITE_PRAGMAS'))
+    app.extensions['replica_engine'] = engine
+    app.extensions['replica_sticky'] = TTLCache(
+        maxsize=app.config.get('REPLICA_STICKY_SIZE', 10_000),
+        ttl=app.config.get('REPLICA_STICKY_SECONDS', 5),
+    )
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,176 @@
+from datetime import timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models import Donation, DonationDailyRollup
+
+UNSPECIFIED_FOOD_TYPE = 'unspecified'
+# The timeline has an entry per day, so a report spans at most this many
+MAX_REPORT_DAYS = 366
+
+rollup_cli = AppGroup('rollups', help='Maintain the donation_daily_rollup table.')
+
+
+def _key(created_at, status, food_type):
+    return (
+        created_at.date(),
+        status or 'available',
+        food_type or UNSPECIFIED_FOOD_TYPE,
+    )
+
+
+def bump(connection, key, delta):
+    table = DonationDailyRollup.__table__
+    day, status, food_type = key
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        # One statement, so two transactions opening the same bucket can't
+        # both try to insert it
+        dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = dialect_insert(table).values(
+            day=day, status=status, food_type=food_type, count=delta
+        )
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=['day', 'status', 'food_type'],
+            set_={'count': table.c.count + statement.excluded.count}
+        ))
+        return
+    match = (
+        (table.c.day == day)
+        & (table.c.status == status)
+        & (table.c.food_type == food_type)
+    )
+    result = connection.execute(
+        table.update().where(match).values(count=table.c.count + delta)
+    )
+    if result.rowcount == 0:
+        connection.execute(
+            table.insert().values(day=day, status=status, food_type=food_type, count=delta)
+        )
+
+
+def add(connection, created_at, food_type, status, count=1):
+    # For bulk INSERTs that bypass the ORM
+    bump(connection, _key(created_at, status, food_type), count)
+
+
+def move(connection, created_at, food_type, old_status, new_status, count=1):
+    # For bulk UPDATEs that bypass the ORM: shift rows between status buckets
+    bump(connection, _key(created_at, old_status, food_type), -count)
+    bump(connection, _key(created_at, new_status, food_type), count)
+
+
+def _committed_value(target, attr):
+    history = inspect(target).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, attr)
+
+
+# Loads the previous value on assignment (even when expired) so the update
+# hook knows which bucket to decrement
+@event.listens_for(Donation.status, 'set', active_history=True)
+@event.listens_for(Donation.food_type, 'set', active_history=True)
+def _track_previous_bucket(target, value, oldvalue, initiator):
+    pass
+
+
+@event.listens_for(Donation, 'after_insert')
+def _donation_inserted(mapper, connection, target):
+    bump(connection, _key(target.created_at, target.status, target.food_type), 1)
+
+
+@event.listens_for(Donation, 'after_update')
+def _donation_updated(mapper, connection, target):
+    state = inspect(target)
+    if not (state.attrs.status.history.has_changes()
+            or state.attrs.food_type.history.has_changes()):
+        return
+
+    old_key = _key(
+        target.created_at,
+        _committed_value(target, 'status'),
+        _committed_value(target, 'food_type'),
+    )
+    new_key = _key(target.created_at, target.status, target.food_type)
+    if old_key != new_key:
+        bump(connection, old_key, -1)
+        bump(connection, new_key, 1)
+
+
+@event.listens_for(Donation, 'after_delete')
+def _donation_deleted(mapper, connection, target):
+    key = _key(
+        target.created_at,
+        _committed_value(target, 'status'),
+        _committed_value(target, 'food_type'),
+    )
+    bump(connection, key, -1)
+
+
+def backfill():
+    """Rebuild the rollup from every donation, archived ones included."""
+    from app.services import archive
+
+    table = DonationDailyRollup.__table__
+    donations = archive.history('donation', ['id', 'created_at', 'status', 'food_type'])
+    day = db.func.date(donations.c.created_at)
+    status = db.func.coalesce(donations.c.status, 'available')
+    food_type = db.func.coalesce(donations.c.food_type, UNSPECIFIED_FOOD_TYPE)
+    grouped = db.session.query(
+        day, status, food_type, db.func.count(donations.c.id)
+    ).group_by(day, status, food_type)
+
+    db.session.execute(table.delete())
+    db.session.execute(
+        table.insert().from_select(['day', 'status', 'food_type', 'count'], grouped)
+    )
+    db.session.commit()
+    return db.session.query(db.func.count()).select_from(table).scalar()
+
+
+def donation_report(start, end):
+    R = DonationDailyRollup
+    in_range = db.and_(R.day >= start, R.day <= end)
+
+    by_day_status = db.session.query(
+        R.day, R.status, db.func.sum(R.count)
+    ).filter(in_range).group_by(R.day, R.status).all()
+    by_food_type = db.session.query(
+        R.food_type, db.func.sum(R.count)
+    ).filter(in_range).group_by(R.food_type).all()
+
+    days = {}
+    by_status = {}
+    for day, status, count in by_day_status:
+        if not count:
+            continue
+        entry = days.setdefault(day, {'total': 0, 'by_status': {}})
+        entry['total'] += count
+        entry['by_status'][status] = count
+        by_status[status] = by_status.get(status, 0) + count
+
+    timeline = []
+    day = start
+    while day <= end:
+        entry = days.get(day, {'total': 0, 'by_status': {}})
+        timeline.append({'date': day.isoformat(), **entry})
+        day += timedelta(days=1)
+
+    return {
+        'total_donations': sum(by_status.values()),
+        'by_status': by_status,
+        'by_food_type': {food_type: count for food_type, count in by_food_type if count},
+        'timeline': timeline
+    }
+
+
+@rollup_cli.command('backfill')
+def backfill_command():
+    """Rebuild donation_daily_rollup from the donation table and its archive."""
+    rows = backfill()
+    click.echo(f'Rebuilt donation_daily_rollup: {rows} rows')
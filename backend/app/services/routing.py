@@ -0,0 +1,146 @@
+import time
+from datetime import timedelta
+
+import numpy as np
+
+from app.services.geo import EARTH_RADIUS_KM
+
+# Slack for float noise when comparing route costs
+EPSILON = 1e-9
+# Best improving 2-opt moves tried per pass of the delta matrix
+MOVES_PER_PASS = 64
+
+
+def distance_matrix(latitudes, longitudes):
+    """All-pairs haversine distances in km."""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lng = np.radians(np.asarray(longitudes, dtype=np.float64))
+    dlat = lat[:, None] - lat[None, :]
+    dlng = lng[:, None] - lng[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class _Problem:
+    """An open path from node 0 through every stop, ending at a free sink.
+
+    Nodes 1..n are stops; node n + 1 is a sink at distance 0 from
+    everything, so the last leg of a 2-opt reversal needs no special case.
+    """
+
+    def __init__(self, distances, deadlines, speed_kmh, service_hours):
+        n = len(distances)
+        self.stops = n - 1
+        self.km = np.zeros((n + 1, n + 1))
+        self.km[:n, :n] = distances
+        self.hours = self.km / speed_kmh
+        self.deadlines = np.append(deadlines, np.inf)
+        self.service_hours = service_hours
+
+    def arrivals(self, tour):
+        legs = self.hours[tour[:-2], tour[1:-1]]
+        legs[1:] += self.service_hours
+        return np.cumsum(legs)
+
+    def cost(self, tour):
+        # Lexicographic: hours late first, then distance
+        lateness = np.maximum(self.arrivals(tour) - self.deadlines[tour[1:-1]], 0).sum()
+        return lateness, self.km[tour[:-1], tour[1:]].sum()
+
+    def nearest_neighbour(self):
+        tour = [0]
+        unvisited = np.ones(self.stops + 1, dtype=bool)
+        unvisited[0] = False
+        for _ in range(self.stops):
+            row = np.where(unvisited, self.km[tour[-1], :self.stops + 1], np.inf)
+            nearest = int(row.argmin())
+            tour.append(nearest)
+            unvisited[nearest] = False
+        return np.array(tour + [self.stops + 1])
+
+    def earliest_deadline_first(self):
+        order = np.argsort(self.deadlines[1:self.stops + 1], kind='stable') + 1
+        return np.concatenate([[0], order, [self.stops + 1]])
+
+    def two_opt(self, tour, deadline):
+        """Reverse segments while that shortens the path without adding lateness."""
+        n = self.stops
+        lateness, _ = self.cost(tour)
+        upper = np.triu(np.ones((n, n), dtype=bool), k=1)
+        while time.perf_counter() < deadline:
+            # delta[i, j]: reversing tour[i + 1 .. j + 1] (1-based stop positions)
+            before, first = tour[0:n], tour[1:n + 1]
+            last, after = tour[1:n + 1], tour[2:n + 2]
+            delta = (
+                self.km[before[:, None], last[None, :]]
+                + self.km[first[:, None], after[None, :]]
+                - self.km[before, first][:, None]
+                - self.km[last, after][None, :]
+            )
+            delta[~upper] = 0
+            candidates = np.flatnonzero(delta < -EPSILON)
+            if not len(candidates):
+                break
+            best = candidates[np.argsort(delta.flat[candidates], kind='stable')][:MOVES_PER_PASS]
+            # Moves over disjoint stretches keep their deltas, so one pass can
+            # apply several of them; distances are symmetric, so a reversal
+            # leaves the edges inside it unchanged
+            touched = np.zeros(n + 2, dtype=bool)
+            applied = False
+            for flat in best:
+                i, j = divmod(int(flat), n)
+                if touched[i:j + 3].any():
+                    continue
+                trial = tour.copy()
+                trial[i + 1:j + 2] = tour[i + 1:j + 2][::-1]
+                trial_lateness, _ = self.cost(trial)
+                if trial_lateness <= lateness + EPSILON:
+                    tour, lateness = trial, trial_lateness
+                    touched[i:j + 3] = True
+                    applied = True
+            if not applied:
+                break
+        return tour
+
+
+def plan_route(start, stops, depart_at, speed_kmh, service_minutes, time_budget=0.5):
+    """Visit order for ``stops``: (key, latitude, longitude, deadline) tuples.
+
+    Starts from ``start`` (lat, lng), or from the most urgent stop when the
+    start is unknown. Returns (visits, total_km) where each visit is a dict
+    with the stop key, arrival time, leg distance and whether it is late.
+    """
+    if not stops:
+        return [], 0.0
+    if start is None:
+        urgent = min(stops, key=lambda stop: stop[3])
+        start = (urgent[1], urgent[2])
+
+    distances = distance_matrix(
+        [start[0]] + [stop[1] for stop in stops],
+        [start[1]] + [stop[2] for stop in stops],
+    )
+    deadlines = np.array(
+        [np.inf] + [(stop[3] - depart_at).total_seconds() / 3600 for stop in stops]
+    )
+    problem = _Problem(distances, deadlines, speed_kmh, service_minutes / 60)
+
+    stop_by = time.perf_counter() + time_budget
+    tour = min(
+        (problem.nearest_neighbour(), problem.earliest_deadline_first()),
+        key=problem.cost
+    )
+    tour = problem.two_opt(tour, stop_by)
+
+    arrivals = problem.arrivals(tour)
+    visits = []
+    for position, node in enumerate(tour[1:-1].tolist()):
+        key, _, _, stop_deadline = stops[node - 1]
+        arrival = depart_at + timedelta(hours=float(arrivals[position]))
+        visits.append({
+            'key': key,
+            'arrival_time': arrival,
+            'leg_km': float(problem.km[tour[position], node]),
+            'late': arrival > stop_deadline,
+        })
+    return visits, float(sum(visit['leg_km'] for visit in visits))
@@ -0,0 +1,109 @@
+import html
+import re
+
+from sqlalchemy import and_, column, literal_column, or_, table, text
+
+from app import db
+from app.models import Donation
+from app.utils.pagination import (
+    encode_cursor, decode_cursor, encode_rank_cursor, decode_rank_cursor
+)
+
+MAX_TERMS = 10
+SNIPPET_TOKENS = 16
+SNIPPET_CHARS = 120
+
+# Title hits outrank description hits, which outrank location hits
+BM25 = literal_column('bm25(donation_fts, 10.0, 5.0, 2.0)')
+# Control characters mark hits so the text can be escaped before <mark> goes in
+SNIPPET = literal_column(f"snippet(donation_fts, -1, char(2), char(3), '…', {SNIPPET_TOKENS})")
+_OPEN, _CLOSE = '\x02', '\x03'
+
+_donation_fts = table('donation_fts', column('rowid'))
+
+
+def terms(q):
+    return re.findall(r'\w+', (q or '').lower())[:MAX_TERMS]
+
+
+def uses_fts():
+    return db.engine.dialect.name == 'sqlite'
+
+
+def _match_expression(words):
+    # Quoted so user input is never parsed as FTS5 syntax; the last word is a
+    # prefix so results keep up while the NGO is still typing
+    quoted = [f'"{word}"' for word in words]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _highlight(marked):
+    return html.escape(marked).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+
+
+def _fallback_snippet(donation, words):
+    pattern = re.compile('|'.join(re.escape(word) for word in words), re.IGNORECASE)
+    for value in (donation.title, donation.description, donation.location):
+        match = pattern.search(value or '')
+        if match:
+            start = max(0, match.start() - SNIPPET_CHARS // 2)
+            excerpt = value[start:start + SNIPPET_CHARS]
+            marked = pattern.sub(lambda m: f'{_OPEN}{m.group(0)}{_CLOSE}', excerpt)
+            return _highlight(('…' if start else '') + marked)
+    return html.escape(donation.title or '')
+
+
+def _fts_page(query, words, limit, cursor):
+    query = query.join(_donation_fts, _donation_fts.c.rowid == Donation.id).filter(
+        text('donation_fts MATCH :match').bindparams(match=_match_expression(words))
+    )
+    if cursor:
+        rank, last_id = decode_rank_cursor(cursor)
+        query = query.filter(or_(BM25 > rank, and_(BM25 == rank, Donation.id > last_id)))
+    rows = query.add_columns(BM25.label('rank'), SNIPPET.label('snippet')).order_by(
+        BM25, Donation.id
+    ).limit(limit + 1).all()
+
+    hits = [(donation, rank, _highlight(snippet)) for donation, rank, snippet in rows]
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_rank_cursor(hits[-1][1], hits[-1][0].id)
+    return hits, next_cursor
+
+
+def _like_page(query, words, limit, cursor):
+    # Portable path: every word must appear somewhere, newest first
+    for word in words:
+        pattern = f'%{word}%'
+        query = query.filter(or_(
+            Donation.title.ilike(pattern),
+            Donation.description.ilike(pattern),
+            Donation.location.ilike(pattern)
+        ))
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Donation.created_at < created_at,
+            and_(Donation.created_at == created_at, Donation.id < last_id)
+        ))
+    rows = query.order_by(Donation.created_at.desc(), Donation.id.desc()).limit(limit + 1).all()
+
+    hits = [(donation, None, _fallback_snippet(donation, words)) for donation in rows]
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        last = hits[-1][0]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return hits, next_cursor
+
+
+def search(query, words, limit, cursor=None):
+    """Page of (donation, rank, snippet_html) hits within ``query``'s filters.
+
+    SQLite ranks with BM25 over the donation_fts index; other databases fall
+    back to substring matching ordered by recency, with rank None.
+    """
+    page = _fts_page if uses_fts() else _like_page
+    return page(query, words, limit, cursor)
@@ -1,7 +1,9 @@
 from .helpers import save_uploaded_file
+from app.services.media import store_image
 
 def handle_image_upload(file):
-    return save_uploaded_file(file, 'images')
+    # Content-addressed: identical photos share one stored copy and thumbnails
+    return store_image(file)
 
 def handle_document_upload(file):
-    return save_uploaded_file(file, 'documents')
\ No newline at end of file
+    return save_uploaded_file(file, 'documents')
@@ -1,7 +1,9 @@
+import hashlib
 import os
 import uuid
 from werkzeug.utils import secure_filename
-from flask import current_app
+from flask import current_app, request, make_response
+from app import db
 
 def allowed_file(filename):
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'doc', 'docx'}
@@ -20,4 +22,34 @@ def save_uploaded_file(file, folder='images'):
         file.save(file_path)
         
         return unique_filename
-    return None
\ No newline at end of file
+    return None
+
+def count_if(condition):
+    # COUNT of rows matching condition, for single-pass SUM(CASE ...) aggregates
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+
+def list_etag(query, updated_columns, *scope):
+    # Cheap version token for a list: one MAX per table and a COUNT over the
+    # filtered scope. Pass the updated_at of every table the payload shows
+    # fields from, with ``query`` joined to it
+    *latest, count = query.with_entities(
+        *(db.func.max(column) for column in updated_columns), db.func.count()
+    ).order_by(None).one()
+    raw = repr((scope, sorted(request.args.items(multi=True)), [str(value) for value in latest], count))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def not_modified(etag):
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = make_response('', 304)
+    return with_etag(response, etag)
+
+
+def with_etag(response, etag):
+    response.set_etag(etag, weak=True)
+    # Authenticated data: browsers may store it but must revalidate every time
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,39 @@
+import base64
+import json
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def parse_limit(raw, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if raw is None or raw == '':
+        return default
+    limit = int(raw)
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, maximum)
+
+
+# Cursors are opaque to clients: base64 of the (created_at, id) of the last row seen
+def encode_cursor(created_at, row_id):
+    payload = json.dumps([created_at.isoformat(), row_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    payload = base64.urlsafe_b64decode(cursor.encode('ascii'))
+    created_at, row_id = json.loads(payload)
+    return datetime.fromisoformat(created_at), int(row_id)
+
+
+# Ranked search pages continue after the (rank, id) of the last hit
+def encode_rank_cursor(rank, row_id):
+    payload = json.dumps([rank, row_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_rank_cursor(cursor):
+    payload = base64.urlsafe_b64decode(cursor.encode('ascii'))
+    rank, row_id = json.loads(payload)
+    return float(rank), int(row_id)
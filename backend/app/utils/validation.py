@@ -1,4 +1,7 @@
 import re
+from datetime import datetime
+
+from app.services.geo import parse_point
 
 def validate_email(email):
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
@@ -9,4 +12,38 @@ def validate_password(password):
 
 def validate_phone(phone):
     pattern = r'^\+?1?\d{9,15}$'
-    return re.match(pattern, phone) is not None
\ No newline at end of file
+    return re.match(pattern, phone) is not None
+
+# Column limits from app.models.Donation; SQLite would not enforce them
+DONATION_FIELD_LIMITS = {'title': 200, 'quantity': 100, 'location': 300, 'food_type': 50}
+
+def validate_donation(data):
+    """Parse one donation payload: a JSON body, a form, or an import row.
+
+    Returns (fields, None) or (None, error). ``fields['point']`` holds
+    explicit (latitude, longitude) or None, leaving geocoding to the caller.
+    """
+    fields = {}
+    for name, limit in DONATION_FIELD_LIMITS.items():
+        value = data.get(name)
+        value = '' if value is None else str(value).strip()
+        if not value and name != 'food_type':
+            return None, f'{name} is required'
+        if len(value) > limit:
+            return None, f'{name} is longer than {limit} characters'
+        fields[name] = value
+    fields['food_type'] = fields['food_type'] or 'vegetarian'
+    fields['description'] = str(data.get('description') or '')
+
+    try:
+        fields['expiry_time'] = datetime.fromisoformat(str(data.get('expiry_time')).replace('Z', ''))
+    except ValueError:
+        return None, 'Invalid expiry_time format'
+
+    fields['point'] = None
+    if data.get('latitude') not in (None, '') and data.get('longitude') not in (None, ''):
+        try:
+            fields['point'] = parse_point(f"{data.get('latitude')},{data.get('longitude')}")
+        except ValueError:
+            return None, 'Invalid latitude/longitude'
+    return fields, None
@@ -0,0 +1,114 @@
+"""Hot-path latency as closed history grows, with and without archiving.
+
+Each step appends a slab of old collected donations (each with a collected
+request), runs the archiver unless --no-archive is given, then times the
+NGO feed and a donor's stats against a fixed set of live donations.
+History rows are generated in SQL so tens of millions stay practical:
+    python -m benchmarks.bench_archive --history 20000000 --steps 4
+Run from backend/:  python -m benchmarks.bench_archive
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models import User, Donation
+from app.services import archive
+from app.services.identity import identity_claims
+
+HISTORY_SQL = """
+WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :count)
+INSERT INTO donation (title, quantity, food_type, expiry_time, location, status,
+                      donor_id, created_at, updated_at)
+SELECT 'Old ' || n, '1', 'vegetarian', :closed, 'Depot', 'collected', :donor, :closed, :closed
+FROM seq
+"""
+HISTORY_REQUESTS_SQL = """
+INSERT INTO request (donation_id, ngo_id, status, created_at, updated_at)
+SELECT id, :ngo, 'collected', :closed, :closed FROM donation WHERE id > :after
+"""
+
+
+def _time(client, path, headers, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    return round(statistics.median(timings) * 1000, 2)
+
+
+def run(history, steps, live, repeat, use_archive):
+    workdir = tempfile.mkdtemp()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}'})
+
+    with app.app_context():
+        db.create_all()
+        users = [
+            User(username=name, email=f'{name}@example.org', role=role,
+                 is_approved=True, password_hash='!')
+            for name, role in [('donor', 'donor'), ('historic', 'donor'), ('ngo', 'ngo')]
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        donor, historic, ngo = users
+        expiry = datetime.utcnow() + timedelta(days=1)
+        db.session.add_all([
+            Donation(title=f'Live {i}', quantity='1', location='Depot',
+                     expiry_time=expiry, donor_id=donor.id)
+            for i in range(live)
+        ])
+        db.session.commit()
+        ngo_headers = {'Authorization': f'Bearer {create_access_token(str(ngo.id), additional_claims=identity_claims(ngo))}'}
+        donor_headers = {'Authorization': f'Bearer {create_access_token(str(donor.id), additional_claims=identity_claims(donor))}'}
+        historic_id, ngo_id = historic.id, ngo.id
+
+    client = app.test_client()
+    closed = datetime.utcnow() - timedelta(days=365)
+    results, total = [], 0
+    for step in range(steps + 1):
+        archived_seconds = None
+        if step:
+            slab = history // steps
+            with app.app_context():
+                after = db.session.query(db.func.max(Donation.id)).scalar()
+                db.session.execute(db.text(HISTORY_SQL),
+                                   {'count': slab, 'closed': closed, 'donor': historic_id})
+                db.session.execute(db.text(HISTORY_REQUESTS_SQL),
+                                   {'ngo': ngo_id, 'closed': closed, 'after': after})
+                db.session.commit()
+                if use_archive:
+                    archived_seconds = archive.run(retention_days=90, batch_size=10_000)['seconds']
+            total += slab
+
+        results.append({
+            'history_rows': total,
+            'archive_seconds': archived_seconds,
+            'feed_p50_ms': _time(client, '/api/donations', ngo_headers, repeat),
+            'donor_stats_p50_ms': _time(client, '/api/users/stats', donor_headers, repeat),
+        })
+
+    return {
+        'benchmark': 'archive',
+        'archive': use_archive,
+        'live_donations': live,
+        'steps': results,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--history', type=int, default=2_000_000)
+    parser.add_argument('--steps', type=int, default=4)
+    parser.add_argument('--live', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--no-archive', dest='archive', action='store_false')
+    args = parser.parse_args()
+    print(json.dumps(run(args.history, args.steps, args.live, args.repeat, args.archive)))
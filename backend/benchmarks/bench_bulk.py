@@ -0,0 +1,128 @@
+"""Bulk import and streaming export throughput.
+
+Imports ``--rows`` donations through POST /api/donations/bulk as one
+NDJSON (or CSV) body, and a smaller sample through POST /api/donations one
+row per call, which is what importers had to do before. The body is held
+to the shipped BULK_IMPORT_MAX_BYTES, as in production. The whole table
+is then streamed back out of GET /api/admin/export, once for timing and
+once under tracemalloc for peak Python memory while the body is consumed.
+Run from backend/:  python -m benchmarks.bench_bulk
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models import User
+
+LOCATIONS = ['Bandra, Mumbai', 'Andheri, Mumbai', 'Pune', 'Kothrud, Pune', 'Warehouse 4']
+FOOD_TYPES = ['vegetarian', 'vegan', 'non-vegetarian']
+
+
+def _records(count, expiry):
+    for i in range(count):
+        yield {
+            'title': f'Surplus tray {i}',
+            'description': 'Packed this evening',
+            'quantity': f'{i % 40 + 1} portions',
+            'food_type': FOOD_TYPES[i % 3],
+            'expiry_time': expiry,
+            'location': LOCATIONS[i % len(LOCATIONS)],
+        }
+
+
+def _body(records, fmt):
+    if fmt == 'ndjson':
+        return '\n'.join(json.dumps(record) for record in records).encode()
+    buffer = io.StringIO()
+    writer = None
+    for record in records:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(record))
+            writer.writeheader()
+        writer.writerow(record)
+    return buffer.getvalue().encode()
+
+
+def run(rows, baseline, fmt):
+    workdir = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}',
+    })
+    with app.app_context():
+        db.create_all()
+        donor = User(username='caterer', email='caterer@example.org', role='donor',
+                     is_approved=True, password_hash='!')
+        admin = User(username='admin', email='admin@example.org', role='admin',
+                     is_approved=True, password_hash='!')
+        db.session.add_all([donor, admin])
+        db.session.commit()
+        donor_headers = {'Authorization': f'Bearer {create_access_token(identity=str(donor.id))}'}
+        admin_headers = {'Authorization': f'Bearer {create_access_token(identity=str(admin.id))}'}
+
+    client = app.test_client()
+    expiry = (datetime.utcnow() + timedelta(days=1)).isoformat()
+
+    started = time.perf_counter()
+    for record in _records(baseline, expiry):
+        client.post('/api/donations', json=record, headers=donor_headers)
+    single_s = time.perf_counter() - started
+
+    body = _body(_records(rows, expiry), fmt)
+    content_type = 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv'
+    started = time.perf_counter()
+    result = client.post('/api/donations/bulk', data=body, content_type=content_type,
+                         headers=donor_headers).get_json()
+    bulk_s = time.perf_counter() - started
+
+    def export():
+        response = client.get('/api/admin/export?type=donations&format=ndjson',
+                              headers=admin_headers, buffered=False)
+        size = lines = 0
+        for chunk in response.response:
+            chunk = chunk.encode() if isinstance(chunk, str) else chunk
+            size += len(chunk)
+            lines += chunk.count(b'\n')
+        response.close()
+        return size, lines
+
+    started = time.perf_counter()
+    exported_bytes, exported_rows = export()
+    export_s = time.perf_counter() - started
+
+    # Second pass for memory only: tracing slows Python down several times
+    tracemalloc.start()
+    export()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'benchmark': 'bulk',
+        'format': fmt,
+        'rows': rows,
+        'imported': result['imported'],
+        'bulk_import_s': round(bulk_s, 2),
+        'bulk_rows_per_sec': round(rows / bulk_s),
+        'single_rows_per_sec': round(baseline / single_s),
+        'exported_rows': exported_rows,
+        'export_s': round(export_s, 2),
+        'export_mb': round(exported_bytes / 1e6, 1),
+        'export_peak_traced_mb': round(peak / 1e6, 1),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--baseline', type=int, default=500, help='Rows posted one at a time.')
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.baseline, args.format)))
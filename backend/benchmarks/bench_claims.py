@@ -0,0 +1,79 @@
+"""Claims/sec through POST /api/donations/<id>/request.
+
+Each worker thread claims its own slice of donations, so every claim wins
+and the figure measures the write path rather than lock contention on a
+single row. Run from backend/:  python -m benchmarks.bench_claims
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models import User, Donation
+
+
+def run(donations, threads):
+    workdir = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}',
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': threads, 'max_overflow': 0},
+    })
+
+    with app.app_context():
+        db.create_all()
+        donor = User(username='donor', email='donor@example.org', role='donor',
+                     is_approved=True, password_hash='!')
+        ngos = [
+            User(username=f'ngo{i}', email=f'ngo{i}@example.org', role='ngo',
+                 is_approved=True, password_hash='!')
+            for i in range(threads)
+        ]
+        db.session.add_all([donor, *ngos])
+        db.session.flush()
+        expiry = datetime.utcnow() + timedelta(hours=4)
+        db.session.add_all([
+            Donation(title=f'Donation {i}', quantity='1', location='Depot',
+                     expiry_time=expiry, donor_id=donor.id)
+            for i in range(donations)
+        ])
+        db.session.commit()
+        ids = [d.id for d in Donation.query.with_entities(Donation.id)]
+        tokens = [create_access_token(identity=str(ngo.id)) for ngo in ngos]
+
+    def worker(index):
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {tokens[index]}'}
+        won = 0
+        for donation_id in ids[index::threads]:
+            response = client.post(f'/api/donations/{donation_id}/request',
+                                   headers=headers, json={})
+            won += response.status_code == 201
+        return won
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        won = sum(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'benchmark': 'claims',
+        'donations': donations,
+        'threads': threads,
+        'claims_won': won,
+        'seconds': round(elapsed, 3),
+        'claims_per_sec': round(won / elapsed, 1),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--donations', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+    print(json.dumps(run(args.donations, args.threads)))
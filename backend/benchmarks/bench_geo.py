@@ -0,0 +1,101 @@
+"""Latency of GET /api/donations?near=lat,lng&radius_km= over a large table.
+
+Donations are scattered around the gazetteer cities. Each query is timed
+through the API (grid-cell prefilter + haversine) and compared with a
+single brute-force pass that computes the distance of every available row,
+which is what a client had to do before coordinates existed.
+Run from backend/:  python -m benchmarks.bench_geo
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models import User, Donation
+from app.services import geo
+
+
+def run(donations, queries, radius_km, seed=7):
+    rng = random.Random(seed)
+    workdir = tempfile.mkdtemp()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}'})
+
+    with app.app_context():
+        db.create_all()
+        donor = User(username='donor', email='donor@example.org', role='donor',
+                     is_approved=True, password_hash='!')
+        ngo = User(username='ngo', email='ngo@example.org', role='ngo',
+                   is_approved=True, password_hash='!')
+        db.session.add_all([donor, ngo])
+        db.session.commit()
+        token = create_access_token(identity=str(ngo.id))
+
+        cities = list(geo.gazetteer().values())
+        now = datetime.utcnow()
+        expiry = now + timedelta(days=1)
+        table = Donation.__table__
+        for start in range(0, donations, 50_000):
+            rows = []
+            for i in range(start, min(start + 50_000, donations)):
+                lat, lng = rng.choice(cities)
+                lat, lng = lat + rng.gauss(0, 0.3), lng + rng.gauss(0, 0.3)
+                rows.append({
+                    'title': f'Donation {i}', 'quantity': '1', 'location': 'Synthetic',
+                    'food_type': 'vegetarian', 'status': 'available' if i % 4 else 'claimed',
+                    'expiry_time': expiry, 'created_at': now - timedelta(seconds=i),
+                    'updated_at': now, 'donor_id': donor.id,
+                    'latitude': lat, 'longitude': lng, 'geo_cell': geo.grid_cell(lat, lng),
+                })
+            db.session.execute(table.insert(), rows)
+        db.session.commit()
+
+        centres = [rng.choice(cities) for _ in range(queries)]
+
+        started = time.perf_counter()
+        lat, lng = centres[0]
+        scanned = sum(
+            1 for row_lat, row_lng in db.session.query(Donation.latitude, Donation.longitude)
+            .filter(Donation.status == 'available')
+            if geo.haversine_km(lat, lng, row_lat, row_lng) <= radius_km
+        )
+        full_scan = time.perf_counter() - started
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    timings, returned = [], 0
+    for lat, lng in centres:
+        started = time.perf_counter()
+        response = client.get('/api/donations', headers=headers, query_string={
+            'near': f'{lat},{lng}', 'radius_km': radius_km, 'limit': 20,
+        })
+        timings.append(time.perf_counter() - started)
+        returned += len(response.get_json()['donations'])
+
+    timings.sort()
+    return {
+        'benchmark': 'geo',
+        'donations': donations,
+        'queries': queries,
+        'radius_km': radius_km,
+        'rows_returned': returned,
+        'near_p50_ms': round(statistics.median(timings) * 1000, 2),
+        'near_p95_ms': round(timings[int(len(timings) * 0.95) - 1] * 1000, 2),
+        'full_scan_ms': round(full_scan * 1000, 2),
+        'full_scan_matches': scanned,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--donations', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--radius-km', type=float, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.donations, args.queries, args.radius_km)))
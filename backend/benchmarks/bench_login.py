@@ -0,0 +1,82 @@
+"""Login latency (p50/p99) at several concurrency levels.
+
+Every login pays one bcrypt verification at BCRYPT_LOG_ROUNDS, run in the
+PASSWORD_HASH_WORKERS process pool. Run from backend/:
+    python -m benchmarks.bench_login --rounds 10 --workers 2
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import create_app, db
+from app.models import User
+from app.services import passwords
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(rounds, workers, levels, logins):
+    workdir = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}',
+        'BCRYPT_LOG_ROUNDS': rounds,
+        'PASSWORD_HASH_WORKERS': workers,
+    })
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.org', role='donor', is_approved=True)
+        user.set_password('secret123')
+        db.session.add(user)
+        db.session.commit()
+
+    def login(_):
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post('/api/auth/login',
+                               json={'email': 'bench@example.org', 'password': 'secret123'})
+        assert response.status_code == 200
+        return (time.perf_counter() - started) * 1000
+
+    results = []
+    for concurrency in levels:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(login, range(logins)))
+        elapsed = time.perf_counter() - started
+        results.append({
+            'concurrency': concurrency,
+            'logins': logins,
+            'p50_ms': round(percentile(samples, 50), 2),
+            'p99_ms': round(percentile(samples, 99), 2),
+            'mean_ms': round(statistics.mean(samples), 2),
+            'logins_per_sec': round(logins / elapsed, 1),
+        })
+
+    with app.app_context():
+        passwords.shutdown()
+
+    return {
+        'benchmark': 'login',
+        'bcrypt_log_rounds': rounds,
+        'hash_workers': workers,
+        'results': results,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--logins', type=int, default=64)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rounds, args.workers, args.levels, args.logins)))
@@ -0,0 +1,79 @@
+"""Batch ranking latency of the donation -> NGO matcher.
+
+Builds synthetic feature vectors (donations and NGOs scattered around the
+gazetteer cities), then times top_ngos() over every donation and
+recommend() for single NGOs. Exits non-zero if the batch ranking misses
+--budget-ms. Run from backend/:  python -m benchmarks.bench_matching
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from app.services import geo, matching
+
+
+def _points(rng, cities, count):
+    centres = cities[rng.integers(0, len(cities), count)]
+    points = centres + rng.normal(0, 0.3, (count, 2))
+    return np.radians(points).astype(np.float32)
+
+
+def run(donations, ngos, k, budget_ms, seed=11):
+    rng = np.random.default_rng(seed)
+    cities = np.array(list(geo._load_gazetteer(geo.DEFAULT_GAZETTEER).values()))
+    food_types = list(matching.KNOWN_FOOD_TYPES)
+
+    ngo_points = _points(rng, cities, ngos)
+    ngo_features = matching.NgoFeatures(
+        np.arange(1, ngos + 1),
+        ngo_points[:, 0], ngo_points[:, 1],
+        food_types,
+        np.hstack([rng.uniform(0, 1, (ngos, len(food_types))), np.full((ngos, 1), matching.NEUTRAL)]),
+        rng.beta(4, 2, ngos),
+    )
+    donation_points = _points(rng, cities, donations)
+    donation_features = matching.DonationFeatures(
+        np.arange(1, donations + 1),
+        donation_points[:, 0], donation_points[:, 1],
+        rng.integers(0, len(food_types) + 1, donations),
+        rng.uniform(0, 72, donations),
+    )
+
+    started = time.perf_counter()
+    matching.top_ngos(donation_features, ngo_features, k)
+    batch_ms = (time.perf_counter() - started) * 1000
+
+    timings = []
+    for ngo_id in rng.integers(1, ngos + 1, 20).tolist():
+        started = time.perf_counter()
+        matching.recommend(ngo_id, donation_features, ngo_features, 20)
+        timings.append(time.perf_counter() - started)
+
+    return {
+        'benchmark': 'matching',
+        'donations': donations,
+        'ngos': ngos,
+        'k': k,
+        'pairs_scored': donations * ngos,
+        'batch_ms': round(batch_ms, 1),
+        'pairs_per_sec': round(donations * ngos / (batch_ms / 1000)),
+        'recommend_p50_ms': round(statistics.median(timings) * 1000, 2),
+        'budget_ms': budget_ms,
+        'within_budget': batch_ms <= budget_ms,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--donations', type=int, default=100_000)
+    parser.add_argument('--ngos', type=int, default=5_000)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=10_000)
+    args = parser.parse_args()
+    result = run(args.donations, args.ngos, args.k, args.budget_ms)
+    print(json.dumps(result))
+    sys.exit(0 if result['within_budget'] else 1)
@@ -0,0 +1,70 @@
+"""Cold vs warm fetch throughput for /media.
+
+Cold fetches download the full file; warm fetches send the ETag back in
+If-None-Match and receive an empty 304. Run from backend/:
+    python -m benchmarks.bench_media --requests 2000
+"""
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+
+from PIL import Image
+
+from app import create_app
+from app.services.media import original_path, store_image
+
+
+class _Upload:
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+
+def run(requests, width):
+    workdir = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}',
+        'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+    })
+
+    buf = io.BytesIO()
+    Image.effect_noise((width, width * 3 // 4), 64).convert('RGB').save(buf, 'JPEG', quality=90)
+    with app.test_request_context():
+        key = store_image(_Upload(buf.getvalue()))
+    url = '/media/' + original_path(key).replace(os.sep, '/')
+    client = app.test_client()
+
+    def measure(headers, expected_status):
+        transferred = 0
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = client.get(url, headers=headers)
+            assert response.status_code == expected_status
+            transferred += len(response.data)
+        elapsed = time.perf_counter() - started
+        return {
+            'requests_per_sec': round(requests / elapsed, 1),
+            'bytes_per_request': transferred // requests,
+        }
+
+    cold = measure({}, 200)
+    etag = client.get(url).headers['ETag']
+    warm = measure({'If-None-Match': etag}, 304)
+
+    return {
+        'benchmark': 'media',
+        'file_bytes': len(buf.getvalue()),
+        'requests': requests,
+        'cold': cold,
+        'warm': warm,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--width', type=int, default=1600)
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests, args.width)))
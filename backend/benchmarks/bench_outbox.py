@@ -0,0 +1,96 @@
+"""Email throughput: outbox drain versus sending inline.
+
+Queues notification emails, then drains them through a local aiosmtpd sink
+in batches over one SMTP connection. The baseline is what an inline
+``mail.send`` in a request handler does: one connection per message. Also
+reports what enqueueing adds to the request transaction.
+Run from backend/:  python -m benchmarks.bench_outbox
+"""
+import argparse
+import json
+import os
+import socket
+import tempfile
+import time
+
+from aiosmtpd.controller import Controller
+from flask import render_template
+from flask_mail import Message
+
+from app import create_app, db, mail
+from app.services import outbox
+
+
+class _Sink:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return '250 OK'
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def run(emails, batch_size, baseline):
+    sink = _Sink()
+    controller = Controller(sink, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+    workdir = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}',
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': controller.port,
+    })
+    try:
+        with app.app_context():
+            db.create_all()
+            context = {'username': 'kitchen', 'message': 'Your request was approved.',
+                       'details': {'Pickup location': 'Community Hall'}}
+
+            started = time.perf_counter()
+            for i in range(emails):
+                outbox.enqueue(f'ngo{i}@example.org', 'Request approved', 'notification.html',
+                               context, dedupe_key=f'bench:{i}')
+                db.session.commit()
+            enqueue_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            metrics = outbox.drain(batch_size)
+            drain_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for i in range(baseline):
+                mail.send(Message(
+                    'Request approved', recipients=[f'ngo{i}@example.org'],
+                    html=render_template('email/notification.html', **context),
+                    sender=app.config['MAIL_DEFAULT_SENDER'],
+                ))
+            inline_s = time.perf_counter() - started
+    finally:
+        controller.stop()
+
+    return {
+        'benchmark': 'outbox',
+        'emails': emails,
+        'batch_size': batch_size,
+        'sent': metrics['sent'],
+        'received': sink.received,
+        'enqueue_ms_per_request': round(enqueue_s / emails * 1000, 3),
+        'drain_mails_per_sec': round(metrics['sent'] / drain_s, 1),
+        'inline_mails_per_sec': round(baseline / inline_s, 1),
+        'inline_ms_per_request': round(inline_s / baseline * 1000, 3),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--emails', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--baseline', type=int, default=200, help='Inline sends to time.')
+    args = parser.parse_args()
+    print(json.dumps(run(args.emails, args.batch_size, args.baseline)))
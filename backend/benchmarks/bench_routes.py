@@ -0,0 +1,347 @@
+"""Latency of every auth, donations, requests, users and admin route.
+
+Each scenario is driven first through the Flask test client (one request
+at a time, no sockets) and then over real HTTP against a threaded
+Werkzeug server, with --threads client threads. Per scenario it reports
+p50/p95/p99 client-side latency, SQL statements per request (from the
+/metrics histograms) and the process's peak RSS so far. The dataset comes
+from benchmarks.generate: pass --db to copy a generated file, so every
+commit is measured against the same rows, or --scale to generate one:
+    python -m benchmarks.generate --db /tmp/surplus.db
+    python -m benchmarks.bench_routes --db /tmp/surplus.db > routes.json
+Run from backend/:  python -m benchmarks.bench_routes
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import re
+import resource
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from PIL import Image
+from werkzeug.serving import make_server
+
+from app import create_app, db
+from app.models import Donation, Request, User
+from app.services import passwords
+from app.services.identity import identity_claims
+from benchmarks import generate
+
+# name, method, builder(fixtures, rng, serial) -> (user id, path, body), per-mode cap
+Scenario = namedtuple('Scenario', 'name method build limit', defaults=(None,))
+Call = namedtuple('Call', 'method path headers body')
+
+SEARCH_TERMS = ['rice', 'biryani', 'curry', 'bread', 'paneer', 'idli', 'fruit']
+BULK_ROWS = 100
+IMAGE_SIZE = (320, 240)
+
+
+class _Fixtures:
+    """Ids to aim requests at. Writes pop their target, so none repeats."""
+
+    def __init__(self, rng):
+        def ids(query):
+            values = sorted(row[0] for row in query)
+            rng.shuffle(values)
+            return values
+
+        self.donors = ids(User.query.with_entities(User.id).filter_by(role='donor', is_approved=True))
+        self.ngos = ids(User.query.with_entities(User.id).filter_by(role='ngo', is_approved=True))
+        self.admins = ids(User.query.with_entities(User.id).filter_by(role='admin'))
+        self.emails = [row[0] for row in User.query.with_entities(User.email)
+                       .filter(User.id.in_(self.donors[:1000] + self.ngos[:1000]))]
+        self.unapproved = ids(User.query.with_entities(User.id).filter_by(is_approved=False))
+        self.available = ids(Donation.query.with_entities(Donation.id).filter_by(status='available'))
+        self.members = self.donors + self.ngos
+        self.cities = sorted(row[0] for row in db.session.query(Donation.location).distinct())
+        self.points = [f'{lat:.4f},{lng:.4f}' for lat, lng in
+                       db.session.query(Donation.latitude, Donation.longitude)
+                       .filter(Donation.status == 'available').order_by(Donation.id).limit(500)]
+        pending = db.session.query(Request.id, Donation.donor_id, Request.ngo_id).join(
+            Donation, Donation.id == Request.donation_id
+        ).filter(Request.status == 'pending').order_by(Request.id).all()
+        rng.shuffle(pending)
+        # Donors decide half the pending requests; NGOs withdraw the other half
+        self.to_decide = [(row.donor_id, row.id) for row in pending[::2]]
+        self.to_withdraw = [(row.ngo_id, row.id) for row in pending[1::2]]
+        self.route_planners = ids(db.session.query(Request.ngo_id).filter_by(status='approved').distinct())
+        self.max_request_id = db.session.query(db.func.max(Request.id)).scalar() or 1
+
+    def await_approval(self, count):
+        """Register NGOs until at least ``count`` are waiting for approval."""
+        missing = count - len(self.unapproved)
+        if missing <= 0:
+            return
+        password_hash = db.session.query(User.password_hash).limit(1).scalar()
+        first = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+        users = [User(id=n, username=f'pending{n}', email=f'pending{n}@example.org',
+                      password_hash=password_hash, role='ngo', organization_name=f'Pending Food Bank {n}',
+                      address=self.cities[0] if self.cities else None, is_approved=False)
+                 for n in range(first, first + missing)]
+        db.session.add_all(users)
+        db.session.commit()
+        self.unapproved = [user.id for user in users] + self.unapproved
+
+
+def _json(body):
+    return json.dumps(body).encode(), 'application/json'
+
+
+def _image(rng):
+    # Fresh pixels each time: uploads are content-addressed and a repeat
+    # would only measure the dedupe path
+    buffer = io.BytesIO()
+    pixels = rng.randbytes(IMAGE_SIZE[0] * IMAGE_SIZE[1] * 3)
+    Image.frombytes('RGB', IMAGE_SIZE, pixels).save(buffer, 'JPEG', quality=85)
+    boundary = f'bench{rng.getrandbits(64):x}'
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="tray.jpg"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n').encode() + buffer.getvalue() + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def _donation(rng, fixtures, index):
+    return {
+        'title': f'{rng.choice(generate.ITEMS)} {index}',
+        'description': 'Packed this evening',
+        'quantity': f'{rng.randint(1, 40)} portions',
+        'food_type': rng.choice(generate.FOOD_TYPES),
+        'expiry_time': (datetime.utcnow() + timedelta(hours=rng.randint(2, 48))).isoformat(),
+        'location': rng.choice(fixtures.cities),
+    }
+
+
+def _bulk(rng, fixtures, index):
+    lines = [json.dumps(_donation(rng, fixtures, f'{index}.{n}')) for n in range(BULK_ROWS)]
+    return '\n'.join(lines).encode(), 'application/x-ndjson'
+
+
+def _decide(fixtures, rng, index):
+    donor, request_id = fixtures.to_decide.pop()
+    return donor, f'/api/requests/{request_id}/status', _json({'status': 'approved'})
+
+
+def _withdraw(fixtures, rng, index):
+    ngo, request_id = fixtures.to_withdraw.pop()
+    return ngo, f'/api/requests/{request_id}', None
+
+
+SCENARIOS = [
+    Scenario('auth.register', 'POST', lambda f, rng, i: (None, '/api/auth/register', _json({
+        'username': f'bench{i}', 'email': f'bench{i}@example.org',
+        'password': generate.PASSWORD, 'role': rng.choice(['donor', 'ngo']),
+    }))),
+    Scenario('auth.login', 'POST', lambda f, rng, i: (None, '/api/auth/login', _json({
+        'email': rng.choice(f.emails), 'password': generate.PASSWORD,
+    }))),
+    Scenario('auth.profile', 'GET', lambda f, rng, i: (rng.choice(f.members), '/api/auth/profile', None)),
+    Scenario('donations.upload_image', 'POST', lambda f, rng, i: (
+        rng.choice(f.donors), '/api/donations/images', _image(rng))),
+    Scenario('donations.create', 'POST', lambda f, rng, i: (
+        rng.choice(f.donors), '/api/donations', _json(_donation(rng, f, i)))),
+    Scenario('donations.bulk', 'POST', lambda f, rng, i: (
+        rng.choice(f.donors), '/api/donations/bulk', _bulk(rng, f, i)), 20),
+    Scenario('donations.feed_ngo', 'GET', lambda f, rng, i: (rng.choice(f.ngos), '/api/donations', None)),
+    Scenario('donations.feed_donor', 'GET', lambda f, rng, i: (rng.choice(f.donors), '/api/donations', None)),
+    Scenario('donations.feed_near', 'GET', lambda f, rng, i: (
+        rng.choice(f.ngos), f'/api/donations?near={rng.choice(f.points)}&radius_km=10', None)),
+    Scenario('donations.search', 'GET', lambda f, rng, i: (
+        rng.choice(f.ngos), f'/api/donations/search?q={rng.choice(SEARCH_TERMS)}', None)),
+    Scenario('donations.recommended', 'GET', lambda f, rng, i: (
+        rng.choice(f.ngos), '/api/donations/recommended', None)),
+    Scenario('donations.claim', 'POST', lambda f, rng, i: (
+        rng.choice(f.ngos), f'/api/donations/{f.available.pop()}/request', _json({'message': 'On our way'}))),
+    Scenario('donations.requests', 'GET', lambda f, rng, i: (
+        rng.choice(f.members), '/api/donations/requests', None)),
+    Scenario('requests.list', 'GET', lambda f, rng, i: (rng.choice(f.members), '/api/requests/', None)),
+    Scenario('requests.get', 'GET', lambda f, rng, i: (
+        rng.choice(f.ngos), f'/api/requests/{rng.randint(1, f.max_request_id)}', None)),
+    Scenario('requests.update_status', 'PUT', _decide),
+    Scenario('requests.delete', 'DELETE', _withdraw),
+    Scenario('requests.route', 'POST', lambda f, rng, i: (
+        rng.choice(f.route_planners), '/api/requests/route', _json({}))),
+    Scenario('users.profile', 'PUT', lambda f, rng, i: (
+        rng.choice(f.members), '/api/users/profile', _json({'contact_number': f'+91 8{i:09d}'}))),
+    Scenario('users.stats', 'GET', lambda f, rng, i: (rng.choice(f.members), '/api/users/stats', None)),
+    Scenario('admin.pending', 'GET', lambda f, rng, i: (f.admins[0], '/api/admin/users/pending', None)),
+    Scenario('admin.approve', 'POST', lambda f, rng, i: (
+        f.admins[0], f'/api/admin/users/{f.unapproved.pop()}/approve', None)),
+    Scenario('admin.stats', 'GET', lambda f, rng, i: (f.admins[0], '/api/admin/stats', None)),
+    Scenario('admin.reports', 'GET', lambda f, rng, i: (f.admins[0], '/api/admin/reports/donations', None)),
+    # Streams the whole table, so a couple of runs say enough
+    Scenario('admin.export', 'GET', lambda f, rng, i: (f.admins[0], '/api/admin/export?type=donations', None), 2),
+]
+
+
+def _percentile(ordered, fraction):
+    # Nearest rank
+    return ordered[max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))]
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+def _calls(app, scenario, fixtures, rng, tokens, count, serial):
+    calls = []
+    with app.app_context():
+        for _ in range(count):
+            try:
+                user_id, path, body = scenario.build(fixtures, rng, next(serial))
+            except IndexError:
+                # Ran out of rows this write can target
+                break
+            headers = {}
+            if user_id is not None:
+                if user_id not in tokens:
+                    user = db.session.get(User, user_id)
+                    tokens[user_id] = create_access_token(
+                        identity=str(user_id), additional_claims=identity_claims(user))
+                headers['Authorization'] = f'Bearer {tokens[user_id]}'
+            if body is not None:
+                body, headers['Content-Type'] = body
+            calls.append(Call(scenario.method, path, headers, body))
+    return calls
+
+
+def _via_test_client(app):
+    client = app.test_client()
+
+    def send(call):
+        response = client.open(call.path, method=call.method, headers=call.headers, data=call.body)
+        response.get_data()
+        response.close()
+        return response.status_code
+
+    return send, 1, lambda: None
+
+
+def _via_http(app, threads):
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+
+    def send(call):
+        request = urllib.request.Request(base + call.path, data=call.body,
+                                         headers=call.headers, method=call.method)
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code
+
+    return send, threads, server.shutdown
+
+
+def _measure(app, send, threads, calls):
+    registry = app.extensions['metrics']
+    with registry.lock:
+        statements_before, requests_before = registry.sql_statements.totals()
+
+    def timed(call):
+        started = time.perf_counter()
+        status = send(call)
+        return time.perf_counter() - started, status
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(timed, calls))
+
+    with registry.lock:
+        statements_after, requests_after = registry.sql_statements.totals()
+    ordered = sorted(seconds for seconds, _ in results)
+    served = requests_after - requests_before
+    return {
+        'requests': len(results),
+        'errors': sum(1 for _, status in results if status >= 400),
+        'p50_ms': round(_percentile(ordered, 0.50) * 1000, 2),
+        'p95_ms': round(_percentile(ordered, 0.95) * 1000, 2),
+        'p99_ms': round(_percentile(ordered, 0.99) * 1000, 2),
+        'queries_per_request': round((statements_after - statements_before) / served, 2) if served else None,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def run(db_path, scale, iterations, threads, modes, only, seed):
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'bench.db')
+    started = time.perf_counter()
+    if db_path is not None:
+        # Writes land in a copy, so the next run starts from the same rows
+        shutil.copyfile(db_path, path)
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': threads, 'max_overflow': threads},
+    })
+    with app.app_context():
+        if db_path is None:
+            db.create_all()
+            dataset = generate.generate(
+                round(10_000 * scale), round(1_000_000 * scale), round(3_000_000 * scale), seed)
+        else:
+            dataset = {'db': db_path}
+        dataset['prepare_s'] = round(time.perf_counter() - started, 1)
+        rng = random.Random(seed)
+        fixtures = _Fixtures(rng)
+        # Every mode approves its own users
+        fixtures.await_approval(iterations * len(modes))
+
+    tokens = {}
+    serial = iter(range(10 ** 9))
+    scenarios = [s for s in SCENARIOS if re.search(only, s.name)]
+
+    results = {}
+    for mode in modes:
+        send, workers, close = _via_http(app, threads) if mode == 'http' else _via_test_client(app)
+        results[mode] = {}
+        for scenario in scenarios:
+            count = min(iterations, scenario.limit or iterations)
+            calls = _calls(app, scenario, fixtures, rng, tokens, count, serial)
+            if not calls:
+                # Nothing left for this write to target
+                results[mode][scenario.name] = {'requests': 0}
+                continue
+            results[mode][scenario.name] = _measure(app, send, workers, calls)
+        close()
+    passwords.shutdown()
+
+    return {
+        'benchmark': 'routes',
+        'dataset': dataset,
+        'iterations': iterations,
+        'threads': threads,
+        'seed': seed,
+        'modes': results,
+        'peak_rss_mb': _peak_rss_mb(),
+        'children_peak_rss_mb': _peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help='Database made by benchmarks.generate (copied, never modified).')
+    parser.add_argument('--scale', type=float, default=0.1,
+                        help='Without --db, generate this fraction of 10k users / 1M donations / 3M requests.')
+    parser.add_argument('--iterations', type=int, default=100, help='Requests per scenario and mode.')
+    parser.add_argument('--threads', type=int, default=8, help='HTTP client threads.')
+    parser.add_argument('--modes', nargs='+', choices=['test_client', 'http'], default=['test_client', 'http'])
+    parser.add_argument('--only', default='', help='Regex selecting scenarios by name.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.db, args.scale, args.iterations, args.threads,
+                         args.modes, args.only, args.seed), indent=2, sort_keys=True))
@@ -0,0 +1,73 @@
+"""Pickup route planning for hundreds of stops.
+
+Stops are scattered around one city with expiry deadlines spread over as
+many hours as the stops need at ten minutes each plus travel. For each route the nearest-neighbour / earliest-deadline seed is
+timed and compared with the 2-opt result, so the output shows both the
+planning latency and how much distance 2-opt saves. Exits non-zero when
+the slowest route exceeds the budget.
+Run from backend/:  python -m benchmarks.bench_routing
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app.services import routing
+
+
+def run(stops, routes, budget_ms, seed=7):
+    rng = random.Random(seed)
+    depart = datetime(2026, 1, 1, 8, 0)
+    timings, savings, late = [], [], 0
+    for _ in range(routes):
+        points = [
+            (i, 19.07 + rng.gauss(0, 0.08), 72.88 + rng.gauss(0, 0.08),
+             depart + timedelta(hours=rng.uniform(2, stops / 4)))
+            for i in range(stops)
+        ]
+
+        started = time.perf_counter()
+        visits, total_km = routing.plan_route((19.07, 72.88), points, depart, 25, 10)
+        timings.append(time.perf_counter() - started)
+
+        problem = routing._Problem(
+            routing.distance_matrix(
+                [19.07] + [p[1] for p in points], [72.88] + [p[2] for p in points]
+            ),
+            [float('inf')] + [(p[3] - depart).total_seconds() / 3600 for p in points],
+            25, 10 / 60,
+        )
+        seed_km = min(
+            problem.cost(problem.nearest_neighbour()),
+            problem.cost(problem.earliest_deadline_first()),
+        )[1]
+        savings.append(1 - total_km / seed_km)
+        late += sum(1 for visit in visits if visit['late'])
+
+    timings.sort()
+    return {
+        'benchmark': 'routing',
+        'stops': stops,
+        'routes': routes,
+        'plan_p50_ms': round(statistics.median(timings) * 1000, 2),
+        'plan_p95_ms': round(timings[max(int(len(timings) * 0.95) - 1, 0)] * 1000, 2),
+        'plan_max_ms': round(timings[-1] * 1000, 2),
+        'two_opt_saving_pct': round(statistics.mean(savings) * 100, 1),
+        'late_stops': late,
+        'budget_ms': budget_ms,
+        'within_budget': timings[-1] * 1000 <= budget_ms,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--stops', type=int, default=300)
+    parser.add_argument('--routes', type=int, default=20)
+    parser.add_argument('--budget-ms', type=float, default=1000)
+    args = parser.parse_args()
+    result = run(args.stops, args.routes, args.budget_ms)
+    print(json.dumps(result))
+    sys.exit(0 if result['within_budget'] else 1)
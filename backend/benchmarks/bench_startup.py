@@ -0,0 +1,64 @@
+"""Cold start: import the app package and build an app, in fresh interpreters.
+
+This is what every worker boot and CLI invocation pays before it can do
+anything. Each run is a new process, so nothing is already imported;
+interpreter start-up itself is not counted. The test suite holds the
+median to BUDGET_SECONDS and checks that DEFERRED_MODULES stay unloaded.
+Run from backend/:  python -m benchmarks.bench_startup
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BUDGET_SECONDS = 2.0
+# Loaded on first use (password hashing, image upload, matching/routing)
+DEFERRED_MODULES = ('bcrypt', 'PIL', 'numpy')
+
+_CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app({'SQLALCHEMY_DATABASE_URI': sys.argv[1]})
+created = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - started,
+    'create_s': created - imported,
+    'loaded': sorted(m for m in sys.argv[2:] if m in sys.modules),
+}))
+"""
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _boot(database_url):
+    output = subprocess.run(
+        [sys.executable, '-c', _CHILD, database_url, *DEFERRED_MODULES],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(runs=5, database_url='sqlite://'):
+    boots = [_boot(database_url) for _ in range(runs)]
+    totals = [boot['import_s'] + boot['create_s'] for boot in boots]
+    return {
+        'benchmark': 'startup',
+        'runs': runs,
+        'import_ms': round(statistics.median(boot['import_s'] for boot in boots) * 1000, 1),
+        'create_app_ms': round(statistics.median(boot['create_s'] for boot in boots) * 1000, 1),
+        'median_s': round(statistics.median(totals), 3),
+        'max_s': round(max(totals), 3),
+        'budget_s': BUDGET_SECONDS,
+        'deferred_modules_loaded': sorted({m for boot in boots for m in boot['loaded']}),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--database-url', default='sqlite://')
+    args = parser.parse_args()
+    print(json.dumps(run(args.runs, args.database_url)))
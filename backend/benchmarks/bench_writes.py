@@ -0,0 +1,172 @@
+"""Concurrent write throughput on a SQLite file, default vs tuned engine.
+
+Writer threads alternate POST /api/donations and claims through
+POST /api/donations/<id>/request while reader threads page the NGO feed
+and donor stats, and one admin streams GET /api/admin/export over and
+over, all against one database file seeded by benchmarks.generate. A
+long read like the export holds SQLite's shared lock for its whole run,
+which under the rollback journal stalls every commit behind it. Each
+profile runs for --seconds. "default" is the rollback journal with
+Flask-SQLAlchemy's stock pool, which is what create_app used to build;
+"tuned" is the WAL/pragma/pool setup from app.services.database.
+Run from backend/:  python -m benchmarks.bench_writes
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models import Donation, User
+from app.services.identity import identity_claims
+from benchmarks import generate
+
+PROFILES = {
+    'default': {'SQLITE_PRAGMAS': {}, 'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 5, 'max_overflow': 10}},
+    'tuned': {},
+}
+
+
+def _seed(path, donations, seed):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SQLITE_PRAGMAS': {}})
+    with app.app_context():
+        db.create_all()
+        generate.generate(max(100, donations // 100), donations, donations * 3, seed)
+        db.engine.dispose()
+
+
+def _token(user):
+    token = create_access_token(identity=str(user.id), additional_claims=identity_claims(user))
+    return {'Authorization': f'Bearer {token}'}
+
+
+def run(profile, seed_path, writers, readers, seconds, seed):
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'bench.db')
+    shutil.copyfile(seed_path, path)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', **PROFILES[profile]})
+    rng = random.Random(seed)
+
+    with app.app_context():
+        donors = User.query.filter_by(role='donor', is_approved=True).order_by(User.id).all()
+        ngos = User.query.filter_by(role='ngo', is_approved=True).order_by(User.id).all()
+        admin_headers = _token(User.query.filter_by(role='admin').first())
+        donor_headers = [_token(user) for user in rng.sample(donors, writers + readers)]
+        ngo_headers = [_token(user) for user in rng.sample(ngos, writers + readers)]
+        available = [row.id for row in Donation.query.with_entities(Donation.id)
+                     .filter_by(status='available').order_by(Donation.id)]
+        rng.shuffle(available)
+    expiry = (datetime.utcnow() + timedelta(hours=12)).isoformat()
+    start = threading.Barrier(writers + readers + 1)
+    deadline = []
+
+    def running():
+        if not deadline:
+            deadline.append(time.perf_counter() + seconds)
+        return time.perf_counter() < deadline[0]
+
+    def writer(index):
+        client = app.test_client()
+        targets = available[index::writers]
+        timings, errors = [], 0
+        start.wait()
+        i = 0
+        while running():
+            i += 1
+            began = time.perf_counter()
+            if i % 2 == 0 or not targets:
+                response = client.post('/api/donations', headers=donor_headers[index], json={
+                    'title': f'Tray {index}.{i}', 'quantity': '4 trays', 'food_type': 'vegetarian',
+                    'expiry_time': expiry, 'location': 'Pune',
+                })
+            else:
+                response = client.post(f'/api/donations/{targets.pop()}/request',
+                                       headers=ngo_headers[index], json={})
+            timings.append(time.perf_counter() - began)
+            # 404 is a claim lost to another writer; only 5xx is lock trouble
+            errors += response.status_code >= 500
+        return timings, errors
+
+    def reader(index):
+        client = app.test_client()
+        count = errors = 0
+        start.wait()
+        while running():
+            if count % 2:
+                response = client.get('/api/donations?limit=50', headers=ngo_headers[writers + index])
+            else:
+                response = client.get('/api/users/stats', headers=donor_headers[writers + index])
+            count += 1
+            errors += response.status_code >= 500
+        return count, errors
+
+    def exporter():
+        client = app.test_client()
+        exports = 0
+        start.wait()
+        while running():
+            response = client.get('/api/admin/export?type=donations', headers=admin_headers,
+                                  buffered=False)
+            for _ in response.response:
+                pass
+            response.close()
+            exports += 1
+        return exports
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers + readers + 1) as pool:
+        export_job = pool.submit(exporter)
+        write_jobs = [pool.submit(writer, i) for i in range(writers)]
+        read_jobs = [pool.submit(reader, i) for i in range(readers)]
+        writes = [job.result() for job in write_jobs]
+        reads = [job.result() for job in read_jobs]
+        exports = export_job.result()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        db.engine.dispose()
+    timings = sorted(t for worker, _ in writes for t in worker)
+    return {
+        'journal_mode': journal_mode,
+        'seconds': round(elapsed, 2),
+        'writes_per_sec': round(len(timings) / elapsed, 1),
+        'reads_per_sec': round(sum(count for count, _ in reads) / elapsed, 1),
+        'exports': exports,
+        'write_p50_ms': round(statistics.median(timings) * 1000, 2),
+        'write_p99_ms': round(timings[int(len(timings) * 0.99) - 1] * 1000, 2),
+        'write_errors': sum(errors for _, errors in writes),
+        'read_errors': sum(errors for _, errors in reads),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--donations', type=int, default=50_000, help='Seeded rows.')
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=20, help='Run time per profile.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    seed_path = os.path.join(tempfile.mkdtemp(), 'seed.db')
+    _seed(seed_path, args.donations, args.seed)
+    result = {
+        'benchmark': 'writes',
+        'donations': args.donations,
+        'writers': args.writers,
+        'readers': args.readers,
+        'seconds_per_profile': args.seconds,
+    }
+    for profile in PROFILES:
+        result[profile] = run(profile, seed_path, args.writers, args.readers, args.seconds, args.seed)
+    print(json.dumps(result))
@@ -0,0 +1,281 @@
+"""Seedable synthetic data at production volumes.
+
+Fills user, donation and request in an empty database, then derives the
+daily rollups and the search index from them, the way a long-running
+install would have. Donors are skewed (a few caterers post most of the
+food), donations span a year of history and cluster around the gazetteer
+cities, and each donation's requests tell a consistent story: earlier
+claims were rejected and the last one matches the donation's status. The
+same --seed and --now give the same rows, bar the bcrypt salt. Every
+account's password is PASSWORD, so login can be driven against any of them.
+    python -m benchmarks.generate --db /tmp/surplus.db --seed 1
+Run from backend/:  python -m benchmarks.generate
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import insert, text
+
+from app import create_app, db
+from app.models import DONATION_FTS_INSERT_TRIGGER, Donation, Request, User
+from app.services import geo, passwords, rollups, search
+
+PASSWORD = 'surplus-bench'
+FOOD_TYPES = ['vegetarian', 'vegan', 'non-vegetarian']
+FOOD_TYPE_WEIGHTS = [0.55, 0.15, 0.30]
+ITEMS = ['Rice', 'Dal', 'Chapati', 'Biryani', 'Bread', 'Vegetable curry', 'Paneer',
+         'Fruit', 'Sandwiches', 'Idli', 'Poha', 'Khichdi', 'Pastries', 'Salad']
+PACKAGING = ['trays', 'boxes', 'crates', 'portions', 'kg']
+MESSAGES = ['', 'Can collect within the hour', 'We feed 40 children tonight',
+            'Van available after 6 pm', 'Please keep it refrigerated']
+ADMIN_SHARE = 0.001
+NGO_SHARE = 0.3
+UNAPPROVED_NGO_SHARE = 0.1
+# Zipf-like exponent of donor activity: 0 is uniform
+DONOR_SKEW = 0.8
+HISTORY_DAYS = 365
+# Activity grows over the year; at 2 about 5% of donations are from the last day
+GROWTH = 2
+SHELF_HOURS = (2, 48)
+# Spread of donations around their city centre, in degrees
+SCATTER_DEGREES = 0.04
+BATCH_SIZE = 10_000
+
+
+def _times(now, seconds_ago):
+    return np.datetime64(now, 'us') - (np.asarray(seconds_ago) * 1e6).astype('timedelta64[us]')
+
+
+def _insert(table, count, batch_size, columns):
+    """Insert ``count`` rows a batch at a time.
+
+    Columns are NumPy arrays (datetime64[us] slices come back as datetimes)
+    or callables taking a slice, so no column is ever a million Python
+    objects at once.
+    """
+    names = list(columns)
+    for start in range(0, count, batch_size):
+        window = slice(start, min(start + batch_size, count))
+        values = [
+            column(window) if callable(column) else column[window].tolist()
+            for column in columns.values()
+        ]
+        db.session.execute(insert(table), [dict(zip(names, row)) for row in zip(*values)])
+        db.session.commit()
+
+
+def _reset_sequences():
+    # Rows carry explicit ids so requests can point at donations without a
+    # round trip; Postgres sequences do not see those and must catch up
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for table in ('user', 'donation', 'request'):
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM \"{table}\"))"
+        ))
+    db.session.commit()
+
+
+def _users(rng, count, now, cities, batch_size):
+    admins = max(1, round(count * ADMIN_SHARE))
+    ngos = max(1, round(count * NGO_SHARE))
+    roles = np.array(['admin'] * admins + ['ngo'] * ngos + ['donor'] * (count - admins - ngos))
+    rng.shuffle(roles)
+    ids = np.arange(1, count + 1)
+    city = rng.integers(len(cities), size=count)
+    approved = (roles != 'ngo') | (rng.random(count) >= UNAPPROVED_NGO_SHARE)
+    names = np.char.add(roles, ids.astype(str))
+    kinds = {'ngo': 'Food Bank', 'donor': 'Kitchen'}
+    password_hash = passwords.hash_password(PASSWORD)
+
+    created = _times(now, rng.uniform(0, HISTORY_DAYS * 86400, count))
+    _insert(User.__table__, count, batch_size, {
+        'id': ids,
+        'username': names,
+        'email': np.char.add(names, '@example.org'),
+        'password_hash': lambda window: [password_hash] * len(ids[window]),
+        'role': roles,
+        'organization_name': lambda window: [
+            f'{cities[c][0]} {kinds[role]} {i}' if role in kinds else ''
+            for role, c, i in zip(roles[window], city[window], ids[window])
+        ],
+        'contact_number': lambda window: [f'+91 9{i:09d}' for i in ids[window]],
+        # Geocodable, so route planning can fall back to the address
+        'address': lambda window: [cities[c][0] for c in city[window]],
+        'is_approved': approved,
+        'created_at': created,
+        'updated_at': created,
+    })
+    return {role: ids[(roles == role) & approved] for role in ('admin', 'ngo', 'donor')}
+
+
+def _donations(rng, count, donor_ids, now):
+    """Per-donation arrays: who, when, and the status each one ends in."""
+    # Older donations get lower ids, as they would have
+    created_ago = np.sort(HISTORY_DAYS * 86400 * rng.random(count) ** GROWTH)[::-1]
+    shelf = rng.uniform(SHELF_HOURS[0] * 3600, SHELF_HOURS[1] * 3600, count)
+    expiry_ago = created_ago - shelf
+    live = expiry_ago < 0
+
+    roll = rng.random(count)
+    status = np.where(live, np.where(roll < 0.6, 'available', 'claimed'),
+                      np.where(roll < 0.65, 'collected', 'expired'))
+    # Closed rows were last touched between posting and expiry
+    closed_ago = np.where(status == 'expired', expiry_ago,
+                          created_ago - shelf * rng.uniform(0.1, 0.9, count))
+
+    weights = 1.0 / np.arange(1, len(donor_ids) + 1) ** DONOR_SKEW
+    return {
+        'donor_id': rng.choice(rng.permutation(donor_ids), size=count, p=weights / weights.sum()),
+        'status': status,
+        'created_ago': created_ago,
+        'expiry_ago': expiry_ago,
+        'updated_ago': np.where(live, created_ago * rng.uniform(0, 1, count), closed_ago),
+        # Requests fall between posting and the donation closing (or now)
+        'closed_ago': np.maximum(np.where(live, 0, closed_ago), 0),
+    }
+
+
+def _requests(rng, count, donations, ngo_ids, now):
+    """Request columns; settles donations that ended up with no request."""
+    status = donations['status']
+    per_donation = rng.multinomial(count, np.full(len(status), 1 / len(status)))
+    # A claim or a collection needs at least one request behind it
+    unclaimed = np.where(status == 'collected', 'expired',
+                         np.where(status == 'claimed', 'available', status))
+    status = donations['status'] = np.where(per_donation == 0, unclaimed, status)
+
+    donation_index = np.repeat(np.arange(len(status)), per_donation)
+    first = np.repeat(np.cumsum(per_donation) - per_donation, per_donation)
+    position = np.arange(count) - first
+    total = per_donation[donation_index]
+    last = position == total - 1
+
+    # Spread in order over the window, so only the last one can be open
+    start = donations['created_ago'][donation_index]
+    end = donations['closed_ago'][donation_index]
+    created_ago = start - (start - end) * (position + rng.uniform(0, 1, count)) / total
+    updated_at = _times(now, np.maximum(created_ago - rng.uniform(60, 3600, count), end))
+
+    final = status[donation_index]
+    open_status = np.where(rng.random(count) < 0.5, 'pending', 'approved')
+    request_status = np.where(~last, 'rejected', np.select(
+        [final == 'collected', final == 'claimed', final == 'expired'],
+        ['collected', open_status, 'cancelled'], 'rejected'))
+    message = rng.integers(len(MESSAGES), size=count)
+    return {
+        'id': np.arange(1, count + 1),
+        'donation_id': donation_index + 1,
+        'ngo_id': rng.choice(ngo_ids, size=count),
+        'message': lambda window: [MESSAGES[m] for m in message[window]],
+        'status': request_status,
+        'collection_time': np.where(request_status == 'collected', updated_at, np.datetime64('NaT')),
+        'created_at': _times(now, created_ago),
+        'updated_at': updated_at,
+    }
+
+
+def _donation_columns(rng, donations, now, cities):
+    count = len(donations['status'])
+    ids = np.arange(1, count + 1)
+    city = rng.integers(len(cities), size=count)
+    centres = np.array([point for _, point in cities])
+    latitude = centres[city, 0] + rng.normal(0, SCATTER_DEGREES, count)
+    longitude = centres[city, 1] + rng.normal(0, SCATTER_DEGREES, count)
+    item = rng.integers(len(ITEMS), size=count)
+    amount = rng.integers(1, 60, size=count)
+    packaging = rng.integers(len(PACKAGING), size=count)
+    return {
+        'id': ids,
+        'title': lambda window: [f'{ITEMS[i]} {n}' for i, n in zip(item[window], ids[window])],
+        'description': lambda window: [
+            f'{ITEMS[i]} from {cities[c][0]}, packed on site'
+            for i, c in zip(item[window], city[window])
+        ],
+        'quantity': lambda window: [
+            f'{a} {PACKAGING[p]}' for a, p in zip(amount[window], packaging[window])
+        ],
+        'food_type': np.array(FOOD_TYPES)[rng.choice(len(FOOD_TYPES), size=count, p=FOOD_TYPE_WEIGHTS)],
+        'expiry_time': _times(now, donations['expiry_ago']),
+        'location': lambda window: [cities[c][0] for c in city[window]],
+        'latitude': latitude,
+        'longitude': longitude,
+        'geo_cell': lambda window: [
+            geo.grid_cell(lat, lng) for lat, lng in zip(latitude[window], longitude[window])
+        ],
+        'image_url': lambda window: [None] * len(ids[window]),
+        'status': donations['status'],
+        'donor_id': donations['donor_id'],
+        'created_at': _times(now, donations['created_ago']),
+        'updated_at': _times(now, donations['updated_ago']),
+    }
+
+
+def generate(users, donations, requests, seed=0, now=None, batch_size=BATCH_SIZE):
+    """Insert the synthetic rows into empty tables; returns row counts.
+
+    Runs inside an app context. Bulk inserts skip the ORM rollup hooks and,
+    on SQLite, the per-row search trigger, so both are rebuilt in one pass
+    at the end.
+    """
+    rng = np.random.default_rng(seed)
+    now = now or datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    cities = sorted((name.title(), point) for name, point in geo.gazetteer().items())
+
+    role_ids = _users(rng, users, now, cities, batch_size)
+    plan = _donations(rng, donations, role_ids['donor'], now)
+    # Request counts decide the final donation statuses, so they come first
+    request_columns = _requests(rng, requests, plan, role_ids['ngo'], now)
+    donation_columns = _donation_columns(rng, plan, now, cities)
+
+    fts = search.uses_fts()
+    if fts:
+        db.session.execute(text('DROP TRIGGER donation_fts_ai'))
+        db.session.commit()
+    try:
+        _insert(Donation.__table__, donations, batch_size, donation_columns)
+    finally:
+        if fts:
+            db.session.rollback()
+            db.session.execute(text("INSERT INTO donation_fts(donation_fts) VALUES ('rebuild')"))
+            db.session.execute(text(DONATION_FTS_INSERT_TRIGGER))
+            db.session.commit()
+    _insert(Request.__table__, requests, batch_size, request_columns)
+    _reset_sequences()
+    rollups.backfill()
+
+    return {
+        'users': users,
+        'donations': donations,
+        'requests': requests,
+        'seed': seed,
+        'now': now.isoformat(),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--db', default=os.path.join(os.getcwd(), 'bench.db'),
+                        help='SQLite file to create; must not exist yet.')
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--donations', type=int, default=1_000_000)
+    parser.add_argument('--requests', type=int, default=3_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--now', type=datetime.fromisoformat,
+                        help='Anchor for all timestamps (default: this hour).')
+    args = parser.parse_args()
+    if os.path.exists(args.db):
+        parser.error(f'{args.db} already exists')
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(args.db)}'})
+    started = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        result = generate(args.users, args.donations, args.requests, args.seed, args.now)
+    result.update(benchmark='generate', db=args.db, seconds=round(time.perf_counter() - started, 1))
+    print(json.dumps(result))
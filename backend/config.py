@@ -2,20 +2,77 @@ import os
 from datetime import timedelta
 
 class Config:
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-here-change-in-production'
+    """Defaults for create_app; subclass it (or pass a mapping) to override."""
+    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
+    # DATABASE_URL, else the SQLite file in the instance folder
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///service_to_surplus.db'
+    # Applied on connect to SQLite files (see app.services.database); None
+    # means DEFAULT_SQLITE_PRAGMAS, {} turns them off
+    SQLITE_PRAGMAS = None
+    # Marked read-only endpoints read from here when set (see
+    # app.services.replicas); a user's own writes keep them on the primary
+    # for REPLICA_STICKY_SECONDS
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+    REPLICA_STICKY_SECONDS = 5
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-string-change-in-production'
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-change-in-production'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
-    UPLOAD_FOLDER = 'uploads'
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    CURRENT_USER_CACHE_SIZE = 1024
+    CURRENT_USER_CACHE_TTL = int(os.environ.get('CURRENT_USER_CACHE_TTL', 60))
+    CORS_HEADERS = 'Content-Type'
+
+    # Uploaded media; None puts it beside the SQLite database in the instance folder
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    
-    # Email configuration
+    # POST /api/donations/bulk streams its body and has its own limit:
+    # 100k NDJSON rows are about 18MB
+    BULK_IMPORT_MAX_BYTES = 64 * 1024 * 1024
+    # Larger images are refused before they are decoded
+    MAX_IMAGE_PIXELS = 50_000_000
+    # Let a fronting nginx/Apache stream media files itself
+    USE_X_SENDFILE = False
+    SSE_HEARTBEAT_SECONDS = 15
+    CHAT_LONG_POLL_SECONDS = 25
+    # run.py starts the in-process sweeper; `flask expiry worker` is the alternative
+    EXPIRY_SWEEP_INTERVAL = 60
+    EXPIRY_SWEEP_BATCH_SIZE = 500
+    # Closed donations leave the hot tables after this long (`flask archive run`)
+    ARCHIVE_RETENTION_DAYS = 90
+    ARCHIVE_BATCH_SIZE = 1000
+    # NGO feature vectors are rebuilt at most this often, on a background
+    # thread unless that is turned off; new donations are pushed to this
+    # many best-matched NGOs
+    MATCHING_FEATURE_TTL = 300
+    MATCHING_BACKGROUND_REBUILD = True
+    MATCHING_NOTIFY_TOP = 5
+    # Pickup route planning: average travel speed, time spent at each stop,
+    # and how long 2-opt may keep improving a route
+    ROUTE_SPEED_KMH = 25
+    ROUTE_SERVICE_MINUTES = 10
+    ROUTE_TIME_BUDGET = 0.5
+
+    # Notification email goes through the outbox table; `flask outbox worker`
+    # delivers it in batches over one SMTP connection. STARTTLS stays on
+    # unless MAIL_USE_TLS turns it off, and credentials are refused without
+    # TLS or SSL (see app.services.outbox)
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
-    MAIL_USE_TLS = True
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() in ('1', 'true', 'yes')
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
-    
+    MAIL_DEFAULT_SENDER = 'noreply@servicetosurplus.org'
+    OUTBOX_BATCH_SIZE = 100
+    OUTBOX_POLL_INTERVAL = 5
+    OUTBOX_LEASE_SECONDS = 300
+    OUTBOX_MAX_ATTEMPTS = 8
+    OUTBOX_RETRY_BASE_SECONDS = 30
+    OUTBOX_RETRY_MAX_SECONDS = 3600
+
     # Admin email for notifications
-    ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'admin@servicetosurplus.org')
\ No newline at end of file
+    ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'admin@servicetosurplus.org')
+
+    # Requests at least this slow are logged with their slowest SQL
+    # statements; None turns the log (and statement capture) off
+    SLOW_REQUEST_SECONDS = None
@@ -0,0 +1,33 @@
+"""Add archive_total
+
+Revision ID: a1d6e9f3c842
+Revises: e8b3c5d71f26
+Create Date: 2026-10-19 14:05:12.318904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1d6e9f3c842'
+down_revision = 'e8b3c5d71f26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('archive_total',
+        sa.Column('name', sa.String(length=20), nullable=False),
+        sa.Column('archived', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    # Count what earlier runs already archived
+    for name in ('donation', 'request', 'message'):
+        op.execute(
+            f"INSERT INTO archive_total (name, archived) SELECT '{name}', COUNT(*) FROM {name}_archive"
+        )
+
+
+def downgrade():
+    op.drop_table('archive_total')
@@ -0,0 +1,26 @@
+"""Add donation expiry index
+
+Revision ID: a82e6c4f9d13
+Revises: f6a3d8b2c419
+Create Date: 2026-10-18 16:40:12.884105
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a82e6c4f9d13'
+down_revision = 'f6a3d8b2c419'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.create_index('ix_donation_status_expiry_time', ['status', 'expiry_time'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.drop_index('ix_donation_status_expiry_time')
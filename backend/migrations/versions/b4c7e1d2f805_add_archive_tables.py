@@ -0,0 +1,105 @@
+"""Add archive tables
+
+Revision ID: b4c7e1d2f805
+Revises: a82e6c4f9d13
+Create Date: 2026-10-18 17:21:05.130442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4c7e1d2f805'
+down_revision = 'a82e6c4f9d13'
+branch_labels = None
+depends_on = None
+
+
+# Archived ids must never be handed out again, which plain SQLite rowids do
+# once the highest row is deleted
+AUTOINCREMENT_TABLES = ('donation', 'request', 'message')
+
+
+def _set_sqlite_autoincrement(enabled):
+    # Server databases hand ids out from sequences that never go backwards;
+    # only SQLite needs its tables rebuilt
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in AUTOINCREMENT_TABLES:
+        with op.batch_alter_table(table, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': enabled}):
+            pass
+
+
+def upgrade():
+    _set_sqlite_autoincrement(True)
+
+    op.create_table('donation_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('quantity', sa.String(length=100), nullable=False),
+    sa.Column('food_type', sa.String(length=50), nullable=True),
+    sa.Column('expiry_time', sa.DateTime(), nullable=False),
+    sa.Column('location', sa.String(length=300), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('geo_cell', sa.Integer(), nullable=True),
+    sa.Column('image_url', sa.String(length=500), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('donor_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('donation_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_donation_archive_donor_id', ['donor_id'], unique=False)
+
+    op.create_table('request_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('donation_id', sa.Integer(), nullable=False),
+    sa.Column('ngo_id', sa.Integer(), nullable=False),
+    sa.Column('message', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('collection_time', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('request_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_request_archive_donation_id', ['donation_id'], unique=False)
+        batch_op.create_index('ix_request_archive_ngo_id', ['ngo_id'], unique=False)
+
+    op.create_table('message_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('request_id', sa.Integer(), nullable=False),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('read_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('message_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_message_archive_request_id_id', ['request_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('message_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_archive_request_id_id')
+
+    op.drop_table('message_archive')
+    with op.batch_alter_table('request_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_request_archive_ngo_id')
+        batch_op.drop_index('ix_request_archive_donation_id')
+
+    op.drop_table('request_archive')
+    with op.batch_alter_table('donation_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_donation_archive_donor_id')
+
+    op.drop_table('donation_archive')
+
+    _set_sqlite_autoincrement(False)
@@ -0,0 +1,44 @@
+"""Add composite indexes for hot query shapes
+
+Revision ID: b7c2d9e4f1a3
+Revises: a4fe65854ea6
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c2d9e4f1a3'
+down_revision = 'a4fe65854ea6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index('ix_user_is_approved_role', ['is_approved', 'role'], unique=False)
+
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.create_index('ix_donation_status_created_at', ['status', 'created_at'], unique=False)
+        batch_op.create_index('ix_donation_donor_id_created_at', ['donor_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_donation_created_at', ['created_at'], unique=False)
+
+    with op.batch_alter_table('request', schema=None) as batch_op:
+        batch_op.create_index('ix_request_ngo_id_created_at', ['ngo_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_request_donation_id_status', ['donation_id', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('request', schema=None) as batch_op:
+        batch_op.drop_index('ix_request_donation_id_status')
+        batch_op.drop_index('ix_request_ngo_id_created_at')
+
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.drop_index('ix_donation_created_at')
+        batch_op.drop_index('ix_donation_donor_id_created_at')
+        batch_op.drop_index('ix_donation_status_created_at')
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_is_approved_role')
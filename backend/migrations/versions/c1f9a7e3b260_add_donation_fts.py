@@ -0,0 +1,67 @@
+"""Add donation full-text index
+
+Revision ID: c1f9a7e3b260
+Revises: b4c7e1d2f805
+Create Date: 2026-10-18 18:05:39.771026
+
+SQLite only: other databases use the LIKE fallback in app.services.search.
+Note that a batch_alter_table(recreate=...) on donation drops these
+triggers, so any such migration must recreate them afterwards.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c1f9a7e3b260'
+down_revision = 'b4c7e1d2f805'
+branch_labels = None
+depends_on = None
+
+
+def _is_sqlite():
+    return op.get_bind().dialect.name == 'sqlite'
+
+
+def upgrade():
+    if not _is_sqlite():
+        return
+
+    op.execute("""
+        CREATE VIRTUAL TABLE donation_fts USING fts5(
+            title, description, location,
+            content='donation', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER donation_fts_ai AFTER INSERT ON donation BEGIN
+            INSERT INTO donation_fts(rowid, title, description, location)
+            VALUES (new.id, new.title, new.description, new.location);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER donation_fts_ad AFTER DELETE ON donation BEGIN
+            INSERT INTO donation_fts(donation_fts, rowid, title, description, location)
+            VALUES ('delete', old.id, old.title, old.description, old.location);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER donation_fts_au AFTER UPDATE OF title, description, location ON donation BEGIN
+            INSERT INTO donation_fts(donation_fts, rowid, title, description, location)
+            VALUES ('delete', old.id, old.title, old.description, old.location);
+            INSERT INTO donation_fts(rowid, title, description, location)
+            VALUES (new.id, new.title, new.description, new.location);
+        END
+    """)
+    # Index the donations that already exist
+    op.execute("INSERT INTO donation_fts(donation_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if not _is_sqlite():
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS donation_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS donation_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS donation_fts_ai")
+    op.execute("DROP TABLE IF EXISTS donation_fts")
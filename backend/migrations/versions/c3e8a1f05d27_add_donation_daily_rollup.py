@@ -0,0 +1,39 @@
+"""Add donation_daily_rollup
+
+Revision ID: c3e8a1f05d27
+Revises: b7c2d9e4f1a3
+Create Date: 2026-10-18 11:04:52.530917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8a1f05d27'
+down_revision = 'b7c2d9e4f1a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('donation_daily_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('food_type', sa.String(length=50), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status', 'food_type')
+    )
+
+    # Seed from existing rows; afterwards the donation write path keeps it current
+    op.execute(
+        "INSERT INTO donation_daily_rollup (day, status, food_type, count) "
+        "SELECT date(created_at), coalesce(status, 'available'), "
+        "coalesce(food_type, 'unspecified'), count(id) "
+        "FROM donation "
+        "GROUP BY date(created_at), coalesce(status, 'available'), coalesce(food_type, 'unspecified')"
+    )
+
+
+def downgrade():
+    op.drop_table('donation_daily_rollup')
@@ -0,0 +1,34 @@
+"""Add request.updated_at and donation version index
+
+Revision ID: d91b4c6e2a58
+Revises: c3e8a1f05d27
+Create Date: 2026-10-18 13:26:09.772140
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd91b4c6e2a58'
+down_revision = 'c3e8a1f05d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('request', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE request SET updated_at = created_at")
+
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.create_index('ix_donation_status_updated_at', ['status', 'updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.drop_index('ix_donation_status_updated_at')
+
+    with op.batch_alter_table('request', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
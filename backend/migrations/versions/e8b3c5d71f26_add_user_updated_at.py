@@ -0,0 +1,28 @@
+"""Add user.updated_at
+
+Revision ID: e8b3c5d71f26
+Revises: d4a2f8c61e97
+Create Date: 2026-10-19 10:12:41.508317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b3c5d71f26'
+down_revision = 'd4a2f8c61e97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute('UPDATE "user" SET updated_at = created_at')
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
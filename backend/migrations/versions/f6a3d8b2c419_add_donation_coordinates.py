@@ -0,0 +1,34 @@
+"""Add donation coordinates
+
+Revision ID: f6a3d8b2c419
+Revises: e5f27a9c3b14
+Create Date: 2026-10-18 16:02:47.518320
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a3d8b2c419'
+down_revision = 'e5f27a9c3b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows get coordinates from `flask geo backfill`, which runs in
+    # batches against the gazetteer instead of inside this transaction
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('geo_cell', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_donation_status_geo_cell', ['status', 'geo_cell'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.drop_index('ix_donation_status_geo_cell')
+        batch_op.drop_column('geo_cell')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
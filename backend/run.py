@@ -1,11 +1,10 @@
+import os
+
 from app import create_app
-from flask_cors import CORS
+from app.services import expiry
 
 app = create_app()
 
-# Apply CORS AFTER app is created
-CORS(app, supports_credentials=True)
-
 if __name__ == '__main__':
     print("=" * 60)
     print("🚀 SERVICE TO SURPLUS - BACKEND SERVER")
@@ -19,4 +18,8 @@ if __name__ == '__main__':
     print("⏹️  Press CTRL+C to stop the server")
     print("=" * 60)
 
+    # The debug reloader forks; only sweep from the process that serves
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        expiry.start_scheduler(app)
+
     app.run(debug=True, host='0.0.0.0', port=5000)
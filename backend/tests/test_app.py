@@ -0,0 +1,52 @@
+from sqlalchemy import inspect
+
+from app import create_app, db
+from benchmarks import bench_startup
+from config import Config
+
+
+class ScratchConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    ARCHIVE_RETENTION_DAYS = 30
+
+
+def test_factory_takes_a_config_object():
+    app = create_app(ScratchConfig)
+
+    assert app.config['TESTING'] and app.config['ARCHIVE_RETENTION_DAYS'] == 30
+    # Everything else still comes from Config
+    assert app.config['OUTBOX_BATCH_SIZE'] == Config.OUTBOX_BATCH_SIZE
+
+
+def test_building_an_app_leaves_the_database_and_stdout_alone(tmp_path, capsys):
+    create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "app.db"}'})
+
+    assert not (tmp_path / 'app.db').exists()
+    assert capsys.readouterr().out == ''
+
+
+def test_every_blueprint_is_registered():
+    app = create_app(ScratchConfig)
+
+    assert set(app.blueprints) == {
+        'auth', 'donations', 'users', 'admin', 'requests', 'messages', 'stream', 'media',
+    }
+
+
+def test_init_db_creates_the_tables(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "app.db"}'})
+
+    result = app.test_cli_runner().invoke(args=['init-db'])
+
+    assert result.exit_code == 0
+    with app.app_context():
+        assert {'user', 'donation', 'request'} <= set(inspect(db.engine).get_table_names())
+        db.engine.dispose()
+
+
+def test_cold_start_stays_within_budget():
+    result = bench_startup.run(runs=3)
+
+    assert result['deferred_modules_loaded'] == []
+    assert result['median_s'] < bench_startup.BUDGET_SECONDS
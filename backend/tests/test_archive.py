@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import db
+from app.models import Donation, Message, Request, donation_archive, message_archive, request_archive
+from app.services import archive
+from app.services.rollups import backfill, donation_report
+
+
+def _count(table):
+    return db.session.execute(db.select(db.func.count()).select_from(table)).scalar()
+
+
+def _closed(make_donation, donor, status, days_ago):
+    return make_donation(donor, status=status, updated_at=datetime.utcnow() - timedelta(days=days_ago))
+
+
+def test_run_moves_old_terminal_donations_with_requests_and_chat(make_user, make_donation):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    old = _closed(make_donation, donor, 'collected', 200)
+    recent = _closed(make_donation, donor, 'collected', 5)
+    available = _closed(make_donation, donor, 'available', 200)
+    req = Request(donation_id=old.id, ngo_id=ngo.id, status='collected')
+    db.session.add(req)
+    db.session.flush()
+    db.session.add(Message(request_id=req.id, sender_id=ngo.id, body='Picked up'))
+    db.session.commit()
+    old_id, kept = old.id, {recent.id, available.id}
+
+    metrics = archive.run(retention_days=90, batch_size=10)
+
+    assert (metrics['donations_archived'], metrics['requests_archived'], metrics['messages_archived']) == (1, 1, 1)
+    assert {d.id for d in Donation.query} == kept
+    assert Request.query.count() == 0 and Message.query.count() == 0
+    archived = db.session.execute(db.select(donation_archive)).one()
+    assert archived.id == old_id and archived.archived_at is not None
+    assert _count(request_archive) == 1 and _count(message_archive) == 1
+
+
+def test_run_deletes_only_what_it_copied(make_user, make_donation, monkeypatch):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    req = Request(donation_id=_closed(make_donation, donor, 'collected', 200).id, ngo_id=ngo.id,
+                  status='collected')
+    db.session.add(req)
+    db.session.flush()
+    db.session.add(Message(request_id=req.id, sender_id=ngo.id, body='Picked up'))
+    db.session.commit()
+    monkeypatch.setattr(archive, 'DELETE_CHUNK_ROWS', 1)
+    engine = db.engine
+
+    def late_message(conn, clauseelement, multiparams, params, execution_options, result):
+        # A message committed after the archive copy, before the delete
+        if getattr(clauseelement, 'table', None) is message_archive:
+            conn.execute(Message.__table__.insert().values(
+                request_id=req.id, sender_id=ngo.id, body='One more thing', created_at=datetime.utcnow()))
+    event.listen(engine, 'after_execute', late_message)
+    try:
+        metrics = archive.run(retention_days=90)
+    finally:
+        event.remove(engine, 'after_execute', late_message)
+
+    assert metrics['messages_archived'] == 1
+    assert [m.body for m in Message.query] == ['One more thing']
+    assert _count(message_archive) == 1
+
+
+def test_run_leaves_donations_with_open_requests(make_user, make_donation):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    donation = _closed(make_donation, donor, 'expired', 200)
+    db.session.add(Request(donation_id=donation.id, ngo_id=ngo.id, status='approved'))
+    db.session.commit()
+
+    assert archive.run(retention_days=90)['donations_archived'] == 0
+    assert Donation.query.count() == 1
+
+
+def test_run_works_in_batches(make_user, make_donation):
+    donor = make_user('donor')
+    for _ in range(5):
+        _closed(make_donation, donor, 'expired', 100)
+
+    metrics = archive.run(retention_days=90, batch_size=2)
+
+    assert metrics['batches'] == 3
+    assert _count(donation_archive) == 5
+
+
+def test_stats_and_reports_still_count_archived_history(client, make_user, make_donation, auth_headers):
+    admin = make_user('admin')
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    old = _closed(make_donation, donor, 'collected', 200)
+    db.session.add(Request(donation_id=old.id, ngo_id=ngo.id, status='collected'))
+    make_donation(donor)
+    db.session.commit()
+    today = datetime.utcnow().date()
+    before = donation_report(today, today)
+
+    archive.run(retention_days=90)
+
+    admin_stats = client.get('/api/admin/stats', headers=auth_headers(admin)).get_json()['stats']
+    donor_stats = client.get('/api/users/stats', headers=auth_headers(donor)).get_json()['stats']
+    ngo_stats = client.get('/api/users/stats', headers=auth_headers(ngo)).get_json()['stats']
+    assert (admin_stats['total_donations'], admin_stats['completed_donations'], admin_stats['total_requests']) == (2, 1, 1)
+    assert (donor_stats['total_donations'], donor_stats['completed_donations']) == (2, 1)
+    assert ngo_stats['completed_requests'] == 1
+    assert donation_report(today, today) == before
+
+
+def test_admin_stats_never_scan_the_archive(client, make_user, make_donation, auth_headers, query_counter):
+    admin = make_user('admin')
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    for _ in range(3):
+        old = _closed(make_donation, donor, 'collected', 200)
+        db.session.add(Request(donation_id=old.id, ngo_id=ngo.id, status='collected'))
+    db.session.commit()
+    archive.run(retention_days=90)
+    make_donation(donor)
+    headers = auth_headers(admin)
+
+    query_counter.reset()
+    stats = client.get('/api/admin/stats', headers=headers).get_json()['stats']
+
+    assert (stats['total_donations'], stats['active_donations'], stats['completed_donations'],
+            stats['total_requests']) == (4, 1, 3, 3)
+    assert not any('_archive' in statement for statement in query_counter.statements)
+
+
+def test_backfill_keeps_archived_donations_in_the_rollup(make_user, make_donation):
+    donor = make_user('donor')
+    _closed(make_donation, donor, 'collected', 200)
+    make_donation(donor)
+    archive.run(retention_days=90)
+    today = datetime.utcnow().date()
+    before = donation_report(today, today)
+
+    backfill()
+
+    assert donation_report(today, today) == before
+
+
+def test_ids_are_not_reused_after_archiving(make_user, make_donation):
+    donor = make_user('donor')
+    archived_id = _closed(make_donation, donor, 'collected', 200).id
+
+    archive.run(retention_days=90)
+
+    assert make_donation(donor).id > archived_id
@@ -0,0 +1,116 @@
+from flask_jwt_extended import decode_token
+
+from app import db
+from app.models import User
+from app.services import passwords
+
+
+def _register(client, **overrides):
+    payload = {
+        'username': 'kitchen',
+        'email': 'kitchen@example.org',
+        'password': 'secret123',
+        'role': 'donor',
+    }
+    payload.update(overrides)
+    return client.post('/api/auth/register', json=payload)
+
+
+def _login(client, email='kitchen@example.org', password='secret123'):
+    return client.post('/api/auth/login', json={'email': email, 'password': password})
+
+
+def test_register_then_login(client):
+    assert _register(client).status_code == 201
+
+    response = _login(client)
+
+    assert response.status_code == 200
+    assert response.get_json()['user']['role'] == 'donor'
+    assert _login(client, password='wrong').status_code == 401
+
+
+def test_hash_uses_configured_cost(app):
+    user = User(username='u', email='u@example.org', role='donor')
+    user.set_password('secret123')
+
+    assert user.password_hash.split('$')[2] == '04'
+    assert not user.password_needs_rehash()
+
+
+def test_login_rehashes_when_cost_changes(app, client):
+    _register(client)
+    old_hash = User.query.one().password_hash
+
+    app.config['BCRYPT_LOG_ROUNDS'] = 5
+    assert _login(client).status_code == 200
+
+    db.session.expire_all()
+    new_hash = User.query.one().password_hash
+    assert new_hash != old_hash
+    assert new_hash.split('$')[2] == '05'
+    assert _login(client).status_code == 200
+
+
+def test_hashing_in_process_pool(app):
+    app.config['PASSWORD_HASH_WORKERS'] = 1
+    try:
+        password_hash = passwords.hash_password('secret123')
+        assert passwords.check_password('secret123', password_hash)
+        assert not passwords.check_password('nope', password_hash)
+    finally:
+        passwords.shutdown()
+
+
+def test_login_token_carries_role_claims(client):
+    _register(client, role='ngo')
+
+    token = _login(client).get_json()['access_token']
+    response = client.get('/api/auth/profile', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    assert response.get_json()['role'] == 'ngo'
+    claims = decode_token(token)
+    assert claims['role'] == 'ngo'
+    assert claims['is_approved'] is False
+
+
+def test_identity_lookup_is_cached(client, make_user, auth_headers, query_counter):
+    ngo = make_user('ngo')
+    headers = auth_headers(ngo)
+    db.session.expire_all()
+    query_counter.reset()
+
+    client.get('/api/users/stats', headers=headers)
+    cold = query_counter.count
+    query_counter.reset()
+    client.get('/api/users/stats', headers=headers)
+    warm = query_counter.count
+
+    # Role comes from the token, the user row from the cache: only the stats query runs
+    assert warm == 1
+    assert cold == 2
+
+
+def test_profile_update_invalidates_cached_user(client, make_user, auth_headers):
+    donor = make_user('donor', organization_name='Old Bakery')
+    headers = auth_headers(donor)
+    assert client.get('/api/auth/profile', headers=headers).get_json()['organization_name'] == 'Old Bakery'
+
+    client.put('/api/users/profile', headers=headers, json={'organization_name': 'New Bakery'})
+
+    assert client.get('/api/auth/profile', headers=headers).get_json()['organization_name'] == 'New Bakery'
+
+
+def test_admin_approval_invalidates_cached_user(app, client, make_user, auth_headers):
+    admin = make_user('admin')
+    ngo = make_user('ngo', is_approved=False)
+    ngo_id = ngo.id
+    client.get('/api/auth/profile', headers=auth_headers(ngo))
+    cache = app.extensions['current_user_cache']
+    assert cache.get(ngo_id).is_approved is False
+
+    response = client.post(f'/api/admin/users/{ngo_id}/approve', headers=auth_headers(admin))
+
+    assert response.status_code == 200
+    assert cache.get(ngo_id) is None
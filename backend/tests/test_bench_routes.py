@@ -0,0 +1,15 @@
+from benchmarks import bench_routes
+
+
+def test_harness_runs_at_a_tiny_scale():
+    # Few enough rows that some write pools run dry; approvals are topped up
+    result = bench_routes.run(None, scale=0.001, iterations=3, threads=2,
+                              modes=['test_client', 'http'], only=r'^(admin|requests)\.', seed=0)
+
+    for mode in ('test_client', 'http'):
+        scenarios = result['modes'][mode]
+        assert set(scenarios) == {s.name for s in bench_routes.SCENARIOS
+                                  if s.name.startswith(('admin.', 'requests.'))}
+        assert scenarios['admin.approve']['requests'] == 3
+        assert scenarios['admin.approve']['errors'] == 0
+    assert result['modes']['http']['requests.update_status'] == {'requests': 0}
@@ -0,0 +1,165 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Donation, DonationDailyRollup
+from app.services import archive, rollups
+
+
+def _expiry(hours=6):
+    return (datetime.utcnow() + timedelta(hours=hours)).isoformat()
+
+
+def _rollup_counts():
+    return {
+        (row.status, row.food_type): row.count
+        for row in DonationDailyRollup.query.all() if row.count
+    }
+
+
+def test_csv_import_validates_each_row(client, make_user, auth_headers):
+    donor = make_user('donor')
+    body = io.StringIO()
+    writer = csv.writer(body)
+    writer.writerow(['title', 'quantity', 'food_type', 'expiry_time', 'location', 'latitude', 'longitude'])
+    writer.writerow(['Rice', '5 kg', 'vegan', _expiry(), 'Bandra, Mumbai', '', ''])
+    writer.writerow(['Dal', '3 kg', '', _expiry(), 'Depot', '19.1', '72.9'])
+    writer.writerow(['', '1', 'vegan', _expiry(), 'Depot', '', ''])
+    writer.writerow(['Roti', '20', 'vegan', 'tomorrow', 'Depot', '', ''])
+    writer.writerow(['Curd', '2', 'vegan', _expiry(), 'Depot', '95', '72.9'])
+
+    response = client.post('/api/donations/bulk', data=body.getvalue().encode(),
+                           content_type='text/csv', headers=auth_headers(donor))
+
+    assert response.status_code == 201
+    result = response.get_json()
+    assert (result['imported'], result['failed']) == (2, 3)
+    assert result['errors'] == [
+        {'row': 4, 'error': 'title is required'},
+        {'row': 5, 'error': 'Invalid expiry_time format'},
+        {'row': 6, 'error': 'Invalid latitude/longitude'},
+    ]
+
+    rice = Donation.query.filter_by(title='Rice').one()
+    dal = Donation.query.filter_by(title='Dal').one()
+    assert rice.donor_id == donor.id and rice.status == 'available'
+    assert rice.latitude is not None and rice.geo_cell is not None
+    assert (dal.food_type, dal.latitude, dal.longitude) == ('vegetarian', 19.1, 72.9)
+
+
+def test_ndjson_import_keeps_rollups_and_search_in_step(client, make_user, make_donation, auth_headers,
+                                                        monkeypatch):
+    monkeypatch.setattr('app.services.bulk.IMPORT_BATCH_SIZE', 3)
+    donor = make_user('donor')
+    lines = [json.dumps({'title': f'Mango crate {i}', 'quantity': i, 'food_type': 'vegan',
+                         'expiry_time': _expiry(), 'location': 'Pune'}) for i in range(7)]
+    lines[2] = '{not json'
+    lines.insert(4, '')
+
+    response = client.post('/api/donations/bulk', data='\n'.join(lines).encode(),
+                           content_type='application/x-ndjson', headers=auth_headers(donor))
+
+    result = response.get_json()
+    assert (result['imported'], result['failed']) == (6, 1)
+    assert result['errors'] == [{'row': 3, 'error': 'Invalid JSON'}]
+
+    counts = _rollup_counts()
+    assert counts == {('available', 'vegan'): 6}
+    rollups.backfill()
+    assert _rollup_counts() == counts
+
+    found = client.get('/api/donations/search?q=mango', headers=auth_headers(donor)).get_json()
+    assert len(found['donations']) == 6
+
+    # The import swaps the FTS insert trigger out and back in
+    make_donation(donor, title='Mango pulp')
+    found = client.get('/api/donations/search?q=mango', headers=auth_headers(donor)).get_json()
+    assert len(found['donations']) == 7
+
+
+def test_bulk_import_rejects_other_roles_and_formats(client, make_user, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+
+    assert client.post('/api/donations/bulk', data=b'', content_type='text/csv',
+                       headers=auth_headers(ngo)).status_code == 403
+    assert client.post('/api/donations/bulk', json=[],
+                       headers=auth_headers(donor)).status_code == 415
+    empty = client.post('/api/donations/bulk', data=b'title\n', content_type='text/csv',
+                        headers=auth_headers(donor))
+    assert empty.status_code == 422 and empty.get_json()['imported'] == 0
+
+
+def test_bulk_import_has_its_own_size_limit(app, client, make_user, auth_headers):
+    headers = auth_headers(make_user('donor'))
+    row = json.dumps({'title': 'Rice', 'quantity': '5 kg', 'food_type': 'vegan',
+                      'expiry_time': _expiry(), 'location': 'Depot'})
+    body = '\n'.join([row] * 20).encode()
+    app.config.update(MAX_CONTENT_LENGTH=len(body) // 2, BULK_IMPORT_MAX_BYTES=len(body))
+
+    def post(data):
+        return client.post('/api/donations/bulk', data=data,
+                           content_type='application/x-ndjson', headers=headers)
+
+    assert post(body).status_code == 201
+    assert post(body + b'\n' + row.encode()).status_code == 413
+
+
+def test_create_donation_reports_missing_fields(client, make_user, auth_headers):
+    donor = make_user('donor')
+    response = client.post('/api/donations', json={'title': 'Bread', 'expiry_time': _expiry()},
+                           headers=auth_headers(donor))
+    assert response.status_code == 422
+    assert response.get_json() == {'error': 'quantity is required'}
+
+
+def test_export_streams_ndjson_and_csv(client, app, make_user, make_donation, auth_headers, monkeypatch):
+    monkeypatch.setattr('app.services.bulk.EXPORT_CHUNK_ROWS', 2)
+    admin = make_user('admin')
+    donor = make_user('donor')
+    donations = [make_donation(donor, title=f'Item {i}') for i in range(5)]
+
+    response = client.get('/api/admin/export?type=donations', headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['id'] for row in rows] == [d.id for d in donations]
+    assert rows[0]['title'] == 'Item 0' and rows[0]['expiry_time'].startswith('20')
+
+    response = client.get('/api/admin/export?type=donations&format=csv', headers=auth_headers(admin))
+    parsed = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['title'] for row in parsed] == [f'Item {i}' for i in range(5)]
+    assert 'attachment; filename=donations.csv' == response.headers['Content-Disposition']
+
+
+def test_export_can_include_archived_rows(client, app, make_user, make_donation, auth_headers):
+    admin = make_user('admin')
+    donor = make_user('donor')
+    old = make_donation(donor, status='collected')
+    old.updated_at = datetime.utcnow() - timedelta(days=400)
+    db.session.commit()
+    old_id = old.id
+    archive.run(retention_days=90)
+    make_donation(donor)
+
+    hot = client.get('/api/admin/export?type=donations', headers=auth_headers(admin))
+    assert len(hot.get_data(as_text=True).splitlines()) == 1
+
+    everything = client.get('/api/admin/export?type=donations&include_archived=1',
+                            headers=auth_headers(admin))
+    ids = [json.loads(line)['id'] for line in everything.get_data(as_text=True).splitlines()]
+    assert old_id in ids and len(ids) == 2
+
+
+def test_export_is_admin_only_and_validates(client, make_user, auth_headers):
+    admin = make_user('admin')
+    donor = make_user('donor')
+    assert client.get('/api/admin/export', headers=auth_headers(donor)).status_code == 403
+    assert client.get('/api/admin/export?type=users', headers=auth_headers(admin)).status_code == 400
+    empty = client.get('/api/admin/export?type=requests&format=csv', headers=auth_headers(admin))
+    assert empty.get_data(as_text=True).strip() == ','.join(
+        ['id', 'donation_id', 'ngo_id', 'message', 'status', 'collection_time', 'created_at', 'updated_at']
+    )
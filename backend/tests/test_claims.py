@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models import User, Donation, Request, DonationDailyRollup
+
+
+def _claim(client, headers, donation_id):
+    return client.post(
+        f'/api/donations/{donation_id}/request',
+        headers=headers,
+        json={'message': 'We can collect today'},
+    )
+
+
+def test_claim_marks_donation_and_records_request(client, make_user, make_donation, auth_headers):
+    donation = make_donation(make_user('donor'))
+    ngo = make_user('ngo')
+
+    response = _claim(client, auth_headers(ngo), donation.id)
+
+    assert response.status_code == 201
+    db.session.expire_all()
+    assert db.session.get(Donation, donation.id).status == 'claimed'
+    req = Request.query.filter_by(donation_id=donation.id).one()
+    assert req.ngo_id == ngo.id
+    assert req.message == 'We can collect today'
+    assert {r.status: r.count for r in DonationDailyRollup.query.all()} == {
+        'available': 0,
+        'claimed': 1,
+    }
+
+
+def test_second_claim_is_refused(client, make_user, make_donation, auth_headers):
+    donation = make_donation(make_user('donor'))
+
+    assert _claim(client, auth_headers(make_user('ngo')), donation.id).status_code == 201
+    assert _claim(client, auth_headers(make_user('ngo')), donation.id).status_code == 404
+    assert Request.query.count() == 1
+
+
+def test_donor_cannot_claim(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    donation = make_donation(donor)
+
+    assert _claim(client, auth_headers(donor), donation.id).status_code == 403
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "claims.db"}',
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 32, 'max_overflow': 0},
+    })
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_concurrent_claims_have_exactly_one_winner(file_app):
+    claimants = 200
+    with file_app.app_context():
+        db.create_all()
+        donor = User(username='donor', email='donor@example.org', role='donor',
+                     is_approved=True, password_hash='!')
+        ngos = [
+            User(username=f'ngo{i}', email=f'ngo{i}@example.org', role='ngo',
+                 is_approved=True, password_hash='!')
+            for i in range(claimants)
+        ]
+        db.session.add_all([donor, *ngos])
+        db.session.flush()
+        donation = Donation(title='Rice', quantity='20kg', location='Depot',
+                            expiry_time=datetime.utcnow() + timedelta(hours=4),
+                            donor_id=donor.id)
+        db.session.add(donation)
+        db.session.commit()
+        donation_id = donation.id
+        tokens = [create_access_token(identity=str(ngo.id)) for ngo in ngos]
+
+    start = threading.Barrier(32)
+
+    def claim(token):
+        client = file_app.test_client()
+        try:
+            start.wait(timeout=5)
+        except threading.BrokenBarrierError:
+            pass
+        return _claim(client, {'Authorization': f'Bearer {token}'}, donation_id).status_code
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        codes = list(pool.map(claim, tokens))
+
+    assert codes.count(201) == 1
+    assert codes.count(404) == claimants - 1
+    with file_app.app_context():
+        assert Request.query.filter_by(donation_id=donation_id).count() == 1
+        assert db.session.get(Donation, donation_id).status == 'claimed'
@@ -0,0 +1,95 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+
+from app import create_app, db
+from app.models import Donation, User
+from app.services import database
+from config import Config
+
+
+def _file_app(tmp_path, **overrides):
+    return create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "app.db"}',
+                       **overrides})
+
+
+def _pragma(name):
+    return db.session.execute(text(f'PRAGMA {name}')).scalar()
+
+
+def test_sqlite_file_connections_are_tuned(tmp_path):
+    app = _file_app(tmp_path)
+    with app.app_context():
+        assert _pragma('journal_mode') == 'wal'
+        assert _pragma('synchronous') == 1  # NORMAL
+        assert _pragma('busy_timeout') == 10_000
+        assert _pragma('cache_size') == -64_000
+        assert db.engine.pool.size() == database.SQLITE_POOL['pool_size']
+        db.engine.dispose()
+
+
+def test_pragmas_can_be_turned_off(tmp_path):
+    app = _file_app(tmp_path, SQLITE_PRAGMAS={})
+    with app.app_context():
+        assert _pragma('journal_mode') == 'delete'
+        db.engine.dispose()
+
+
+def test_engine_options_keep_explicit_settings():
+    options = database.engine_options({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///app.db',
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 2},
+    })
+    assert options['pool_size'] == 2 and options['max_overflow'] == 20
+
+    assert database.engine_options({'SQLALCHEMY_DATABASE_URI': 'sqlite://'}) == {}
+    server = database.engine_options({'SQLALCHEMY_DATABASE_URI': 'postgresql://db/surplus'})
+    assert server['pool_pre_ping'] and server['pool_recycle'] == 1800
+
+
+def test_database_url_comes_from_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path / "env.db"}')
+    app = create_app({'TESTING': True})
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == f'sqlite:///{tmp_path / "env.db"}'
+    with app.app_context():
+        db.session.execute(text('SELECT 1'))
+        db.engine.dispose()
+    assert (tmp_path / 'env.db').exists()
+
+
+def test_concurrent_creates_and_reads_do_not_lock(tmp_path):
+    app = _file_app(tmp_path)
+    with app.app_context():
+        db.create_all()
+        donor = User(username='donor', email='donor@example.org', role='donor',
+                     is_approved=True, password_hash='!')
+        db.session.add(donor)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(donor.id))}'}
+    expiry = (datetime.utcnow() + timedelta(hours=6)).isoformat()
+    start = threading.Barrier(8)
+
+    def work(worker):
+        client = app.test_client()
+        start.wait(timeout=5)
+        codes = []
+        for i in range(15):
+            if worker % 2:
+                codes.append(client.get('/api/donations', headers=headers).status_code)
+            else:
+                codes.append(client.post('/api/donations', headers=headers, json={
+                    'title': f'Tray {worker}.{i}', 'quantity': '1', 'expiry_time': expiry,
+                    'location': 'Depot',
+                }).status_code)
+        return codes
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        codes = [code for worker in pool.map(work, range(8)) for code in worker]
+
+    assert set(codes) <= {200, 201}
+    with app.app_context():
+        assert Donation.query.count() == 4 * 15
+        db.engine.dispose()
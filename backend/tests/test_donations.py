@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Request
+
+
+def _fetch(client, headers, **params):
+    response = client.get('/api/donations', headers=headers, query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_ngo_feed_lists_available_donations_newest_first(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    older = make_donation(donor, title='Older', created_at=datetime.utcnow() - timedelta(hours=1))
+    newer = make_donation(donor, title='Newer')
+    make_donation(donor, title='Claimed', status='claimed')
+
+    body = _fetch(client, auth_headers(ngo))
+
+    assert [d['id'] for d in body['donations']] == [newer.id, older.id]
+    assert body['donations'][0]['donor_name'] == donor.username
+    assert body['next_cursor'] is None
+
+
+def test_cursor_walks_every_row_exactly_once(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    same_time = datetime.utcnow()
+    created = [make_donation(donor, created_at=same_time).id for _ in range(7)]
+
+    seen, cursor = [], None
+    while True:
+        params = {'limit': 3}
+        if cursor:
+            params['cursor'] = cursor
+        body = _fetch(client, auth_headers(ngo), **params)
+        seen.extend(d['id'] for d in body['donations'])
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+
+    assert seen == sorted(created, reverse=True)
+
+
+def test_filters_by_food_type_and_expiry_window(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    now = datetime.utcnow()
+    soon = make_donation(donor, food_type='vegan', expiry_time=now + timedelta(hours=1))
+    make_donation(donor, food_type='vegan', expiry_time=now + timedelta(days=2))
+    make_donation(donor, food_type='non-vegetarian', expiry_time=now + timedelta(hours=1))
+
+    body = _fetch(
+        client, auth_headers(ngo),
+        food_type='vegan',
+        expires_before=(now + timedelta(hours=2)).isoformat(),
+    )
+
+    assert [d['id'] for d in body['donations']] == [soon.id]
+
+
+def test_donor_sees_own_donations_and_can_filter_status(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    other = make_user('donor')
+    mine = make_donation(donor, status='claimed')
+    make_donation(donor)
+    make_donation(other, status='claimed')
+
+    body = _fetch(client, auth_headers(donor), status='claimed')
+
+    assert [d['id'] for d in body['donations']] == [mine.id]
+
+
+def test_invalid_cursor_is_rejected(client, make_user, auth_headers):
+    ngo = make_user('ngo')
+    response = client.get('/api/donations?cursor=not-a-cursor', headers=auth_headers(ngo))
+    assert response.status_code == 422
+
+
+def test_page_query_count_is_constant(client, make_user, make_donation, auth_headers, query_counter):
+    ngo = make_user('ngo')
+    headers = auth_headers(ngo)
+    _fetch(client, headers)  # warm the current-user cache
+
+    def queries_for_page(donor_count):
+        for i in range(donor_count):
+            make_donation(make_user('donor'))
+        db.session.expire_all()
+        query_counter.reset()
+        _fetch(client, headers, limit=50)
+        return query_counter.count
+
+    small = queries_for_page(3)
+    large = queries_for_page(60)
+
+    # One MAX/COUNT for the ETag, one for the page itself
+    assert small == large == 2
+
+
+def test_unchanged_feed_answers_304_without_loading_rows(client, make_user, make_donation, auth_headers, query_counter):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    make_donation(donor)
+    headers = auth_headers(ngo)
+
+    first = client.get('/api/donations', headers=headers)
+    etag = first.headers['ETag']
+    assert etag.startswith('W/')
+    assert 'no-cache' in first.headers['Cache-Control']
+
+    query_counter.reset()
+    again = client.get('/api/donations', headers={**headers, 'If-None-Match': etag})
+
+    assert again.status_code == 304
+    assert again.data == b''
+    assert query_counter.count == 1
+
+
+def test_feed_etag_changes_with_data_and_scope(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    donation = make_donation(donor)
+    headers = auth_headers(ngo)
+    etag = client.get('/api/donations', headers=headers).headers['ETag']
+
+    other_page = client.get('/api/donations?limit=1', headers={**headers, 'If-None-Match': etag})
+    assert other_page.status_code == 200
+
+    donation.title = 'Bread and butter'
+    db.session.commit()
+    changed = client.get('/api/donations', headers={**headers, 'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_feed_etag_follows_the_donor_name(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor', organization_name='Old Cafe')
+    ngo = make_user('ngo')
+    make_donation(donor)
+    headers = auth_headers(ngo)
+    etag = client.get('/api/donations', headers=headers).headers['ETag']
+
+    client.put('/api/users/profile', headers=auth_headers(donor), json={'organization_name': 'New Cafe'})
+
+    changed = client.get('/api/donations', headers={**headers, 'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.get_json()['donations'][0]['donor_name'] == 'New Cafe'
+
+
+def test_request_list_etag_follows_joined_fields(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    donation = make_donation(donor)
+    db.session.add(Request(donation_id=donation.id, ngo_id=ngo.id))
+    db.session.commit()
+    for viewer in (donor, ngo):
+        headers = auth_headers(viewer)
+        etag = client.get('/api/donations/requests', headers=headers).headers['ETag']
+
+        donation.title = f'Bread for {viewer.username}'
+        db.session.commit()
+
+        changed = client.get('/api/donations/requests', headers={**headers, 'If-None-Match': etag})
+        assert changed.status_code == 200
+        assert changed.get_json()[0]['donation_title'] == donation.title
+
+    headers = auth_headers(donor)
+    etag = client.get('/api/donations/requests', headers=headers).headers['ETag']
+    client.put('/api/users/profile', headers=auth_headers(ngo), json={'organization_name': 'Food Bank'})
+    changed = client.get('/api/donations/requests', headers={**headers, 'If-None-Match': etag})
+    assert changed.get_json()[0]['ngo_name'] == 'Food Bank'
+
+
+def test_request_list_conditional_get(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    req = Request(donation_id=make_donation(donor).id, ngo_id=ngo.id)
+    db.session.add(req)
+    db.session.commit()
+    headers = auth_headers(donor)
+
+    first = client.get('/api/donations/requests', headers=headers)
+    assert first.get_json()[0]['ngo_name'] == ngo.username
+    etag = first.headers['ETag']
+    assert client.get('/api/donations/requests', headers={**headers, 'If-None-Match': etag}).status_code == 304
+
+    req.status = 'approved'
+    db.session.commit()
+    assert client.get('/api/donations/requests', headers={**headers, 'If-None-Match': etag}).status_code == 200
@@ -0,0 +1,140 @@
+import gc
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from app.models import Request
+from app.services.events import InMemoryBroker
+from app.services.identity import identity_claims
+
+
+def _drain(broker, sub):
+    return [(event_type, payload) for _, event_type, payload in broker.listen(sub, 0)]
+
+
+def test_events_are_scoped_by_role_and_user():
+    broker = InMemoryBroker()
+    donor = broker.subscribe(1, 'donor')
+    other_donor = broker.subscribe(2, 'donor')
+    ngo = broker.subscribe(3, 'ngo')
+
+    delivered = broker.publish('donation.created', {'id': 7}, user_ids=(1,), roles=('ngo',))
+
+    assert delivered == 2
+    assert _drain(broker, donor) == [('donation.created', '{"id": 7}')]
+    assert _drain(broker, ngo) == [('donation.created', '{"id": 7}')]
+    assert _drain(broker, other_donor) == []
+
+
+def test_unsubscribe_releases_indexes():
+    broker = InMemoryBroker()
+    sub = broker.subscribe(1, 'ngo')
+    broker.unsubscribe(sub)
+
+    assert broker.subscriber_count() == 0
+    assert broker.publish('donation.created', {}, roles=('ngo',)) == 0
+
+
+def test_publish_wakes_only_its_recipient():
+    broker = InMemoryBroker()
+    subs = [broker.subscribe(user_id, 'donor') for user_id in range(20)]
+    woke = {}
+
+    def listen(sub):
+        started = time.monotonic()
+        events = broker.listen(sub, 1.0)
+        woke[sub.user_id] = (time.monotonic() - started, events)
+
+    threads = [threading.Thread(target=listen, args=(sub,)) for sub in subs]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    broker.publish('donation.claimed', {'id': 7}, user_ids=(0,))
+    for thread in threads:
+        thread.join()
+
+    elapsed, events = woke.pop(0)
+    assert elapsed < 0.5 and len(events) == 1
+    # Everyone else slept on to their heartbeat; the stream writes nothing early
+    assert all(events == [] and elapsed >= 0.95 for elapsed, events in woke.values())
+
+
+def test_idle_subscriber_memory_stays_flat():
+    broker = InMemoryBroker()
+    subs = []
+
+    def grow(count):
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(count):
+            subs.append(broker.subscribe(len(subs), 'ngo'))
+        gc.collect()
+        return (tracemalloc.get_traced_memory()[0] - before) / count
+
+    tracemalloc.start()
+    try:
+        first = grow(1000)
+        second = grow(4000)
+    finally:
+        tracemalloc.stop()
+
+    assert broker.subscriber_count() == 5000
+    # Bounded per-connection cost that does not grow with the subscriber count
+    assert second < 2048
+    assert second < first * 1.5
+
+
+def _expiry():
+    return (datetime.utcnow() + timedelta(hours=3)).isoformat()
+
+
+def test_routes_publish_lifecycle_events(app, client, make_user, auth_headers):
+    broker = app.extensions['event_broker']
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    other_ngo = make_user('ngo')
+    donor_sub = broker.subscribe(donor.id, 'donor')
+    ngo_sub = broker.subscribe(ngo.id, 'ngo')
+    other_sub = broker.subscribe(other_ngo.id, 'ngo')
+
+    donation_id = client.post('/api/donations', headers=auth_headers(donor), json={
+        'title': 'Curry', 'quantity': '20 plates', 'expiry_time': _expiry(), 'location': 'Hall',
+    }).get_json()['id']
+    client.post(f'/api/donations/{donation_id}/request', headers=auth_headers(ngo), json={})
+    request_id = Request.query.one().id
+    response = client.put(f'/api/requests/{request_id}/status', headers=auth_headers(donor),
+                          json={'status': 'approved'})
+    assert response.status_code == 200
+
+    assert [t for t, _ in _drain(broker, donor_sub)] == [
+        'donation.created', 'donation.claimed', 'request.status_changed',
+    ]
+    # With fewer NGOs than MATCHING_NOTIFY_TOP, every NGO is a match
+    assert [t for t, _ in _drain(broker, ngo_sub)] == [
+        'donation.created', 'donation.matched', 'donation.claimed', 'request.status_changed',
+    ]
+    assert [t for t, _ in _drain(broker, other_sub)] == [
+        'donation.created', 'donation.matched', 'donation.claimed',
+    ]
+
+
+def test_stream_endpoint_delivers_sse(app, client, make_user):
+    ngo = make_user('ngo')
+    token = create_access_token(identity=str(ngo.id), additional_claims=identity_claims(ngo))
+    broker = app.extensions['event_broker']
+
+    response = client.get(f'/api/stream?jwt={token}', buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert broker.subscriber_count() == 1
+
+    broker.publish('donation.created', {'id': 1}, roles=('ngo',))
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'retry:')
+    assert next(chunks) == b'id: 1\nevent: donation.created\ndata: {"id": 1}\n\n'
+
+    response.close()
+    assert broker.subscriber_count() == 0
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Donation, DonationDailyRollup, Request
+from app.services import events, expiry
+from app.services.rollups import backfill
+
+
+def _rollup():
+    return {
+        (r.day, r.status, r.food_type): r.count
+        for r in DonationDailyRollup.query.all()
+        if r.count
+    }
+
+
+def test_sweep_expires_overdue_donations_in_batches(app, make_user, make_donation):
+    donor = make_user('donor')
+    past = datetime.utcnow() - timedelta(minutes=5)
+    overdue = [make_donation(donor, expiry_time=past).id for _ in range(5)]
+    fresh = make_donation(donor)
+    collected = make_donation(donor, expiry_time=past, status='collected')
+
+    metrics = expiry.sweep(batch_size=2)
+
+    assert metrics['donations_expired'] == 5
+    assert metrics['batches'] == 3
+    db.session.expire_all()
+    assert {d.id for d in Donation.query.filter_by(status='expired')} == set(overdue)
+    assert db.session.get(Donation, fresh.id).status == 'available'
+    assert db.session.get(Donation, collected.id).status == 'collected'
+    assert app.extensions['expiry_sweeper']['donations_expired_total'] == 5
+
+    assert expiry.sweep()['donations_expired'] == 0
+
+
+def test_sweep_cancels_pending_requests_and_skips_approved_pickups(make_user, make_donation):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    past = datetime.utcnow() - timedelta(minutes=5)
+    pending = make_donation(donor, expiry_time=past, status='claimed')
+    approved = make_donation(donor, expiry_time=past, status='claimed')
+    db.session.add_all([
+        Request(donation_id=pending.id, ngo_id=ngo.id, status='pending'),
+        Request(donation_id=approved.id, ngo_id=ngo.id, status='approved'),
+    ])
+    db.session.commit()
+
+    metrics = expiry.sweep()
+
+    assert metrics['donations_expired'] == 1
+    assert metrics['requests_cancelled'] == 1
+    db.session.expire_all()
+    assert db.session.get(Donation, pending.id).status == 'expired'
+    assert db.session.get(Donation, approved.id).status == 'claimed'
+    assert {r.donation_id: r.status for r in Request.query} == {
+        pending.id: 'cancelled',
+        approved.id: 'approved',
+    }
+
+
+def test_sweep_skips_a_pickup_approved_after_selection(make_user, make_donation, monkeypatch):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    donation = make_donation(donor, expiry_time=datetime.utcnow() - timedelta(minutes=5), status='claimed')
+    claim = Request(donation_id=donation.id, ngo_id=ngo.id, status='pending')
+    db.session.add(claim)
+    db.session.commit()
+    select = expiry._expired_ids
+
+    def approve_after_select(now, batch_size):
+        ids = select(now, batch_size)
+        # The donor approves between the sweep's SELECT and its UPDATE
+        claim.status = 'approved'
+        db.session.commit()
+        return ids
+    monkeypatch.setattr(expiry, '_expired_ids', approve_after_select)
+
+    metrics = expiry.sweep()
+
+    assert metrics['donations_expired'] == 0
+    assert metrics['requests_cancelled'] == 0
+    db.session.expire_all()
+    assert db.session.get(Donation, donation.id).status == 'claimed'
+    assert db.session.get(Request, claim.id).status == 'approved'
+
+
+def test_sweep_keeps_rollup_in_step(make_user, make_donation):
+    donor = make_user('donor')
+    past = datetime.utcnow() - timedelta(minutes=5)
+    make_donation(donor, expiry_time=past, food_type='vegan')
+    make_donation(donor, expiry_time=past, food_type=None, status='claimed')
+    make_donation(donor, food_type='vegan')
+
+    expiry.sweep()
+    incremental = _rollup()
+    backfill()
+
+    assert incremental == _rollup()
+    assert incremental[(datetime.utcnow().date(), 'expired', 'vegan')] == 1
+
+
+def test_sweep_notifies_feed_subscribers(app, make_user, make_donation):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    sub = events.broker().subscribe(ngo.id, 'ngo')
+    overdue = make_donation(donor, expiry_time=datetime.utcnow() - timedelta(minutes=1))
+
+    expiry.sweep()
+
+    received = [(event_type, payload) for _, event_type, payload in events.broker().listen(sub, 0)]
+    assert ('donation.expired', f'{{"ids": [{overdue.id}]}}') in received
+
+
+def test_sweep_cli_prints_metrics(app, make_user, make_donation):
+    donor = make_user('donor')
+    make_donation(donor, expiry_time=datetime.utcnow() - timedelta(minutes=1))
+
+    result = app.test_cli_runner().invoke(args=['expiry', 'sweep', '--batch-size', '10'])
+
+    assert result.exit_code == 0
+    assert '"donations_expired": 1' in result.output
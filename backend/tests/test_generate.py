@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.models import Donation, DonationDailyRollup, Request, User
+from app.services import rollups
+from benchmarks import generate
+
+# Earlier requests are always rejected; the last one follows the donation
+LAST_REQUEST_STATUS = {
+    'available': {'rejected', None},
+    'claimed': {'pending', 'approved'},
+    'collected': {'collected'},
+    'expired': {'cancelled', None},
+}
+
+
+def _rows(model):
+    columns = [c for c in model.__table__.columns if c.name != 'password_hash']
+    return db.session.query(*columns).order_by(model.id).all()
+
+
+@pytest.mark.sqlite_only
+def test_generated_rows_are_consistent(app):
+    generate.generate(users=50, donations=400, requests=1200, seed=3)
+
+    assert (User.query.count(), Donation.query.count(), Request.query.count()) == (50, 400, 1200)
+    assert User.query.filter_by(role='admin').count() == 1
+
+    for donation in Donation.query.all():
+        statuses = [r.status for r in sorted(donation.requests, key=lambda r: r.created_at)]
+        assert all(status == 'rejected' for status in statuses[:-1])
+        assert (statuses[-1] if statuses else None) in LAST_REQUEST_STATUS[donation.status]
+        assert all(r.ngo.role == 'ngo' and r.ngo.is_approved for r in donation.requests)
+
+    # Derived tables are rebuilt and the insert trigger is back
+    counts = {(r.status, r.food_type): r.count for r in DonationDailyRollup.query.all()}
+    rollups.backfill()
+    assert {(r.status, r.food_type): r.count for r in DonationDailyRollup.query.all()} == counts
+    assert db.session.execute(text("SELECT count(*) FROM donation_fts WHERE donation_fts MATCH 'rice'")).scalar() \
+        == Donation.query.filter(Donation.title.like('Rice %')).count()
+    assert db.session.execute(text(
+        "SELECT count(*) FROM sqlite_master WHERE name = 'donation_fts_ai'")).scalar() == 1
+
+
+def test_same_seed_gives_same_rows(app):
+    now = datetime(2026, 1, 1)
+    generate.generate(users=20, donations=100, requests=300, seed=5, now=now)
+    first = [_rows(model) for model in (User, Donation, Request)]
+
+    db.drop_all()
+    db.create_all()
+    generate.generate(users=20, donations=100, requests=300, seed=5, now=now)
+    assert [_rows(model) for model in (User, Donation, Request)] == first
@@ -0,0 +1,127 @@
+import json
+
+from app import db
+from app.models import Donation
+from app.services import geo
+
+
+def test_haversine_matches_known_distance():
+    # Mumbai CST to Pune station is ~120 km as the crow flies
+    assert 115 < geo.haversine_km(18.9398, 72.8355, 18.5286, 73.8743) < 125
+
+
+def test_bounding_box_ranges_cover_the_circle():
+    lat, lng = 19.0760, 72.8777
+    min_lat, max_lat, min_lng, max_lng = geo.bounding_box(lat, lng, 10)
+    ranges = geo.cell_ranges(min_lat, max_lat, min_lng, max_lng)
+    for point in [(lat + 0.089, lng), (lat, lng - 0.094), (lat - 0.05, lng + 0.06)]:
+        cell = geo.grid_cell(*point)
+        assert any(lo <= cell <= hi for lo, hi in ranges)
+
+
+def test_geocode_prefers_most_specific_place(app):
+    with app.app_context():
+        assert geo.geocode('12 Hill Road, Bandra, Mumbai') == geo.gazetteer()['bandra']
+        assert geo.geocode('Nowhere in particular') is None
+
+
+def test_create_donation_geocodes_location(client, make_user, auth_headers):
+    donor = make_user('donor')
+    response = client.post('/api/donations', headers=auth_headers(donor), json={
+        'title': 'Rice', 'food_type': 'vegetarian', 'quantity': '5 kg',
+        'location': 'Andheri, Mumbai', 'expiry_time': '2099-01-01T10:00:00',
+    })
+    assert response.status_code == 201
+
+    donation = Donation.query.one()
+    assert (donation.latitude, donation.longitude) == geo.gazetteer()['andheri']
+    assert donation.geo_cell == geo.grid_cell(donation.latitude, donation.longitude)
+
+
+def test_backfill_geocodes_existing_donations(app, client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    # Saved before donations had coordinates
+    bandra = make_donation(donor, location='Bandra, Mumbai')
+    andheri = make_donation(donor, location='Andheri, Mumbai')
+    unknown = make_donation(donor, location='Community Hall')
+    placed = make_donation(donor, location='Pune')
+    placed.set_coordinates(19.0, 72.8)
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['geo', 'backfill', '--batch-size', '2'])
+
+    assert result.exit_code == 0
+    assert json.loads(result.output) == {'scanned': 3, 'geocoded': 2}
+    db.session.expire_all()
+    assert (bandra.latitude, bandra.longitude) == geo.gazetteer()['bandra']
+    assert andheri.geo_cell == geo.grid_cell(andheri.latitude, andheri.longitude)
+    assert unknown.latitude is None
+    assert (placed.latitude, placed.longitude) == (19.0, 72.8)
+
+    lat, lng = geo.gazetteer()['bandra']
+    response = client.get(f'/api/donations?near={lat},{lng}&radius_km=2', headers=auth_headers(ngo))
+    assert [d['id'] for d in response.get_json()['donations']] == [bandra.id]
+
+
+def test_near_filter_keeps_only_donations_inside_radius(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+
+    def at(lat, lng, **kw):
+        donation = make_donation(donor, **kw)
+        donation.set_coordinates(lat, lng)
+        return donation
+
+    close = at(19.080, 72.880)
+    edge = at(19.076 + 0.085, 72.8777)       # ~9.5 km north
+    corner = at(19.076 + 0.08, 72.8777 + 0.085)  # inside the box, ~12 km away
+    at(18.5204, 73.8567)                      # Pune
+    at(19.081, 72.881, status='claimed')
+    unplaced = make_donation(donor)
+    db.session.commit()
+
+    response = client.get('/api/donations', headers=auth_headers(ngo),
+                          query_string={'near': '19.076,72.8777', 'radius_km': 10})
+    assert response.status_code == 200
+    body = response.get_json()
+
+    ids = [d['id'] for d in body['donations']]
+    assert sorted(ids) == sorted([close.id, edge.id])
+    assert corner.id not in ids and unplaced.id not in ids
+    assert all(d['distance_km'] <= 10 for d in body['donations'])
+
+
+def test_near_filter_pages_past_rows_outside_radius(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    inside = []
+    for i in range(12):
+        # Alternate box-corner decoys with genuine matches
+        donation = make_donation(donor)
+        if i % 2:
+            donation.set_coordinates(19.076 + 0.08, 72.8777 + 0.085)
+        else:
+            donation.set_coordinates(19.076, 72.8777)
+            inside.append(donation.id)
+    db.session.commit()
+
+    seen, cursor = [], None
+    while True:
+        params = {'near': '19.076,72.8777', 'radius_km': 10, 'limit': 2}
+        if cursor:
+            params['cursor'] = cursor
+        body = client.get('/api/donations', headers=auth_headers(ngo), query_string=params).get_json()
+        seen.extend(d['id'] for d in body['donations'])
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+
+    assert seen == sorted(inside, reverse=True)
+
+
+def test_near_filter_validates_input(client, make_user, auth_headers):
+    ngo = make_user('ngo')
+    for params in [{'near': 'abc'}, {'near': '95,10'}, {'near': '19,72', 'radius_km': 1000}]:
+        response = client.get('/api/donations', headers=auth_headers(ngo), query_string=params)
+        assert response.status_code == 422
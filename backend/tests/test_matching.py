@@ -0,0 +1,219 @@
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app import db
+from app.models import Request
+from app.services import matching
+
+
+def _history(make_donation, donor, ngo, food_type, statuses):
+    for status in statuses:
+        donation = make_donation(donor, food_type=food_type, status='collected')
+        db.session.add(Request(donation_id=donation.id, ngo_id=ngo.id, status=status))
+    db.session.commit()
+
+
+def test_ngo_features_reflect_history(app, make_user, make_donation):
+    donor = make_user('donor')
+    vegan_ngo = make_user('ngo', address='Bandra, Mumbai')
+    new_ngo = make_user('ngo')
+    make_user('ngo', is_approved=False)
+    _history(make_donation, donor, vegan_ngo, 'vegan', ['collected', 'collected', 'collected', 'rejected'])
+
+    ngos = matching.build_ngo_features()
+
+    assert ngos.ids.tolist() == [vegan_ngo.id, new_ngo.id]
+    row = ngos.rows[vegan_ngo.id]
+    assert ngos.collection_rates[row] == (3 + 1) / (4 + 2)
+    assert ngos.prefs[row, ngos.food_types['vegan']] == 1.0
+    assert ngos.prefs[row, ngos.food_types['vegetarian']] < 0.5
+    assert not ngos.xyz[ngos.rows[new_ngo.id]].any()
+    assert ngos.collection_rates[ngos.rows[new_ngo.id]] == 0.5
+
+
+def test_scores_prefer_close_habitual_collectors(app, make_user, make_donation):
+    donor = make_user('donor')
+    near = make_user('ngo', address='Bandra, Mumbai')
+    far = make_user('ngo', address='Pune')
+    _history(make_donation, donor, near, 'vegan', ['collected', 'collected'])
+    _history(make_donation, donor, far, 'vegetarian', ['rejected', 'rejected'])
+
+    ngos = matching.build_ngo_features()
+    expiry = datetime.utcnow() + timedelta(hours=3)
+    donations = matching.donation_features([(1, 19.06, 72.83, 'vegan', expiry)], ngos)
+    ids, scores = matching.top_ngos(donations, ngos, k=2)
+
+    assert ids[0].tolist() == [near.id, far.id]
+    assert 0 <= scores[0, 1] < scores[0, 0] <= 1
+
+
+def test_top_ngos_matches_brute_force_across_chunks(app, monkeypatch):
+    monkeypatch.setattr(matching, 'CHUNK_ROWS', 7)
+    rng = np.random.default_rng(3)
+    ngos = matching.NgoFeatures(
+        np.arange(1, 41),
+        np.radians(rng.uniform(18, 20, 40)).astype(np.float32),
+        np.radians(rng.uniform(72, 74, 40)).astype(np.float32),
+        list(matching.KNOWN_FOOD_TYPES),
+        rng.uniform(0, 1, (40, 4)),
+        rng.uniform(0, 1, 40),
+    )
+    donations = matching.DonationFeatures(
+        np.arange(100, 125),
+        np.radians(rng.uniform(18, 20, 25)).astype(np.float32),
+        np.radians(rng.uniform(72, 74, 25)).astype(np.float32),
+        rng.integers(0, 4, 25),
+        rng.uniform(-2, 48, 25),
+    )
+
+    ids, scores = matching.top_ngos(donations, ngos, k=3)
+
+    full = matching.score(donations, ngos)
+    expected = ngos.ids[np.argsort(-full, axis=1, kind='stable')[:, :3]]
+    assert (ids == expected).all()
+    assert np.allclose(scores, np.sort(full, axis=1)[:, ::-1][:, :3])
+
+
+def test_recommended_endpoint_ranks_open_donations(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo', address='Andheri, Mumbai')
+    _history(make_donation, donor, ngo, 'vegan', ['collected', 'collected'])
+    soon = datetime.utcnow() + timedelta(hours=2)
+    later = datetime.utcnow() + timedelta(days=2)
+
+    def at(lat, lng, **kw):
+        donation = make_donation(donor, **kw)
+        donation.set_coordinates(lat, lng)
+        return donation
+
+    best = at(19.11, 72.87, food_type='vegan', expiry_time=soon)
+    middle = at(19.11, 72.87, food_type='vegetarian', expiry_time=later)
+    worst = at(18.52, 73.86, food_type='vegetarian', expiry_time=later)
+    at(19.11, 72.87, food_type='vegan', status='claimed')
+    db.session.commit()
+
+    response = client.get('/api/donations/recommended', headers=auth_headers(ngo))
+    assert response.status_code == 200
+    body = response.get_json()
+
+    assert [d['id'] for d in body['donations']] == [best.id, middle.id, worst.id]
+    scores = [d['match_score'] for d in body['donations']]
+    assert scores == sorted(scores, reverse=True)
+
+    limited = client.get('/api/donations/recommended?limit=1', headers=auth_headers(ngo)).get_json()
+    assert [d['id'] for d in limited['donations']] == [best.id]
+
+
+def test_recommended_is_for_ngos(client, make_user, auth_headers):
+    donor = make_user('donor')
+    response = client.get('/api/donations/recommended', headers=auth_headers(donor))
+    assert response.status_code == 403
+
+
+def _gated_build(monkeypatch, features):
+    # Stands in for build_ngo_features: counts builds, holds each until released
+    release = threading.Event()
+    builds = []
+
+    def build():
+        builds.append(threading.current_thread().name)
+        assert release.wait(5)
+        return features
+    monkeypatch.setattr(matching, 'build_ngo_features', build)
+    return release, builds
+
+
+def test_unapproved_ngo_is_refused_without_a_rebuild(client, make_user, auth_headers, monkeypatch):
+    ngo = make_user('ngo', is_approved=False)
+    builds = []
+    monkeypatch.setattr(matching, 'build_ngo_features', lambda: builds.append(1))
+
+    for _ in range(3):
+        response = client.get('/api/donations/recommended', headers=auth_headers(ngo))
+        assert response.status_code == 403
+
+    assert builds == []
+
+
+def test_new_donation_does_not_wait_for_a_cold_build(app, client, make_user, auth_headers, monkeypatch):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    broker = app.extensions['event_broker']
+    sub = broker.subscribe(ngo.id, 'ngo')
+    release, builds = _gated_build(monkeypatch, matching.build_ngo_features())
+    app.config['MATCHING_BACKGROUND_REBUILD'] = True
+
+    response = client.post('/api/donations', headers=auth_headers(donor), json={
+        'title': 'Curry', 'quantity': '20 plates', 'location': 'Hall',
+        'expiry_time': (datetime.utcnow() + timedelta(hours=3)).isoformat(),
+    })
+    assert response.status_code == 201
+    assert [event_type for _, event_type, _ in broker.listen(sub, 0)] == ['donation.created']
+
+    worker = app.extensions['matching_cache'].worker
+    release.set()
+    worker.join(5)
+    assert builds == ['matching-rebuild']
+    assert [event_type for _, event_type, _ in broker.listen(sub, 0)] == ['donation.matched']
+
+
+def test_stale_features_are_served_while_rebuilding(app, make_user, monkeypatch):
+    make_user('ngo')
+    old = matching.ngo_features()
+    cache = app.extensions['matching_cache']
+    cache.built_at -= cache.ttl
+    release, builds = _gated_build(monkeypatch, matching.build_ngo_features())
+    app.config['MATCHING_BACKGROUND_REBUILD'] = True
+
+    assert matching.ngo_features() is old
+    assert matching.ngo_features() is old
+    worker = cache.worker
+    release.set()
+    worker.join(5)
+
+    assert len(builds) == 1
+    assert matching.ngo_features() is not old
+
+
+def test_newly_approved_ngo_is_scored_alone(app, client, make_user, make_donation, auth_headers, monkeypatch):
+    donor = make_user('donor')
+    make_user('ngo')
+    make_donation(donor)
+    shared = matching.ngo_features()
+    late = make_user('ngo')
+    builds = []
+    build = matching.build_ngo_features
+
+    def spy(ngo_ids=None):
+        builds.append(ngo_ids)
+        return build(ngo_ids)
+    monkeypatch.setattr(matching, 'build_ngo_features', spy)
+
+    response = client.get('/api/donations/recommended', headers=auth_headers(late))
+
+    assert response.status_code == 200
+    assert len(response.get_json()['donations']) == 1
+    assert builds == [[late.id]]
+    assert matching.ngo_features() is shared
+
+
+def test_approving_an_ngo_rebuilds_in_the_background(app, client, make_user, auth_headers, monkeypatch):
+    admin = make_user('admin')
+    make_user('ngo')
+    pending = make_user('ngo', is_approved=False)
+    matching.ngo_features()
+    cache = app.extensions['matching_cache']
+    rebuilt = matching.build_ngo_features([pending.id])
+    release, builds = _gated_build(monkeypatch, rebuilt)
+    app.config['MATCHING_BACKGROUND_REBUILD'] = True
+
+    response = client.post(f'/api/admin/users/{pending.id}/approve', headers=auth_headers(admin))
+
+    assert response.status_code == 200
+    worker = cache.worker
+    release.set()
+    worker.join(5)
+    assert builds == ['matching-rebuild']
+    assert matching.ngo_features() is rebuilt
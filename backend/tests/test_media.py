@@ -0,0 +1,230 @@
+import io
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta
+
+import pytest
+from PIL import Image
+
+from app.models import Donation
+from app.services import media
+
+
+def _jpeg(width=1200, height=800, color=(200, 120, 40)):
+    buf = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buf, 'JPEG')
+    buf.seek(0)
+    return buf
+
+
+def _upload(client, headers, data, filename='../../etc/passwd.jpg'):
+    return client.post(
+        '/api/donations/images',
+        headers=headers,
+        data={'image': (data, filename)},
+        content_type='multipart/form-data',
+    )
+
+
+def _stored_files(app):
+    root = app.config['UPLOAD_FOLDER']
+    return sorted(
+        os.path.relpath(os.path.join(dirpath, name), root)
+        for dirpath, _, names in os.walk(root)
+        for name in names
+    )
+
+
+def test_upload_is_content_addressed_with_thumbnails(app, client, make_user, auth_headers):
+    headers = auth_headers(make_user('donor'))
+
+    first = _upload(client, headers, _jpeg())
+    assert first.status_code == 201
+    body = first.get_json()
+    key = body['image_id']
+    assert key.endswith('.jpg') and len(key) == 68
+    assert body['thumbnail_url'].endswith(f'/media/thumbs/{key[:2]}/{key[:64]}_320.webp')
+
+    again = _upload(client, headers, _jpeg(), filename='other-name.jpg')
+    assert again.get_json()['image_id'] == key
+
+    files = _stored_files(app)
+    assert files == sorted([
+        os.path.join('images', key[:2], key),
+        os.path.join('thumbs', key[:2], f'{key[:64]}_320.jpg'),
+        os.path.join('thumbs', key[:2], f'{key[:64]}_320.webp'),
+    ])
+    thumb = os.path.join(app.config['UPLOAD_FOLDER'], 'thumbs', key[:2], f'{key[:64]}_320.webp')
+    with Image.open(thumb) as img:
+        assert img.size == (320, 213)
+
+
+def test_upload_rejects_non_images(client, make_user, auth_headers):
+    headers = auth_headers(make_user('donor'))
+
+    response = _upload(client, headers, io.BytesIO(b'not an image'), filename='x.jpg')
+
+    assert response.status_code == 422
+
+
+def _png_header_only(width, height):
+    # A tiny 1-bit PNG that claims width x height pixels
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    row = b'\0' * (1 + (width + 7) // 8)
+    return io.BytesIO(b'\x89PNG\r\n\x1a\n'
+                      + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 1, 0, 0, 0, 0))
+                      + chunk(b'IDAT', zlib.compress(row * 16))
+                      + chunk(b'IEND', b''))
+
+
+def test_upload_rejects_decompression_bombs(app, client, make_user, auth_headers):
+    headers = auth_headers(make_user('donor'))
+
+    # Past Pillow's own limit, and between it and twice it (a warning there)
+    assert _upload(client, headers, _png_header_only(20000, 20000)).status_code == 422
+    assert _upload(client, headers, _png_header_only(10000, 10000)).status_code == 422
+    app.config['MAX_IMAGE_PIXELS'] = 100 * 100
+    assert _upload(client, headers, _jpeg(101, 100)).status_code == 422
+    assert _upload(client, headers, _jpeg(100, 100)).status_code == 201
+
+
+def test_failed_thumbnails_leave_nothing_behind(app, client, make_user, auth_headers, monkeypatch):
+    headers = auth_headers(make_user('donor'))
+
+    def broken(source, key):
+        raise media.InvalidImage('File is not a valid image')
+    monkeypatch.setattr(media, '_write_thumbnails', broken)
+
+    assert _upload(client, headers, _jpeg()).status_code == 422
+    assert _stored_files(app) == []
+
+
+class _Crash(BaseException):
+    pass
+
+
+def test_interrupted_thumbnail_write_leaves_no_partial_file(app, client, make_user, auth_headers, monkeypatch):
+    headers = auth_headers(make_user('donor'))
+    body = _jpeg().getvalue()
+    save = Image.Image.save
+
+    def crash_mid_jpeg(img, fp, format=None, **params):
+        if format != 'JPEG':
+            return save(img, fp, format, **params)
+        if isinstance(fp, str):
+            fp = open(fp, 'wb')
+        fp.write(b'\xff\xd8 partial')
+        fp.flush()
+        raise _Crash()
+    monkeypatch.setattr(Image.Image, 'save', crash_mid_jpeg)
+
+    with pytest.raises(_Crash):
+        _upload(client, headers, io.BytesIO(body))
+    assert not any(name.endswith('_320.jpg') or '.thumb-' in name for name in _stored_files(app))
+
+    monkeypatch.setattr(Image.Image, 'save', save)
+    key = _upload(client, headers, io.BytesIO(body)).get_json()['image_id']
+    with Image.open(os.path.join(app.config['UPLOAD_FOLDER'], 'thumbs', key[:2], f'{key[:64]}_320.jpg')) as img:
+        img.load()
+
+
+def test_donation_references_uploaded_image(client, make_user, auth_headers):
+    donor = make_user('donor')
+    headers = auth_headers(donor)
+    key = _upload(client, headers, _jpeg()).get_json()['image_id']
+
+    response = client.post('/api/donations', headers=headers, json={
+        'title': 'Soup',
+        'quantity': '30 bowls',
+        'expiry_time': (datetime.utcnow() + timedelta(hours=3)).isoformat(),
+        'location': 'Kitchen',
+        'image_id': key,
+    })
+    assert response.status_code == 201
+    assert Donation.query.one().image_url == key
+
+    listed = client.get('/api/donations', headers=headers).get_json()['donations'][0]
+    assert listed['thumbnail_url'].endswith('_320.webp')
+    assert len(listed['image_url']) < 200
+
+
+def test_multipart_donation_stores_image(app, client, make_user, auth_headers):
+    headers = auth_headers(make_user('donor'))
+
+    response = client.post('/api/donations', headers=headers, content_type='multipart/form-data', data={
+        'title': 'Soup',
+        'quantity': '30 bowls',
+        'expiry_time': (datetime.utcnow() + timedelta(hours=3)).isoformat(),
+        'location': 'Kitchen',
+        'image': (_jpeg(), '../unsafe name.jpg'),
+    })
+
+    assert response.status_code == 201
+    key = Donation.query.one().image_url
+    assert os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], 'images', key[:2], key))
+
+
+def test_inline_data_urls_are_rejected(client, make_user, auth_headers):
+    headers = auth_headers(make_user('donor'))
+
+    response = client.post('/api/donations', headers=headers, json={
+        'title': 'Soup',
+        'quantity': '30 bowls',
+        'expiry_time': (datetime.utcnow() + timedelta(hours=3)).isoformat(),
+        'location': 'Kitchen',
+        'image_url': 'data:image/jpeg;base64,' + 'A' * 1000,
+    })
+
+    assert response.status_code == 422
+
+
+def test_media_served_with_immutable_strong_etag(client, make_user, auth_headers):
+    key = _upload(client, auth_headers(make_user('donor')), _jpeg()).get_json()['image_id']
+    url = f'/media/images/{key[:2]}/{key}'
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] == f'"{key}"'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+
+    cached = client.get(url, headers={'If-None-Match': f'"{key}"'})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+
+def test_media_range_request(client, make_user, auth_headers):
+    key = _upload(client, auth_headers(make_user('donor')), _jpeg()).get_json()['image_id']
+    url = f'/media/images/{key[:2]}/{key}'
+    full = client.get(url).data
+
+    partial = client.get(url, headers={'Range': 'bytes=0-99'})
+
+    assert partial.status_code == 206
+    assert partial.data == full[:100]
+    assert partial.headers['Content-Range'] == f'bytes 0-99/{len(full)}'
+
+
+def test_media_serves_only_stored_images(app, client, make_user, auth_headers):
+    key = _upload(client, auth_headers(make_user('donor')), _jpeg()).get_json()['image_id']
+    root = app.config['UPLOAD_FOLDER']
+    for relative in ('documents/menu.pdf', '.upload-abc123', f'images/{key[:2]}/notes.txt',
+                     f'images/{key}'):
+        os.makedirs(os.path.dirname(os.path.join(root, relative)), exist_ok=True)
+        with open(os.path.join(root, relative), 'wb') as f:
+            f.write(b'private')
+
+    for relative in ('documents/menu.pdf', '.upload-abc123', f'images/{key[:2]}/notes.txt',
+                     f'images/{key}', f'images/ff/{key}', f'thumbs/{key[:2]}/{key}'):
+        assert client.get(f'/media/{relative}').status_code == 404
+
+    assert client.get(f'/media/images/{key[:2]}/{key}').status_code == 200
+    assert client.get(f'/media/thumbs/{key[:2]}/{key[:64]}_320.jpg').status_code == 200
+
+
+def test_media_rejects_traversal_and_missing(client):
+    assert client.get('/media/../service_to_surplus.db').status_code == 404
+    assert client.get('/media/images/missing.jpg').status_code == 404
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from app import db
+from app.models import Message, Request
+
+
+@pytest.fixture
+def thread(make_user, make_donation):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    req = Request(donation_id=make_donation(donor).id, ngo_id=ngo.id)
+    db.session.add(req)
+    db.session.commit()
+    return req.id, donor, ngo
+
+
+def _url(request_id, suffix=''):
+    return f'/api/requests/{request_id}/messages{suffix}'
+
+
+def test_send_and_list(client, auth_headers, thread):
+    request_id, donor, ngo = thread
+
+    sent = client.post(_url(request_id), headers=auth_headers(ngo), json={'body': 'When can we collect?'})
+    assert sent.status_code == 201
+    client.post(_url(request_id), headers=auth_headers(donor), json={'body': 'After 3 PM'})
+
+    body = client.get(_url(request_id), headers=auth_headers(donor)).get_json()
+    assert [m['body'] for m in body['messages']] == ['When can we collect?', 'After 3 PM']
+    assert body['has_more'] is False
+
+
+def test_outsiders_cannot_read_or_post(client, make_user, auth_headers, thread):
+    request_id, _, _ = thread
+    stranger = make_user('ngo')
+
+    assert client.get(_url(request_id), headers=auth_headers(stranger)).status_code == 403
+    assert client.post(_url(request_id), headers=auth_headers(stranger), json={'body': 'hi'}).status_code == 403
+    assert client.get(_url(9999), headers=auth_headers(stranger)).status_code == 404
+
+
+def test_large_thread_loads_only_last_page(client, auth_headers, thread, query_counter):
+    request_id, donor, ngo = thread
+    db.session.execute(Message.__table__.insert(), [
+        {'request_id': request_id, 'sender_id': ngo.id, 'body': f'm{i}'} for i in range(10000)
+    ])
+    db.session.commit()
+    headers = auth_headers(donor)
+    client.get(_url(request_id), headers=headers)
+
+    query_counter.reset()
+    body = client.get(_url(request_id) + '?limit=20', headers=headers).get_json()
+
+    assert [m['body'] for m in body['messages']] == [f'm{i}' for i in range(9980, 10000)]
+    assert body['has_more'] is True
+    page_query = [s for s in query_counter.statements if 'FROM message' in s]
+    assert len(page_query) == 1 and 'LIMIT' in page_query[0]
+
+    older = client.get(
+        _url(request_id) + f'?limit=20&before={body["messages"][0]["id"]}', headers=headers
+    ).get_json()
+    assert [m['body'] for m in older['messages']] == [f'm{i}' for i in range(9960, 9980)]
+
+
+def test_after_cursor_returns_new_messages(client, auth_headers, thread):
+    request_id, donor, ngo = thread
+    first = client.post(_url(request_id), headers=auth_headers(ngo), json={'body': 'one'}).get_json()
+    client.post(_url(request_id), headers=auth_headers(ngo), json={'body': 'two'})
+
+    body = client.get(_url(request_id) + f'?after={first["message"]["id"]}', headers=auth_headers(donor)).get_json()
+
+    assert [m['body'] for m in body['messages']] == ['two']
+
+
+def test_batched_read_receipts(app, client, auth_headers, thread):
+    request_id, donor, ngo = thread
+    ids = [
+        client.post(_url(request_id), headers=auth_headers(ngo), json={'body': f'm{i}'}).get_json()['message']['id']
+        for i in range(3)
+    ]
+    client.post(_url(request_id), headers=auth_headers(donor), json={'body': 'mine'})
+    broker = app.extensions['event_broker']
+    ngo_sub = broker.subscribe(ngo.id, 'ngo')
+
+    response = client.post(_url(request_id, '/read'), headers=auth_headers(donor), json={'up_to': ids[1]})
+
+    assert response.get_json()['updated'] == 2
+    read = {m.body: m.read_at is not None for m in Message.query.all()}
+    assert read == {'m0': True, 'm1': True, 'm2': False, 'mine': False}
+    assert [t for _, t, _ in broker.listen(ngo_sub, 0)] == ['message.read']
+
+
+def test_long_poll_wakes_on_new_message(app, auth_headers, thread):
+    request_id, donor, ngo = thread
+    donor_headers = auth_headers(donor)
+    ngo_headers = auth_headers(ngo)
+    result = {}
+
+    def poll():
+        with app.app_context():
+            started = time.monotonic()
+            response = app.test_client().get(_url(request_id) + '?after=0&wait=5', headers=donor_headers)
+            result['elapsed'] = time.monotonic() - started
+            result['body'] = response.get_json()
+
+    poller = threading.Thread(target=poll)
+    poller.start()
+    time.sleep(0.2)
+    with app.app_context():
+        app.test_client().post(_url(request_id), headers=ngo_headers, json={'body': 'ready'})
+    poller.join(timeout=10)
+
+    assert [m['body'] for m in result['body']['messages']] == ['ready']
+    assert result['elapsed'] < 4
@@ -0,0 +1,91 @@
+import json
+import logging
+
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.services import metrics
+
+
+def _samples(text):
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram('demo_seconds', 'Demo.', (0.1, 1), ('endpoint',))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(('home',), value)
+
+    lines = list(histogram.render())
+
+    assert lines[:2] == ['# HELP demo_seconds Demo.', '# TYPE demo_seconds histogram']
+    assert lines[2:] == [
+        'demo_seconds_bucket{endpoint="home",le="0.1"} 2',
+        'demo_seconds_bucket{endpoint="home",le="1"} 3',
+        'demo_seconds_bucket{endpoint="home",le="+Inf"} 4',
+        'demo_seconds_sum{endpoint="home"} 3.65',
+        'demo_seconds_count{endpoint="home"} 4',
+    ]
+
+
+def test_metrics_count_requests_and_their_sql(client, make_user, make_donation, auth_headers, query_counter):
+    donor = make_user('donor')
+    make_donation(donor)
+    headers = auth_headers(donor)
+
+    query_counter.reset()
+    assert client.get('/api/donations', headers=headers).status_code == 200
+    statements = query_counter.count
+    client.get('/api/donations', headers=headers)
+    client.get('/no-such-page')
+
+    samples = _samples(client.get('/metrics').get_data(as_text=True))
+
+    feed = 'endpoint="donations.get_donations",method="GET"'
+    assert samples[f'http_requests_total{{{feed},status="200"}}'] == 2
+    assert samples[f'http_request_duration_seconds_count{{{feed}}}'] == 2
+    assert samples[f'http_request_sql_statements_sum{{{feed}}}'] == 2 * statements
+    assert samples[f'http_request_sql_duration_seconds_sum{{{feed}}}'] > 0
+    assert samples[f'http_response_size_bytes_count{{{feed}}}'] == 2
+    assert samples['http_requests_total{endpoint="unmatched",method="GET",status="404"}'] == 1
+    assert 'expiry_sweeper_runs_total' in samples
+
+
+def test_slow_request_log_names_the_statements(app, client, make_user, auth_headers, caplog):
+    donor = make_user('donor')
+    app.config['SLOW_REQUEST_SECONDS'] = 0
+
+    with caplog.at_level(logging.WARNING, logger=app.logger.name):
+        client.get('/api/donations', headers=auth_headers(donor))
+
+    record = next(r for r in caplog.records if r.getMessage().startswith('slow request: '))
+    entry = json.loads(record.getMessage()[len('slow request: '):])
+    assert entry['endpoint'] == 'donations.get_donations'
+    assert entry['sql_statements'] == len(entry['slowest_statements']) > 0
+    assert any('FROM donation' in s['sql'] for s in entry['slowest_statements'])
+
+
+def test_slow_request_log_is_off_by_default(client, caplog):
+    with caplog.at_level(logging.WARNING):
+        client.get('/status')
+    assert not [r for r in caplog.records if 'slow request' in r.getMessage()]
+
+
+def test_status_pings_the_database(client, monkeypatch):
+    body = client.get('/status').get_json()
+    assert body['database']['status'] == 'connected'
+    assert body['database']['ping_ms'] >= 0
+    assert body['database']['pool']['class']
+
+    def broken(*args, **kwargs):
+        raise OperationalError('SELECT 1', {}, Exception('database is locked'))
+
+    monkeypatch.setattr(db.session, 'execute', broken)
+    response = client.get('/status')
+    assert response.status_code == 503
+    assert response.get_json()['database']['status'] == 'unavailable'
@@ -0,0 +1,159 @@
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from app import create_app, db, mail
+from app.models import OutboxEmail, Request
+from app.services import outbox
+
+
+class Mailbox:
+    """aiosmtpd handler that keeps what it receives and refuses some recipients."""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+        self.refuse = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refuse:
+            return '550 No such user'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append((envelope.rcpt_tos, envelope.content.decode('utf-8', 'replace')))
+        return '250 Message accepted'
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _use_smtp(app, port):
+    app.config.update(MAIL_SERVER='127.0.0.1', MAIL_PORT=port, MAIL_USE_TLS=False,
+                      MAIL_SUPPRESS_SEND=False)
+    mail.init_app(app)
+
+
+@pytest.fixture
+def mailbox(app):
+    handler = Mailbox()
+    controller = Controller(handler, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+    _use_smtp(app, controller.port)
+    yield handler
+    controller.stop()
+
+
+def _queue(count, **kw):
+    for i in range(count):
+        outbox.enqueue(f'user{i}@example.org', f'Hello {i}', 'notification.html',
+                       {'username': f'user{i}', 'message': f'Message {i}'}, **kw)
+    db.session.commit()
+
+
+def test_enqueue_is_transactional_and_deduplicated(app):
+    outbox.enqueue('a@example.org', 'Hi', 'notification.html', dedupe_key='k')
+    db.session.rollback()
+    assert OutboxEmail.query.count() == 0
+
+    outbox.enqueue('a@example.org', 'Hi', 'notification.html', dedupe_key='k')
+    outbox.enqueue('a@example.org', 'Hi again', 'notification.html', dedupe_key='k')
+    outbox.enqueue('a@example.org', 'No key', 'notification.html')
+    outbox.enqueue('a@example.org', 'No key', 'notification.html')
+    db.session.commit()
+
+    assert OutboxEmail.query.filter_by(dedupe_key='k').one().subject == 'Hi'
+    assert OutboxEmail.query.count() == 3
+
+
+def test_register_queues_one_welcome_email(client, app):
+    payload = {'username': 'kitchen', 'email': 'kitchen@example.org',
+               'password': 'secret123', 'role': 'ngo', 'organization_name': 'Kitchen'}
+    assert client.post('/api/auth/register', json=payload).status_code == 201
+
+    row = OutboxEmail.query.one()
+    assert (row.recipient, row.template, row.status) == ('kitchen@example.org', 'welcome.html', 'pending')
+
+
+def test_drain_sends_batches_over_one_connection(app, mailbox):
+    _queue(5)
+
+    metrics = outbox.drain(batch_size=2)
+
+    assert (metrics['batches'], metrics['sent'], metrics['failed']) == (3, 5, 0)
+    assert len(mailbox.messages) == 5
+    assert len(mailbox.sessions) == 1
+    assert 'Message 3' in mailbox.messages[3][1]
+    assert OutboxEmail.query.filter_by(status='sent').count() == 5
+    assert outbox.drain()['sent'] == 0
+
+
+def test_refused_recipient_backs_off_then_gives_up(app, mailbox):
+    app.config['OUTBOX_MAX_ATTEMPTS'] = 2
+    mailbox.refuse.add('user1@example.org')
+    _queue(2)
+    now = datetime.utcnow()
+
+    first = outbox.drain(now=now)
+    assert (first['sent'], first['failed'], first['given_up']) == (1, 1, 0)
+    row = OutboxEmail.query.filter_by(recipient='user1@example.org').one()
+    assert row.status == 'pending' and row.attempts == 1
+    assert 'SMTPRecipientsRefused' in row.last_error
+    assert row.next_attempt_at >= now + timedelta(seconds=app.config['OUTBOX_RETRY_BASE_SECONDS'])
+
+    # Not due yet
+    assert outbox.drain(now=now)['failed'] == 0
+
+    last = outbox.drain(now=row.next_attempt_at)
+    assert last['given_up'] == 1
+    db.session.refresh(row)
+    assert row.status == 'failed' and row.attempts == 2
+
+
+def test_unreachable_server_reschedules_the_batch(app):
+    _use_smtp(app, _free_port())
+    _queue(3)
+    now = datetime.utcnow()
+
+    metrics = outbox.drain(now=now)
+
+    assert metrics['error'] and metrics['failed'] == 3 and metrics['sent'] == 0
+    rows = OutboxEmail.query.all()
+    assert all(row.status == 'pending' and row.attempts == 1 for row in rows)
+    assert all(row.next_attempt_at > now for row in rows)
+
+
+def test_status_change_notifies_the_ngo(client, app, mailbox, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    donation = make_donation(donor, title='Fresh rotis', status='claimed')
+    request_obj = Request(donation_id=donation.id, ngo_id=ngo.id, status='pending')
+    db.session.add(request_obj)
+    db.session.commit()
+
+    for _ in range(2):
+        client.put(f'/api/requests/{request_obj.id}/status', json={'status': 'approved'},
+                   headers=auth_headers(donor))
+    outbox.drain()
+
+    assert len(mailbox.messages) == 1
+    recipients, content = mailbox.messages[0]
+    assert recipients == [ngo.email]
+    assert 'Fresh rotis' in content and 'approved' in content
+
+
+def test_mail_credentials_need_an_encrypted_connection():
+    credentials = {'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'MAIL_USERNAME': 'outbox',
+                   'MAIL_PASSWORD': 'secret'}
+
+    assert create_app(credentials).config['MAIL_USE_TLS']
+    create_app({**credentials, 'MAIL_USE_TLS': False, 'MAIL_USE_SSL': True, 'MAIL_PORT': 465})
+    with pytest.raises(ValueError):
+        create_app({**credentials, 'MAIL_USE_TLS': False})
@@ -0,0 +1,87 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import User, Donation, Request
+
+TABLES = {'user', 'donation', 'request'}
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+pytestmark = pytest.mark.sqlite_only
+
+
+def _full_scans(statement, parameters):
+    cursor = db.session.connection().connection.cursor()
+    cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)
+    scans = []
+    for row in cursor.fetchall():
+        match = FULL_SCAN.match(row[3])
+        if match and match.group(1) in TABLES:
+            scans.append(row[3])
+    return scans
+
+
+@pytest.fixture
+def captured_selects(app):
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', _capture)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', _capture)
+
+
+@pytest.fixture
+def seeded(make_user, make_donation):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    donation = make_donation(donor)
+    db.session.add(Request(donation_id=donation.id, ngo_id=ngo.id))
+    db.session.commit()
+    return donor, ngo, donation
+
+
+@pytest.mark.parametrize('role,path', [
+    ('ngo', '/api/donations'),
+    ('ngo', '/api/donations?food_type=vegan&limit=5'),
+    ('ngo', '/api/donations?near=19.07,72.87&radius_km=5'),
+    ('donor', '/api/donations?status=claimed'),
+    ('donor', '/api/donations/requests'),
+    ('ngo', '/api/donations/requests'),
+    ('donor', '/api/users/stats'),
+    ('ngo', '/api/users/stats'),
+])
+def test_route_queries_use_indexes(client, auth_headers, seeded, captured_selects, role, path):
+    donor, ngo, _ = seeded
+    user = donor if role == 'donor' else ngo
+
+    response = client.get(path, headers=auth_headers(user))
+    assert response.status_code == 200
+
+    assert captured_selects
+    for statement, parameters in captured_selects:
+        assert _full_scans(statement, parameters) == [], statement
+
+
+def test_admin_query_shapes_use_indexes(seeded):
+    since = datetime.utcnow() - timedelta(days=30)
+    queries = [
+        User.query.filter_by(is_approved=False),
+        User.query.filter_by(role='ngo', is_approved=True),
+        Donation.query.filter_by(status='available'),
+        Donation.query.filter(Donation.created_at >= since),
+        Request.query.filter_by(donation_id=1, status='pending'),
+    ]
+
+    for query in queries:
+        compiled = query.statement.compile(db.engine)
+        parameters = tuple(
+            compiled.params[name] for name in compiled.positiontup
+        )
+        assert _full_scans(str(compiled), parameters) == [], str(compiled)
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import current_app
+from sqlalchemy import inspect
+
+from app import create_app, db
+from app.models import Donation, Request
+from tests.conftest import TEST_DATABASE_URL
+
+
+@pytest.fixture
+def app(tmp_path):
+    # Replaces the conftest app: a second SQLite file stands in for the replica,
+    # which only ever holds what a test copies into it
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': TEST_DATABASE_URL,
+        'REPLICA_DATABASE_URL': f'sqlite:///{tmp_path / "replica.db"}',
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'BCRYPT_LOG_ROUNDS': 4,
+        'PASSWORD_HASH_WORKERS': 0,
+    })
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(app.extensions['replica_engine'])
+        yield app
+        db.session.remove()
+        db.drop_all()
+        app.extensions['replica_engine'].dispose()
+
+
+def _replicate(*rows):
+    # Stand-in for replication: copy committed rows across as they are now
+    with current_app.extensions['replica_engine'].begin() as connection:
+        for row in rows:
+            mapper = inspect(row).mapper
+            connection.execute(mapper.local_table.insert().values({
+                attr.columns[0].name: getattr(row, attr.key) for attr in mapper.column_attrs
+            }))
+
+
+def _titles(client, headers):
+    response = client.get('/api/donations', headers=headers)
+    assert response.status_code == 200
+    return [d['title'] for d in response.get_json()['donations']]
+
+
+def _create(client, headers, title):
+    return client.post('/api/donations', headers=headers, json={
+        'title': title, 'quantity': '4 trays', 'food_type': 'vegetarian',
+        'expiry_time': (datetime.utcnow() + timedelta(hours=6)).isoformat(),
+        'location': 'Pune',
+    })
+
+
+def test_marked_reads_come_from_the_replica(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    make_donation(donor, title='Primary rice')
+    _replicate(donor, Donation(id=99, donor_id=donor.id, title='Replica rice', quantity='1 sack',
+                               expiry_time=datetime.utcnow() + timedelta(hours=6),
+                               location='Pune', status='available',
+                               created_at=datetime.utcnow(), updated_at=datetime.utcnow()))
+
+    assert _titles(client, auth_headers(ngo)) == ['Replica rice']
+
+
+def test_unmarked_endpoints_read_the_primary(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    claim = Request(donation_id=make_donation(donor).id, ngo_id=ngo.id)
+    db.session.add(claim)
+    db.session.commit()
+    _replicate(donor, ngo)
+
+    response = client.get(f'/api/requests/{claim.id}', headers=auth_headers(ngo))
+
+    assert response.status_code == 200
+
+
+def test_writer_reads_their_own_writes_until_the_window_closes(app, client, make_user, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    _replicate(donor, ngo)
+
+    assert _create(client, auth_headers(donor), 'Fresh dal').status_code == 201
+    assert db.session.query(Donation).count() == 1
+
+    # The writer is pinned to the primary; everyone else still reads the replica
+    assert _titles(client, auth_headers(donor)) == ['Fresh dal']
+    assert _titles(client, auth_headers(ngo)) == []
+
+    app.extensions['replica_sticky'].clear()
+    assert _titles(client, auth_headers(donor)) == []
+
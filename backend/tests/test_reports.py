@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import DonationDailyRollup
+from app.services.rollups import backfill
+
+
+def _rollup():
+    return {
+        (r.day, r.status, r.food_type): r.count
+        for r in DonationDailyRollup.query.all()
+        if r.count
+    }
+
+
+def test_rollup_follows_donation_writes(make_user, make_donation):
+    donor = make_user('donor')
+    today = datetime.utcnow().date()
+    first = make_donation(donor, food_type='vegan')
+    make_donation(donor, food_type='vegan')
+    assert _rollup() == {(today, 'available', 'vegan'): 2}
+
+    first.status = 'claimed'
+    db.session.commit()
+    assert _rollup() == {
+        (today, 'available', 'vegan'): 1,
+        (today, 'claimed', 'vegan'): 1,
+    }
+
+    db.session.delete(first)
+    db.session.commit()
+    assert _rollup() == {(today, 'available', 'vegan'): 1}
+
+
+def test_backfill_matches_incremental_rollup(make_user, make_donation):
+    donor = make_user('donor')
+    now = datetime.utcnow()
+    for days_ago, status, food_type in [
+        (0, 'available', 'vegan'),
+        (0, 'collected', None),
+        (3, 'claimed', 'vegetarian'),
+        (3, 'claimed', 'vegetarian'),
+    ]:
+        make_donation(donor, created_at=now - timedelta(days=days_ago),
+                      status=status, food_type=food_type)
+    incremental = _rollup()
+
+    backfill()
+
+    assert _rollup() == incremental
+
+
+def test_backfill_cli(app, make_user, make_donation):
+    make_donation(make_user('donor'))
+    DonationDailyRollup.query.delete()
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['rollups', 'backfill'])
+
+    assert 'Rebuilt donation_daily_rollup: 1 rows' in result.output
+    assert sum(_rollup().values()) == 1
+
+
+def test_report_reads_rollup_for_custom_range(client, make_user, make_donation, auth_headers):
+    admin = make_user('admin')
+    donor = make_user('donor')
+    now = datetime.utcnow()
+    make_donation(donor, created_at=now - timedelta(days=400), food_type='vegan')
+    make_donation(donor, created_at=now - timedelta(days=2), food_type='vegan')
+    make_donation(donor, created_at=now - timedelta(days=2), food_type='bakery', status='collected')
+    make_donation(donor, created_at=now, food_type='vegan')
+
+    start = (now - timedelta(days=2)).date()
+    response = client.get(
+        '/api/admin/reports/donations',
+        headers=auth_headers(admin),
+        query_string={'start': start.isoformat(), 'end': now.date().isoformat()},
+    )
+    assert response.status_code == 200
+    report = response.get_json()['report']
+
+    assert report['period'] == 'custom'
+    assert report['total_donations'] == 3
+    assert report['by_status'] == {'available': 2, 'collected': 1}
+    assert report['by_food_type'] == {'vegan': 2, 'bakery': 1}
+    assert report['timeline'] == [
+        {'date': start.isoformat(), 'total': 2, 'by_status': {'available': 1, 'collected': 1}},
+        {'date': (start + timedelta(days=1)).isoformat(), 'total': 0, 'by_status': {}},
+        {'date': now.date().isoformat(), 'total': 1, 'by_status': {'available': 1}},
+    ]
+
+
+def test_report_defaults_to_last_30_days(client, make_user, make_donation, auth_headers):
+    admin = make_user('admin')
+    make_donation(make_user('donor'))
+
+    report = client.get(
+        '/api/admin/reports/donations', headers=auth_headers(admin)
+    ).get_json()['report']
+
+    assert report['period'] == 'last_30_days'
+    assert len(report['timeline']) == 30
+    assert report['total_donations'] == 1
+
+
+def test_report_rejects_bad_range(client, make_user, auth_headers):
+    admin = make_user('admin')
+    response = client.get(
+        '/api/admin/reports/donations?start=2026-02-01&end=2026-01-01',
+        headers=auth_headers(admin),
+    )
+    assert response.status_code == 400
+
+
+def test_report_span_is_capped(client, make_user, auth_headers):
+    headers = auth_headers(make_user('admin'))
+
+    def report(query):
+        return client.get(f'/api/admin/reports/donations?{query}', headers=headers)
+
+    assert report('start=0001-01-01').status_code == 400
+    assert report('start=2024-01-01&end=2025-01-01').status_code == 400
+    leap_year = report('start=2024-01-01&end=2024-12-31')
+    assert leap_year.status_code == 200
+    assert len(leap_year.get_json()['report']['timeline']) == 366
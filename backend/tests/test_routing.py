@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app import db
+from app.models import Request
+from app.services import geo, routing
+
+
+def test_distance_matrix_matches_haversine():
+    lats, lngs = [19.06, 18.52, 28.61], [72.83, 73.86, 77.21]
+    matrix = routing.distance_matrix(lats, lngs)
+
+    for i in range(3):
+        for j in range(3):
+            expected = geo.haversine_km(lats[i], lngs[i], lats[j], lngs[j])
+            assert abs(matrix[i, j] - expected) < 1e-6
+
+
+def test_two_opt_shortens_nearest_neighbour_without_losing_stops():
+    rng = np.random.default_rng(7)
+    lats = np.concatenate([[19.0], rng.uniform(18.8, 19.2, 120)])
+    lngs = np.concatenate([[72.9], rng.uniform(72.7, 73.1, 120)])
+    problem = routing._Problem(
+        routing.distance_matrix(lats, lngs), np.full(121, np.inf), 25, 0
+    )
+
+    start = problem.nearest_neighbour()
+    improved = problem.two_opt(start, float('inf'))
+
+    assert sorted(improved.tolist()) == list(range(122))
+    assert improved[0] == 0 and improved[-1] == 121
+    assert problem.cost(improved)[1] < problem.cost(start)[1]
+
+
+def test_plan_route_beats_deadlines_nearest_neighbour_would_miss():
+    depart = datetime(2026, 1, 1, 9, 0)
+    stops = [
+        ('near', 19.001, 72.9, depart + timedelta(hours=5)),
+        ('far', 19.2, 72.9, depart + timedelta(hours=1)),
+    ]
+
+    visits, total_km = routing.plan_route((19.0, 72.9), stops, depart, 25, 10)
+
+    assert [visit['key'] for visit in visits] == ['far', 'near']
+    assert not any(visit['late'] for visit in visits)
+    assert abs(total_km - sum(visit['leg_km'] for visit in visits)) < 1e-9
+    assert visits[1]['arrival_time'] > visits[0]['arrival_time'] + timedelta(minutes=10)
+
+
+def test_route_endpoint_orders_approved_pickups(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo', address='Bandra, Mumbai')
+    other_ngo = make_user('ngo')
+
+    def approved(lat, lng, owner=ngo, status='approved', **kw):
+        donation = make_donation(donor, status='claimed', **kw)
+        if lat is not None:
+            donation.set_coordinates(lat, lng)
+        request_obj = Request(donation_id=donation.id, ngo_id=owner.id, status=status)
+        db.session.add(request_obj)
+        db.session.commit()
+        return request_obj
+
+    far = approved(19.23, 72.85)
+    near = approved(19.07, 72.84)
+    geocoded = approved(None, None, location='Andheri, Mumbai')
+    nowhere = approved(None, None, location='Somewhere unknown')
+    approved(19.06, 72.83, status='pending')
+    approved(19.06, 72.83, owner=other_ngo)
+
+    response = client.post('/api/requests/route', json={}, headers=auth_headers(ngo))
+    assert response.status_code == 200
+    body = response.get_json()
+
+    assert [stop['request_id'] for stop in body['stops']] == [near.id, geocoded.id, far.id]
+    assert body['unrouted'] == [nowhere.id]
+    assert body['late_stops'] == 0
+    assert abs(body['total_km'] - sum(stop['leg_km'] for stop in body['stops'])) < 0.01
+
+    subset = client.post(
+        '/api/requests/route',
+        json={'request_ids': [far.id], 'latitude': 19.23, 'longitude': 72.85},
+        headers=auth_headers(ngo)
+    ).get_json()
+    assert [stop['request_id'] for stop in subset['stops']] == [far.id]
+    assert subset['stops'][0]['leg_km'] == 0
+
+
+def test_route_endpoint_validates_and_is_for_ngos(client, make_user, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+
+    assert client.post('/api/requests/route', json={}, headers=auth_headers(donor)).status_code == 403
+    invalid = client.post('/api/requests/route', json={'speed_kmh': 0}, headers=auth_headers(ngo))
+    assert invalid.status_code == 400
+    empty = client.post('/api/requests/route', json={}, headers=auth_headers(ngo)).get_json()
+    assert empty['stops'] == [] and empty['total_km'] == 0
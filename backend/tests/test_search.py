@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.services import search
+
+
+def _search(client, headers, **params):
+    response = client.get('/api/donations/search', headers=headers, query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+@pytest.mark.sqlite_only
+def test_title_hits_rank_above_description_hits(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    in_description = make_donation(donor, title='Lunch boxes', description='Steamed rice with dal')
+    in_title = make_donation(donor, title='Basmati rice', description='Two sacks')
+    make_donation(donor, title='Bread')
+
+    body = _search(client, auth_headers(ngo), q='rice')
+
+    assert [d['id'] for d in body['donations']] == [in_title.id, in_description.id]
+    assert body['donations'][0]['snippet'] == 'Basmati <mark>rice</mark>'
+    assert body['donations'][0]['rank'] < body['donations'][1]['rank']
+
+
+@pytest.mark.sqlite_only
+def test_words_match_stems_and_prefixes(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    donation = make_donation(donor, title='Cooked vegetables', location='Andheri West')
+
+    assert [d['id'] for d in _search(client, auth_headers(ngo), q='vegetable andh')['donations']] == [donation.id]
+    assert _search(client, auth_headers(ngo), q='vegetable bandra')['donations'] == []
+
+
+def test_snippets_escape_donor_text(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    make_donation(donor, title='<b>Rice</b> & dal')
+
+    snippet = _search(client, auth_headers(ngo), q='rice')['donations'][0]['snippet']
+
+    assert snippet == '&lt;b&gt;<mark>Rice</mark>&lt;/b&gt; &amp; dal'
+
+
+def test_search_respects_status_and_expiry_filters(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    now = datetime.utcnow()
+    soon = make_donation(donor, title='Rice', expiry_time=now + timedelta(hours=1))
+    make_donation(donor, title='Rice', expiry_time=now + timedelta(days=3))
+    claimed = make_donation(donor, title='Rice', status='claimed')
+
+    body = _search(client, auth_headers(ngo), q='rice', expires_before=(now + timedelta(hours=2)).isoformat())
+    assert [d['id'] for d in body['donations']] == [soon.id]
+
+    body = _search(client, auth_headers(donor), q='rice', status='claimed')
+    assert [d['id'] for d in body['donations']] == [claimed.id]
+
+
+def test_index_follows_updates_and_deletes(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    donation = make_donation(donor, title='Rice')
+    gone = make_donation(donor, title='Rice')
+
+    donation.title = 'Chapati'
+    db.session.delete(gone)
+    db.session.commit()
+
+    assert _search(client, auth_headers(ngo), q='rice')['donations'] == []
+    assert len(_search(client, auth_headers(ngo), q='chapati')['donations']) == 1
+
+
+@pytest.mark.parametrize('fts', [pytest.param(True, marks=pytest.mark.sqlite_only), False])
+def test_cursor_walks_every_hit_once(client, make_user, make_donation, auth_headers, monkeypatch, fts):
+    monkeypatch.setattr(search, 'uses_fts', lambda: fts)
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    same_time = datetime.utcnow()
+    created = {make_donation(donor, title='Rice', created_at=same_time).id for _ in range(7)}
+    make_donation(donor, title='Bread')
+
+    seen, cursor = [], None
+    while True:
+        params = {'q': 'rice', 'limit': 3}
+        if cursor:
+            params['cursor'] = cursor
+        body = _search(client, auth_headers(ngo), **params)
+        seen.extend(d['id'] for d in body['donations'])
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+
+    assert sorted(seen) == sorted(created) and len(seen) == len(created)
+
+
+def test_fallback_highlights_matches(client, make_user, make_donation, auth_headers, monkeypatch):
+    monkeypatch.setattr(search, 'uses_fts', lambda: False)
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    make_donation(donor, title='Bread', description='Fresh <rice> and dal')
+
+    hit = _search(client, auth_headers(ngo), q='RICE dal')['donations'][0]
+
+    assert hit['rank'] is None
+    assert hit['snippet'] == 'Fresh &lt;<mark>rice</mark>&gt; and <mark>dal</mark>'
+
+
+def test_search_requires_a_query(client, make_user, auth_headers):
+    ngo = make_user('ngo')
+    for params in [{}, {'q': '  !! '}, {'q': 'rice', 'cursor': 'garbage'}]:
+        response = client.get('/api/donations/search', headers=auth_headers(ngo), query_string=params)
+        assert response.status_code == 422
@@ -0,0 +1,86 @@
+from app import db
+from app.models import Request
+
+
+def _stats(client, headers, path):
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    return response.get_json()['stats']
+
+
+def test_donor_stats(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    make_donation(donor)
+    make_donation(donor, status='claimed')
+    make_donation(donor, status='collected')
+    make_donation(donor, status='collected')
+    make_donation(make_user('donor'))
+
+    assert _stats(client, auth_headers(donor), '/api/users/stats') == {
+        'total_donations': 4,
+        'active_donations': 1,
+        'claimed_donations': 1,
+        'completed_donations': 2,
+    }
+
+
+def test_ngo_stats_for_new_user_are_zero(client, make_user, auth_headers):
+    ngo = make_user('ngo')
+
+    assert _stats(client, auth_headers(ngo), '/api/users/stats') == {
+        'total_requests': 0,
+        'pending_requests': 0,
+        'approved_requests': 0,
+        'completed_requests': 0,
+    }
+
+
+def test_ngo_stats(client, make_user, make_donation, auth_headers):
+    donor = make_user('donor')
+    ngo = make_user('ngo')
+    for status in ('pending', 'pending', 'approved', 'collected', 'rejected'):
+        db.session.add(Request(donation_id=make_donation(donor).id, ngo_id=ngo.id, status=status))
+    db.session.commit()
+
+    assert _stats(client, auth_headers(ngo), '/api/users/stats') == {
+        'total_requests': 5,
+        'pending_requests': 2,
+        'approved_requests': 1,
+        'completed_requests': 1,
+    }
+
+
+def test_admin_stats_single_round_trip(client, make_user, make_donation, auth_headers, query_counter):
+    admin = make_user('admin')
+    donor = make_user('donor')
+    make_user('donor', is_approved=False)
+    ngo = make_user('ngo')
+    make_user('ngo', is_approved=False)
+    make_donation(donor)
+    collected = make_donation(donor, status='collected')
+    db.session.add(Request(donation_id=collected.id, ngo_id=ngo.id, status='collected'))
+    db.session.commit()
+
+    headers = auth_headers(admin)
+    _stats(client, headers, '/api/admin/stats')  # warm the current-user cache
+    query_counter.reset()
+    stats = _stats(client, headers, '/api/admin/stats')
+
+    assert stats == {
+        'total_users': 5,
+        'total_donors': 1,
+        'total_ngos': 1,
+        'pending_approvals': 2,
+        'total_donations': 2,
+        'active_donations': 1,
+        'total_requests': 1,
+        'completed_donations': 1,
+    }
+    # The admin check reads the token claims; only the aggregate hits the database
+    assert query_counter.count == 1
+
+
+def test_admin_stats_requires_admin(client, make_user, auth_headers):
+    donor = make_user('donor')
+    response = client.get('/api/admin/stats', headers=auth_headers(donor))
+    assert response.status_code == 403
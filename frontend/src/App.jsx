@@ -43,6 +43,11 @@ function App() {
                   <Chat />
                 </ProtectedRoute>
               } />
+              <Route path="/chat/:requestId" element={
+                <ProtectedRoute>
+                  <Chat />
+                </ProtectedRoute>
+              } />
               
               {/* Donor Routes */}
               <Route path="/donate" element={
@@ -1,19 +1,29 @@
 import React, { useState } from 'react'
 import { Upload, X } from 'lucide-react'
+import { api } from '../services/api'
 
 export default function ImageUploader({ onImageUpload }) {
   const [image, setImage] = useState(null)
   const [isDragging, setIsDragging] = useState(false)
+  const [uploading, setUploading] = useState(false)
 
-  const handleFileSelect = (file) => {
+  // Send the raw file as multipart; the server returns a short image id
+  const handleFileSelect = async (file) => {
     if (file && file.type.startsWith('image/')) {
-      const reader = new FileReader()
-      reader.onload = (e) => {
-        const imageUrl = e.target.result
-        setImage(imageUrl)
-        onImageUpload(imageUrl)
+      const formData = new FormData()
+      formData.append('image', file)
+      setUploading(true)
+      try {
+        const response = await api.post('/donations/images', formData, {
+          headers: { 'Content-Type': 'multipart/form-data' }
+        })
+        setImage(URL.createObjectURL(file))
+        onImageUpload(response.data.image_id)
+      } catch (error) {
+        alert('Failed to upload image. Please try another file.')
+      } finally {
+        setUploading(false)
       }
-      reader.readAsDataURL(file)
     }
   }
 
@@ -40,6 +50,7 @@ export default function ImageUploader({ onImageUpload }) {
   }
 
   const removeImage = () => {
+    URL.revokeObjectURL(image)
     setImage(null)
     onImageUpload('')
   }
@@ -74,7 +85,7 @@ export default function ImageUploader({ onImageUpload }) {
               onChange={handleFileInput}
             />
             <p className="text-xs text-gray-500 mt-2">
-              PNG, JPG, GIF up to 10MB
+              {uploading ? 'Uploading...' : 'PNG, JPG, GIF, WEBP up to 16MB'}
             </p>
           </div>
         </div>
@@ -1,5 +1,5 @@
 import React, { createContext, useState, useContext, useEffect } from 'react'
-import { api } from '../services/api'
+import { api, clearEtagCache } from '../services/api'
 
 const AuthContext = createContext()
 
@@ -52,6 +52,7 @@ export function AuthProvider({ children }) {
   const logout = () => {
     localStorage.removeItem('token')
     delete api.defaults.headers.common['Authorization']
+    clearEtagCache()
     setUser(null)
   }
 
@@ -1,29 +1,17 @@
 import React, { useState, useRef, useEffect } from 'react'
+import { useParams } from 'react-router-dom'
 import { Send, User, Clock } from 'lucide-react'
+import { api, subscribeToEvents } from '../services/api'
+import { useAuth } from '../contexts/AuthContext'
 
 export default function Chat() {
-  const [messages, setMessages] = useState([
-    {
-      id: 1,
-      text: "Hello! I'm interested in your food donation. When can we collect it?",
-      sender: 'ngo',
-      timestamp: new Date(Date.now() - 3600000)
-    },
-    {
-      id: 2,
-      text: "Hi! The food is available for pickup anytime today between 2 PM to 6 PM.",
-      sender: 'donor',
-      timestamp: new Date(Date.now() - 3500000)
-    },
-    {
-      id: 3,
-      text: "Great! We'll send someone at 3 PM. Could you share the exact address?",
-      sender: 'ngo',
-      timestamp: new Date(Date.now() - 3400000)
-    }
-  ])
+  const { requestId } = useParams()
+  const { user } = useAuth()
+  const [messages, setMessages] = useState([])
+  const [hasMore, setHasMore] = useState(false)
   const [newMessage, setNewMessage] = useState('')
   const messagesEndRef = useRef(null)
+  const lastIdRef = useRef(0)
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" })
@@ -33,19 +21,112 @@ export default function Chat() {
     scrollToBottom()
   }, [messages])
 
-  const handleSend = (e) => {
+  const appendMessages = (incoming) => {
+    if (incoming.length === 0) return
+    setMessages(prev => {
+      const seen = new Set(prev.map(m => m.id))
+      return [...prev, ...incoming.filter(m => !seen.has(m.id))]
+    })
+    lastIdRef.current = Math.max(lastIdRef.current, ...incoming.map(m => m.id))
+  }
+
+  // Only the newest page is loaded up front; older pages on demand
+  useEffect(() => {
+    if (!requestId) return
+    let active = true
+
+    const loadLatest = async () => {
+      try {
+        const response = await api.get(`/requests/${requestId}/messages`)
+        if (!active) return
+        setMessages(response.data.messages)
+        setHasMore(response.data.has_more)
+        const ids = response.data.messages.map(m => m.id)
+        lastIdRef.current = ids.length ? Math.max(...ids) : 0
+      } catch (error) {
+        console.error('Error fetching messages:', error)
+      }
+    }
+
+    // Long-poll fallback when the browser has no EventSource
+    const longPoll = async () => {
+      while (active) {
+        try {
+          const response = await api.get(`/requests/${requestId}/messages`, {
+            params: { after: lastIdRef.current, wait: 25 }
+          })
+          if (active) appendMessages(response.data.messages)
+        } catch (error) {
+          await new Promise(resolve => setTimeout(resolve, 5000))
+        }
+      }
+    }
+
+    let unsubscribe = () => {}
+    loadLatest().then(() => {
+      if (!active) return
+      if (typeof EventSource === 'undefined') {
+        longPoll()
+      } else {
+        unsubscribe = subscribeToEvents({
+          'message.created': (message) => {
+            if (message.request_id === parseInt(requestId)) appendMessages([message])
+          }
+        })
+      }
+    })
+
+    return () => {
+      active = false
+      unsubscribe()
+    }
+  }, [requestId])
+
+  // Acknowledge everything the other side sent in one batched receipt
+  useEffect(() => {
+    const unread = messages.filter(m => m.sender_id !== user?.id && !m.read_at)
+    if (!requestId || unread.length === 0) return
+    const upTo = Math.max(...unread.map(m => m.id))
+    api.post(`/requests/${requestId}/messages/read`, { up_to: upTo }).catch(() => {})
+    setMessages(prev => prev.map(m => (
+      m.sender_id !== user?.id && m.id <= upTo && !m.read_at
+        ? { ...m, read_at: new Date().toISOString() }
+        : m
+    )))
+  }, [messages, requestId])
+
+  const loadEarlier = async () => {
+    if (messages.length === 0) return
+    try {
+      const response = await api.get(`/requests/${requestId}/messages`, {
+        params: { before: messages[0].id }
+      })
+      setMessages(prev => [...response.data.messages, ...prev])
+      setHasMore(response.data.has_more)
+    } catch (error) {
+      console.error('Error fetching earlier messages:', error)
+    }
+  }
+
+  const handleSend = async (e) => {
     e.preventDefault()
     if (!newMessage.trim()) return
 
-    const message = {
-      id: messages.length + 1,
-      text: newMessage,
-      sender: 'ngo', // In real app, this would be current user's role
-      timestamp: new Date()
+    try {
+      const response = await api.post(`/requests/${requestId}/messages`, { body: newMessage })
+      appendMessages([response.data.message])
+      setNewMessage('')
+    } catch (error) {
+      alert('Failed to send message. Please try again.')
     }
+  }
 
-    setMessages([...messages, message])
-    setNewMessage('')
+  if (!requestId) {
+    return (
+      <div className="max-w-4xl mx-auto py-8 px-4 sm:px-6 lg:px-8 text-center text-gray-600">
+        Open a conversation from one of your donation requests.
+      </div>
+    )
   }
 
   return (
@@ -58,32 +139,40 @@ export default function Chat() {
               <User className="h-6 w-6 text-primary-600" />
             </div>
             <div className="ml-4">
-              <h3 className="text-lg font-semibold text-gray-900">Community Kitchen NGO</h3>
-              <p className="text-sm text-gray-500">Online - Usually replies within 1 hour</p>
+              <h3 className="text-lg font-semibold text-gray-900">Request #{requestId}</h3>
+              <p className="text-sm text-gray-500">Messages between donor and NGO</p>
             </div>
           </div>
         </div>
 
         {/* Messages */}
         <div className="flex-1 overflow-y-auto p-6 space-y-4">
+          {hasMore && (
+            <button
+              onClick={loadEarlier}
+              className="block mx-auto text-sm text-primary-600 hover:text-primary-500"
+            >
+              Load earlier messages
+            </button>
+          )}
           {messages.map((message) => (
             <div
               key={message.id}
-              className={`flex ${message.sender === 'ngo' ? 'justify-start' : 'justify-end'}`}
+              className={`flex ${message.sender_id !== user?.id ? 'justify-start' : 'justify-end'}`}
             >
               <div
                 className={`max-w-xs lg:max-w-md px-4 py-2 rounded-lg ${
-                  message.sender === 'ngo'
+                  message.sender_id !== user?.id
                     ? 'bg-gray-100 text-gray-900'
                     : 'bg-primary-600 text-white'
                 }`}
               >
-                <p>{message.text}</p>
+                <p>{message.body}</p>
                 <div className={`text-xs mt-1 ${
-                  message.sender === 'ngo' ? 'text-gray-500' : 'text-primary-200'
+                  message.sender_id !== user?.id ? 'text-gray-500' : 'text-primary-200'
                 }`}>
                   <Clock className="inline h-3 w-3 mr-1" />
-                  {message.timestamp.toLocaleTimeString([], { 
+                  {new Date(message.created_at).toLocaleTimeString([], { 
                     hour: '2-digit', 
                     minute: '2-digit' 
                   })}
@@ -12,7 +12,7 @@ export default function DonateForm() {
     food_type: 'vegetarian',
     expiry_time: '',
     location: '',
-    image_url: ''
+    image_id: ''
   })
 
   const [loading, setLoading] = useState(false)
@@ -25,10 +25,10 @@ export default function DonateForm() {
     }))
   }
 
-  const handleImageUpload = (imageUrl) => {
+  const handleImageUpload = (imageId) => {
     setFormData((prev) => ({
       ...prev,
-      image_url: imageUrl
+      image_id: imageId
     }))
   }
 
@@ -49,7 +49,7 @@ export default function DonateForm() {
         food_type: formData.food_type,
         expiry_time: expiryISO,
         location: formData.location,
-        image_url: formData.image_url
+        image_id: formData.image_id || null
       }
 
       console.log("Submitting donation:", payload)
@@ -17,10 +17,10 @@ export default function DonationDetail() {
   const fetchDonationDetails = async () => {
     try {
       // In a real app, you'd have an endpoint for single donation with requests
-      const donationsResponse = await api.get('/donations')
+      const donationsResponse = await api.get('/donations', { params: { limit: 100 } })
       const requestsResponse = await api.get('/donations/requests')
       
-      const foundDonation = donationsResponse.data.find(d => d.id === parseInt(id))
+      const foundDonation = donationsResponse.data.donations.find(d => d.id === parseInt(id))
       setDonation(foundDonation)
       setRequests(requestsResponse.data.filter(r => r.donation_id === parseInt(id)))
     } catch (error) {
@@ -6,6 +6,8 @@ import { Package, Clock, MapPin, Users, Eye } from 'lucide-react'
 export default function MyDonations() {
   const [donations, setDonations] = useState([])
   const [loading, setLoading] = useState(true)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     fetchDonations()
@@ -14,7 +16,8 @@ export default function MyDonations() {
   const fetchDonations = async () => {
     try {
       const response = await api.get('/donations')
-      setDonations(response.data)
+      setDonations(response.data.donations)
+      setNextCursor(response.data.next_cursor)
     } catch (error) {
       console.error('Error fetching donations:', error)
     } finally {
@@ -22,6 +25,19 @@ export default function MyDonations() {
     }
   }
 
+  const fetchMoreDonations = async () => {
+    setLoadingMore(true)
+    try {
+      const response = await api.get('/donations', { params: { cursor: nextCursor } })
+      setDonations(prev => [...prev, ...response.data.donations])
+      setNextCursor(response.data.next_cursor)
+    } catch (error) {
+      console.error('Error fetching more donations:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const getStatusColor = (status) => {
     switch (status) {
       case 'available': return 'bg-green-100 text-green-800'
@@ -111,6 +127,15 @@ export default function MyDonations() {
               </div>
             </div>
           ))}
+          {nextCursor && (
+            <button
+              onClick={fetchMoreDonations}
+              disabled={loadingMore}
+              className="mx-auto px-4 py-2 border border-gray-300 rounded-lg text-sm font-medium text-gray-700 hover:bg-gray-50 disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
       )}
     </div>
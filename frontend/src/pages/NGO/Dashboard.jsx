@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
-import { api } from '../../services/api'
+import { api, subscribeToEvents } from '../../services/api'
 import { Package, Users, BarChart3, Clock, MapPin } from 'lucide-react'
 
 export default function Dashboard() {
@@ -15,6 +15,9 @@ export default function Dashboard() {
 
   useEffect(() => {
     fetchDashboardData()
+    return subscribeToEvents({
+      'request.status_changed': () => fetchDashboardData()
+    })
   }, [])
 
   const fetchDashboardData = async () => {
@@ -1,20 +1,48 @@
-import React, { useState, useEffect } from 'react'
-import { api } from '../../services/api'
-import { Package, Clock, MapPin, Users, Heart } from 'lucide-react'
+import React, { useState, useEffect, useRef } from 'react'
+import { api, subscribeToEvents } from '../../services/api'
+import { Package, Clock, MapPin, Users, Heart, Search } from 'lucide-react'
 
 export default function DonationsList() {
   const [donations, setDonations] = useState([])
   const [loading, setLoading] = useState(true)
   const [requesting, setRequesting] = useState(null)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [query, setQuery] = useState('')
+  const queryRef = useRef('')
 
+  // Typing switches the list to ranked search results; clearing restores the feed
   useEffect(() => {
-    fetchDonations()
+    queryRef.current = query.trim()
+    const timer = setTimeout(fetchDonations, 300)
+    return () => clearTimeout(timer)
+  }, [query])
+
+  const listRequest = (params = {}) => (
+    queryRef.current
+      ? api.get('/donations/search', { params: { ...params, q: queryRef.current } })
+      : api.get('/donations', { params })
+  )
+
+  useEffect(() => {
+    // Refresh when donations appear or get claimed by someone else
+    return subscribeToEvents({
+      'donation.created': () => fetchDonations(),
+      'donation.imported': () => fetchDonations(),
+      'donation.claimed': (event) => {
+        setDonations(prev => prev.filter(d => d.id !== event.id))
+      },
+      'donation.expired': (event) => {
+        setDonations(prev => prev.filter(d => !event.ids.includes(d.id)))
+      }
+    })
   }, [])
 
   const fetchDonations = async () => {
     try {
-      const response = await api.get('/donations')
-      setDonations(response.data)
+      const response = await listRequest()
+      setDonations(response.data.donations)
+      setNextCursor(response.data.next_cursor)
     } catch (error) {
       console.error('Error fetching donations:', error)
     } finally {
@@ -22,6 +50,19 @@ export default function DonationsList() {
     }
   }
 
+  const fetchMoreDonations = async () => {
+    setLoadingMore(true)
+    try {
+      const response = await listRequest({ cursor: nextCursor })
+      setDonations(prev => [...prev, ...response.data.donations])
+      setNextCursor(response.data.next_cursor)
+    } catch (error) {
+      console.error('Error fetching more donations:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleRequest = async (donationId) => {
     setRequesting(donationId)
     try {
@@ -69,6 +110,16 @@ export default function DonationsList() {
       <div className="mb-8">
         <h1 className="text-3xl font-bold text-gray-900">Available Donations</h1>
         <p className="text-gray-600 mt-2">Browse and request food donations from local businesses</p>
+        <div className="relative mt-4 max-w-md">
+          <Search className="absolute left-3 top-1/2 -translate-y-1/2 h-5 w-5 text-gray-400" />
+          <input
+            type="search"
+            value={query}
+            onChange={(e) => setQuery(e.target.value)}
+            placeholder="Search by food, description or area"
+            className="w-full pl-10 pr-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-green-500"
+          />
+        </div>
       </div>
 
       {donations.length === 0 ? (
@@ -84,7 +135,12 @@ export default function DonationsList() {
               <div className="flex justify-between items-start mb-4">
                 <div className="flex-1">
                   <h3 className="text-xl font-semibold text-gray-900">{donation.title}</h3>
-                  <p className="text-gray-600 mt-1">{donation.description}</p>
+                  {donation.snippet ? (
+                    // The API escapes donor text and only adds <mark> tags
+                    <p className="text-gray-600 mt-1" dangerouslySetInnerHTML={{ __html: donation.snippet }} />
+                  ) : (
+                    <p className="text-gray-600 mt-1">{donation.description}</p>
+                  )}
                 </div>
                 <div className="flex items-center space-x-2 ml-4">
                   <span className="inline-flex items-center px-2 py-1 rounded-full text-xs font-medium bg-blue-100 text-blue-800">
@@ -131,6 +187,15 @@ export default function DonationsList() {
               </div>
             </div>
           ))}
+          {nextCursor && (
+            <button
+              onClick={fetchMoreDonations}
+              disabled={loadingMore}
+              className="mx-auto px-4 py-2 border border-gray-300 rounded-lg text-sm font-medium text-gray-700 hover:bg-gray-50 disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
       )}
     </div>
@@ -7,8 +7,21 @@ export const api = axios.create({
         "Content-Type": "application/json",
     },
     withCredentials: false,
+    // 304 is a cache hit, not an error (see the ETag interceptors below)
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
 });
 
+// 🗂️ Conditional GET cache: remember each list's ETag and body so unchanged
+// polls come back as an empty 304 and reuse what we already have
+const etagCache = new Map();
+
+const cacheKey = (config) => {
+    const auth = config.headers ? config.headers["Authorization"] : "";
+    return `${auth}|${config.url}|${JSON.stringify(config.params || {})}`;
+};
+
+export const clearEtagCache = () => etagCache.clear();
+
 // 🔐 Add token automatically
 api.interceptors.request.use(
     (config) => {
@@ -18,6 +31,13 @@ api.interceptors.request.use(
             config.headers["Authorization"] = `Bearer ${token}`;
         }
 
+        if (config.method === "get") {
+            const cached = etagCache.get(cacheKey(config));
+            if (cached) {
+                config.headers["If-None-Match"] = cached.etag;
+            }
+        }
+
         // Safe logging (NO optional chaining)
         const method = config.method ? config.method.toUpperCase() : "UNKNOWN";
         const url = config.url || "";
@@ -34,6 +54,17 @@ api.interceptors.request.use(
 // 📥 Response logging
 api.interceptors.response.use(
     (response) => {
+        const { config } = response;
+        if (config.method === "get") {
+            const key = cacheKey(config);
+            if (response.status === 304 && etagCache.has(key)) {
+                response.data = etagCache.get(key).data;
+                response.status = 200;
+            } else if (response.headers.etag) {
+                etagCache.set(key, { etag: response.headers.etag, data: response.data });
+            }
+        }
+
         console.log(`✅ Response received: ${response.status}`, response.data);
         return response;
     },
@@ -47,4 +78,21 @@ api.interceptors.response.use(
     }
 );
 
+// 📡 Live updates over Server-Sent Events. EventSource cannot set headers,
+// so the token travels as ?jwt=. Returns a function that closes the stream.
+export const subscribeToEvents = (handlers) => {
+    const token = localStorage.getItem("token");
+    if (!token) {
+        return () => {};
+    }
+
+    const source = new EventSource(
+        `${api.defaults.baseURL}/stream?jwt=${encodeURIComponent(token)}`
+    );
+    Object.entries(handlers).forEach(([eventType, handler]) => {
+        source.addEventListener(eventType, (e) => handler(JSON.parse(e.data)));
+    });
+    return () => source.close();
+};
+
 export default api;
\ No newline at end of file